@@ -1,47 +1,641 @@
 from schema import (
-    Activity, 
-    ActivitiesResponse, 
-    CategoriesResponse, 
-    Category
+    Activity,
+    ActivitiesResponse,
+    ActivitySearchResponse,
+    ActivitySearchResult,
+    ActivityPageResponse,
+    ActivityDetail,
+    ActivityFitResponse,
+    ActivityLookupResponse,
+    CategoriesResponse,
+    Category,
+    FittingActivity,
+    NotModifiedResponse,
+    ActivityRecommendation,
+    RecommendationBatchResponse,
+    RecommendationResponse
 )
+from cache import TTLCache
+from compiled_catalog import CompiledCatalog, is_compiled_catalog
+import metrics
+from results import decode_cursor, encode_cursor, take_page
+from search import NameLookup, SearchIndex
+from timing import ActivityTiming, parse_timing
 
+import asyncio
 import json
+import logging
+import os
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from functools import cached_property
+from itertools import islice
+from typing import Any, Callable, Dict, Hashable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
 
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+# ==== CATALOG LOCATION ====
+DEFAULT_DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'permav_activities.json')
+PERMAV_DATA_PATH = os.environ.get("PERMAV_DATA_PATH", DEFAULT_DATA_PATH)
+# How often (seconds) the file is stat()ed for changes; 0 checks on every call
+RELOAD_CHECK_INTERVAL = float(os.environ.get("PERMAV_RELOAD_CHECK_INTERVAL", "1.0"))
+# Raised by unreadable, unparsable or wrongly shaped catalog files while a snapshot is built
+CATALOG_LOAD_ERRORS = (OSError, ValueError, KeyError, TypeError, AttributeError, struct.error)
+# Build search/lookup indexes at load time. Defaults to on for JSON catalogs and off
+# for compiled ones, whose records are then only decoded as tools touch them.
+PERMAV_WARM_INDEXES = os.environ.get("PERMAV_WARM_INDEXES")
+
+# ==== PAGING ====
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+ACTIVITY_FIELDS = tuple(Activity.model_fields)
+
+# ==== SERIALIZED RESPONSES ====
+# Serialized catalog responses kept per catalog version (categories, category lists, pages)
+RESPONSE_CACHE_SIZE = int(os.environ.get("PERMAV_RESPONSE_CACHE_SIZE", "512"))
+
+
+class ActivityEntry(NamedTuple):
+    """A single activity as held by the resident catalog"""
+    category: str      # Single letter code (P, E, R, M, A, V)
+    name: str
+    description: str
+    benefits: List[str]
+    frequency: str
+    duration_min: str
+
+
+class CatalogSnapshot:
+    """Immutable view of one loaded version of the PERMA-V catalog"""
+
+    def __init__(
+        self,
+        categories: Dict[str, Dict],
+        activities: Sequence,
+        version: int,
+        path: str,
+        source: Optional[CompiledCatalog] = None,
+        etag: Optional[str] = None
+    ):
+        """
+        Args:
+            categories: Category code -> {"name", "description"}.
+            activities: ActivityEntry tuples, or the lazy record views of a compiled catalog.
+            version: Catalog version this snapshot was loaded as.
+            path: File the snapshot was loaded from.
+            source: Compiled catalog backing the activity views, if any.
+            etag: Validator identifying the catalog content (default: derived from version).
+        """
+        self.categories = categories
+        self.activities = activities
+        self.version = version
+        self.path = path
+        self.source = source
+        self.etag = etag or f'"v{version}"'
+        self.loaded_at = time.time()
+        # Dropped together with the snapshot, so entries never outlive their catalog version
+        self.response_cache = TTLCache(maxsize=RESPONSE_CACHE_SIZE, ttl=float("inf"))
+
+    @classmethod
+    def from_json(cls, data: Dict, version: int, path: str, etag: Optional[str] = None) -> "CatalogSnapshot":
+        categories: Dict[str, Dict] = {}
+        activities: List[ActivityEntry] = []
+        for key, value in data.items():
+            categories[key] = {
+                "name": value.get("name", ""),
+                "description": value.get("description", "")
+            }
+            for name, details in value.get("activities", {}).items():
+                activities.append(ActivityEntry(
+                    category=key,
+                    name=name,
+                    description=details.get("description", ""),
+                    benefits=details.get("benefits", []),
+                    frequency=details.get("frequency", ""),
+                    duration_min=details.get("duration_min", "")
+                ))
+        snapshot = cls(categories, activities, version, path, etag=etag)
+        snapshot.__dict__["data"] = data
+        return snapshot
+
+    @classmethod
+    def from_compiled(cls, compiled: CompiledCatalog, version: int, etag: Optional[str] = None) -> "CatalogSnapshot":
+        return cls(compiled.categories, compiled.activities, version, compiled.path, source=compiled, etag=etag)
+
+    @cached_property
+    def data(self) -> Dict:
+        """The catalog in its JSON shape (materialized on demand for compiled catalogs)."""
+        data = {key: dict(value, activities={}) for key, value in self.categories.items()}
+        for entry in self.activities:
+            data[entry.category]["activities"][entry.name] = {
+                "description": entry.description,
+                "benefits": entry.benefits,
+                "frequency": entry.frequency,
+                "duration_min": entry.duration_min
+            }
+        return data
+
+    def category_activities(self, category: str) -> List[ActivityEntry]:
+        return [self.activities[i] for i in self.category_ids.get(category, [])]
+
+    def resolve_category(self, category: str) -> str:
+        """Map a category code or full name (case-insensitive) to its code."""
+        wanted = category.strip().lower()
+        for key, value in self.categories.items():
+            if wanted in (key.lower(), value["name"].lower()):
+                return key
+        raise ValueError(
+            f"Unknown PERMA-V category '{category}'. "
+            f"Expected one of: {', '.join(self.categories)}"
+        )
+
+    def to_model(self, doc_id: int, model=Activity, **extra):
+        """Build a schema model (Activity or a subclass) for one activity, parsed timing included."""
+        entry = self.activities[doc_id]
+        if "category" in model.model_fields:
+            extra.setdefault("category", self.categories[entry.category]["name"])
+        return model(
+            name=entry.name,
+            description=entry.description,
+            benefits=entry.benefits,
+            frequency=entry.frequency,
+            duration_min=entry.duration_min,
+            **self.timings[doc_id]._asdict(),
+            **extra
+        )
+
+    @cached_property
+    def timings(self) -> Sequence[ActivityTiming]:
+        """Parsed duration/frequency per activity, aligned with self.activities (read from the file when compiled)."""
+        if self.source is not None:
+            return self.source.timings
+        return [parse_timing(a.duration_min, a.frequency) for a in self.activities]
+
+    @cached_property
+    def duration_index(self) -> Tuple[Sequence[int], Sequence[int]]:
+        """Activities with a numeric duration, sorted by minimum minutes: (minutes, doc_ids) as compact arrays."""
+        pairs = sorted(
+            (timing.duration_min_minutes, doc_id)
+            for doc_id, timing in enumerate(self.timings)
+            if timing.duration_min_minutes is not None
+        )
+        return array("i", (minutes for minutes, _ in pairs)), array("i", (doc_id for _, doc_id in pairs))
+
+    @cached_property
+    def search_index(self) -> SearchIndex:
+        return SearchIndex(
+            {"name": [a.name], "benefits": a.benefits, "description": [a.description]}
+            for a in self.activities
+        )
+
+    @cached_property
+    def name_lookup(self) -> NameLookup:
+        return NameLookup([a.name for a in self.activities])
+
+    @cached_property
+    def recommender(self):
+        """TF-IDF recommender; NumPy is imported only when recommendations are first requested."""
+        from recommend import Recommender
+
+        codes = {key: i for i, key in enumerate(self.categories)}
+        return Recommender(
+            ({"name": [a.name], "benefits": a.benefits, "description": [a.description]} for a in self.activities),
+            [codes[a.category] for a in self.activities],
+            len(codes)
+        )
+
+    @cached_property
+    def category_masks(self) -> Dict[str, bytearray]:
+        """Per category, one byte per activity: 1 if the activity belongs to it."""
+        masks = {}
+        for key, ids in self.category_ids.items():
+            mask = masks[key] = bytearray(len(self.activities))
+            for doc_id in ids:
+                mask[doc_id] = 1
+        return masks
+
+    @cached_property
+    def category_ids(self) -> Dict[str, Sequence[int]]:
+        if self.source is not None:
+            return dict(self.source.category_ranges)
+        ids: Dict[str, List[int]] = {key: [] for key in self.categories}
+        for doc_id, entry in enumerate(self.activities):
+            ids[entry.category].append(doc_id)
+        return ids
+
+    @cached_property
+    def categories_response(self) -> CategoriesResponse:
+        return CategoriesResponse(
+            categories=[
+                Category(category=key, name=value["name"], description=value["description"])
+                for key, value in self.categories.items()
+            ],
+            etag=self.etag
+        )
+
+    @cached_property
+    def category_responses(self) -> Dict[str, ActivitiesResponse]:
+        return {key: self.build_category_response(key) for key in self.category_ids}
+
+    def build_category_response(self, key: str) -> ActivitiesResponse:
+        return ActivitiesResponse(activities=[self.to_model(i) for i in self.category_ids.get(key, [])], etag=self.etag)
+
+    def category_response(self, key: str) -> ActivitiesResponse:
+        """
+        All activities of one category. JSON catalogs keep every category's response
+        resident; compiled catalogs build it on request so their records stay in the file.
+        """
+        if self.source is not None:
+            return self.build_category_response(key)
+        return self.category_responses.get(key) or ActivitiesResponse(activities=[], etag=self.etag)
+
+    @cached_property
+    def not_modified_json(self) -> str:
+        return NotModifiedResponse(etag=self.etag).model_dump_json()
+
+    def serialized(self, key: Hashable, build: Callable[[], BaseModel]) -> str:
+        """Return the JSON of a catalog response, building and serializing it once per snapshot."""
+        text = self.response_cache.get(key)
+        if text is None:
+            text = build().model_dump_json()
+            self.response_cache.set(key, text)
+        return text
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """True if an If-None-Match style value (one tag, a comma-separated list or "*") names this snapshot."""
+        if not if_none_match:
+            return False
+        tags = [t.strip() for t in if_none_match.split(",")]
+        current = self.etag.strip('"')
+        return any(t == "*" or t.removeprefix("W/").strip('"') == current for t in tags)
+
+    @cached_property
+    def category_records(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Validated, plain-dict activities per category, ready for paging and projection."""
+        return {
+            key: [activity.model_dump() for activity in response.activities]
+            for key, response in self.category_responses.items()
+        }
+
+    def activity_records(self, key: str, offset: int = 0) -> Iterator[Dict[str, Any]]:
+        """Plain-dict activities of category `key` from offset on; compiled catalogs decode only what is pulled."""
+        if self.source is not None:
+            ids = self.category_ids.get(key, range(0))
+            return (self.to_model(doc_id).model_dump() for doc_id in ids[offset:])
+        return islice(self.category_records[key], offset, None)
+
+    def warm(self) -> None:
+        """Build the derived indexes up front so no tool call pays for them."""
+        self.search_index
+        self.name_lookup
+        self.duration_index
+        self.category_masks
+        self.categories_response
+        self.category_records
+
+
+class PermavCatalog:
+    """
+    Process-wide PERMA-V catalog.
+
+    The catalog file is loaded once and kept resident. It is re-read only when its
+    mtime or size changes, and every reload bumps a monotonically increasing version.
+    Compiled catalogs (see compiled_catalog.py) are memory-mapped instead of parsed.
+    """
+
+    def __init__(self, path: str = PERMAV_DATA_PATH, check_interval: float = RELOAD_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._signature = None
+        self._version = 0
+        self._next_check = 0.0
+
+    @property
+    def version(self) -> int:
+        return self.snapshot().version
+
+    @staticmethod
+    def signature_etag(signature) -> str:
+        """Validator from the file's (mtime_ns, size): stable across restarts and worker processes."""
+        mtime_ns, size = signature
+        return f'"{size:x}-{mtime_ns:x}"'
+
+    def _stat_signature(self):
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load(self, signature) -> CatalogSnapshot:
+        compiled = is_compiled_catalog(self.path)
+        # Only a snapshot that loads completely takes the next version number
+        version = self._version + 1
+        if compiled:
+            snapshot = CatalogSnapshot.from_compiled(
+                CompiledCatalog(self.path), version, etag=self.signature_etag(signature)
+            )
+        else:
+            with open(self.path, 'r') as file:
+                data = json.load(file)
+            snapshot = CatalogSnapshot.from_json(
+                data.get('PERMA-V', {}), version, self.path, etag=self.signature_etag(signature)
+            )
+        warm = not compiled if PERMAV_WARM_INDEXES is None else PERMAV_WARM_INDEXES.lower() in ("1", "true", "yes")
+        if warm:
+            snapshot.warm()
+        metrics.registry.register_cache("catalog_responses", snapshot.response_cache)
+        self._version = version
+        self._snapshot = snapshot
+        self._signature = signature
+        return snapshot
+
+    def snapshot(self) -> CatalogSnapshot:
+        """Return the current catalog, reloading it if the file changed on disk."""
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now < self._next_check:
+            return snapshot
+        with self._lock:
+            self._next_check = now + self.check_interval
+            try:
+                signature = self._stat_signature()
+            except OSError:
+                # Keep serving the last good catalog if the file is briefly missing
+                if self._snapshot is not None:
+                    return self._snapshot
+                raise
+            if self._snapshot is None or signature != self._signature:
+                try:
+                    return self._load(signature)
+                except CATALOG_LOAD_ERRORS as e:
+                    # A half-written file from a non-atomic save, or JSON of the wrong shape;
+                    # the signature is left unchanged, so the next check retries the load
+                    if self._snapshot is None:
+                        raise
+                    logger.warning("Could not reload catalog %s, serving version %d: %s", self.path, self._snapshot.version, e)
+            return self._snapshot
+
+    async def refresh_async(self) -> CatalogSnapshot:
+        """Like snapshot(), but any stat() or reload runs in a worker thread instead of the event loop."""
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() < self._next_check:
+            return snapshot
+        return await asyncio.to_thread(self.snapshot)
+
+    def reload(self) -> CatalogSnapshot:
+        """Force a reload regardless of the file signature."""
+        with self._lock:
+            self._next_check = time.monotonic() + self.check_interval
+            return self._load(self._stat_signature())
+
+
+catalog = PermavCatalog()
 
 
 # Load PERMA-V activities data
 def load_permav_data():
-    with open('/Users/aryash/BuddyClaude/permav_activities.json', 'r') as file:
-        data = json.load(file)
-    return data.get('PERMA-V', {})
-
+    return catalog.snapshot().data
 
 
 def get_permav_categories_helper() -> CategoriesResponse:
     """Get all PERMA-V categories with descriptions"""
-    PERMAV_DATA = load_permav_data()
-    categories = []
-    for key, value in PERMAV_DATA.items():
-        categories.append(Category(
-            category=key,
-            name=value.get("name", ""),
-            description=value.get("description", "")
-        ))
-    return CategoriesResponse(categories=categories)
+    return catalog.snapshot().categories_response
 
 
 def get_vitality_activities_helper() -> ActivitiesResponse:
     """Get activities that promote physical health, energy, and overall wellbeing."""
-    PERMAV_DATA = load_permav_data()
-    category_data = PERMAV_DATA.get("V", {})
-    activities = []
-    for name, details in category_data.get("activities", {}).items():
-        activities.append(Activity(
-            name=name,
-            description=details.get("description", ""),
-            benefits=details.get("benefits", []),
-            frequency=details.get("frequency", ""),
-            duration_min=details.get("duration_min", "")
+    return catalog.snapshot().category_response("V")
+
+
+def get_activities_helper(
+    category: str,
+    offset: int = 0,
+    limit: int = DEFAULT_PAGE_SIZE,
+    fields: Optional[List[str]] = None
+) -> ActivityPageResponse:
+    """
+    Get one page of a category's activities, optionally projected to a subset of fields.
+    Args:
+        category: PERMA-V category code or name (e.g. "V" or "Vitality").
+        offset: Index of the first activity to return; pass the previous next_offset to page.
+        limit: Maximum number of activities to return.
+        fields: Activity fields to include (default: all).
+    Returns:
+        ActivityPageResponse with the page and the offset of the next page, if any.
+    """
+    snapshot = catalog.snapshot()
+    return activities_page(snapshot, snapshot.resolve_category(category), offset, limit, fields)
+
+
+def activities_page(
+    snapshot: CatalogSnapshot,
+    key: str,
+    offset: int,
+    limit: int,
+    fields: Optional[List[str]]
+) -> ActivityPageResponse:
+    """Build one page of category `key` (a resolved code) from the given snapshot."""
+    if fields:
+        unknown = [f for f in fields if f not in ACTIVITY_FIELDS]
+        if unknown:
+            raise ValueError(
+                f"Unknown activity field(s): {', '.join(unknown)}. "
+                f"Expected any of: {', '.join(ACTIVITY_FIELDS)}"
+            )
+    offset = max(0, offset)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    page, more = take_page(iter_activity_records(snapshot, key, offset, fields), limit)
+    end = offset + len(page)
+    return ActivityPageResponse(
+        category=key,
+        activities=page,
+        total=len(snapshot.category_ids[key]),
+        offset=offset,
+        next_offset=end if more else None,
+        next_cursor=encode_cursor("activities", c=key, o=end, f=fields, e=snapshot.etag) if more else None,
+        catalog_version=snapshot.version,
+        etag=snapshot.etag
+    )
+
+
+def iter_activity_records(
+    snapshot: CatalogSnapshot,
+    key: str,
+    offset: int = 0,
+    fields: Optional[List[str]] = None
+) -> Iterator[Dict[str, Any]]:
+    """Activities of category `key` from offset on, projected lazily as the consumer pulls them."""
+    for record in snapshot.activity_records(key, offset):
+        yield {f: record[f] for f in fields} if fields else record
+
+
+def get_permav_categories_json(if_none_match: Optional[str] = None) -> str:
+    """Serialized get_permav_categories_helper(), or a not-modified reply if if_none_match is current."""
+    snapshot = catalog.snapshot()
+    if snapshot.matches(if_none_match):
+        return snapshot.not_modified_json
+    return snapshot.serialized("categories", lambda: snapshot.categories_response)
+
+
+def get_vitality_activities_json(
+    if_none_match: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None
+) -> str:
+    """
+    Serialized get_vitality_activities_helper(), or a not-modified reply if if_none_match is current.
+    With a limit or cursor, one page of the Vitality category is returned instead (see get_activities_json).
+    """
+    if limit is not None or cursor is not None:
+        return get_activities_json("V", limit=limit or DEFAULT_PAGE_SIZE, if_none_match=if_none_match, cursor=cursor)
+    snapshot = catalog.snapshot()
+    if snapshot.matches(if_none_match):
+        return snapshot.not_modified_json
+    return snapshot.serialized(
+        ("category", "V"),
+        lambda: snapshot.category_response("V")
+    )
+
+
+def get_activities_json(
+    category: str,
+    offset: int = 0,
+    limit: int = DEFAULT_PAGE_SIZE,
+    fields: Optional[List[str]] = None,
+    if_none_match: Optional[str] = None,
+    cursor: Optional[str] = None
+) -> str:
+    """
+    Serialized get_activities_helper() page, or a not-modified reply if if_none_match is current.
+    A cursor (next_cursor of the previous page) replaces offset and fields; it is only valid
+    for the catalog version that issued it.
+    """
+    snapshot = catalog.snapshot()
+    key = snapshot.resolve_category(category)
+    if snapshot.matches(if_none_match):
+        return snapshot.not_modified_json
+    if cursor is not None:
+        state = decode_cursor(cursor, "activities")
+        if state["c"] != key:
+            raise ValueError(f"Cursor belongs to category {state['c']}, not {key}")
+        if state["e"] != snapshot.etag:
+            raise ValueError("The catalog changed since this cursor was issued; start again without a cursor")
+        offset, fields = state["o"], state["f"]
+    return snapshot.serialized(
+        ("page", key, offset, limit, tuple(fields) if fields else None),
+        lambda: activities_page(snapshot, key, offset, limit, fields)
+    )
+
+
+def search_activities_helper(
+    query: str,
+    category: Optional[str] = None,
+    limit: int = 10
+) -> ActivitySearchResponse:
+    """Search activities by keyword, ranked by relevance."""
+    snapshot = catalog.snapshot()
+    allowed = None
+    if category:
+        allowed = snapshot.category_masks[snapshot.resolve_category(category)]
+    limit = max(1, min(limit, 100))
+    results = []
+    for doc_id, score in snapshot.search_index.search(query, limit=limit, allowed=allowed):
+        results.append(snapshot.to_model(doc_id, ActivitySearchResult, score=round(score, 4)))
+    return ActivitySearchResponse(results=results, count=len(results))
+
+
+def get_activity_details_helper(activity_name: str) -> ActivityLookupResponse:
+    """
+    Get an activity by name, tolerating case, punctuation and spelling differences.
+    Args:
+        activity_name: Activity name as given by the caller.
+    Returns:
+        ActivityLookupResponse with the best match (if close enough) and other candidates.
+    """
+    snapshot = catalog.snapshot()
+    doc_id, match, score, suggestions = snapshot.name_lookup.lookup(activity_name)
+    activity = None
+    if doc_id is not None:
+        activity = snapshot.to_model(doc_id, ActivityDetail)
+    return ActivityLookupResponse(
+        query=activity_name,
+        activity=activity,
+        match=match,
+        score=round(score, 4),
+        suggestions=[snapshot.activities[i].name for i in suggestions]
+    )
+
+
+def find_activities_fitting_helper(
+    max_minutes: int,
+    category: Optional[str] = None
+) -> ActivityFitResponse:
+    """
+    Find activities whose minimum duration fits in the given number of minutes.
+    Args:
+        max_minutes: Available time in minutes.
+        category: Optional PERMA-V category code or name to restrict to.
+    Returns:
+        ActivityFitResponse ordered by shortest minimum duration first; fits_fully marks
+        activities whose whole duration range fits.
+    """
+    snapshot = catalog.snapshot()
+    mask = snapshot.category_masks[snapshot.resolve_category(category)] if category else None
+    minutes, doc_ids = snapshot.duration_index
+    results = []
+    for doc_id in doc_ids[:bisect_right(minutes, max_minutes)]:
+        if mask is not None and not mask[doc_id]:
+            continue
+        longest = snapshot.timings[doc_id].duration_max_minutes
+        results.append(snapshot.to_model(
+            doc_id,
+            FittingActivity,
+            fits_fully=longest is not None and longest <= max_minutes
         ))
-    return ActivitiesResponse(activities=activities)
+    return ActivityFitResponse(max_minutes=max_minutes, results=results, count=len(results))
+
+
+def recommend_activities_batch_helper(
+    goals: List[str],
+    category_weights: Optional[Dict[str, float]] = None,
+    top_k: int = 5
+) -> RecommendationBatchResponse:
+    """
+    Recommend activities for free-text goals, scored by TF-IDF cosine similarity.
+    Args:
+        goals: Goals such as "sleep better and feel less stressed".
+        category_weights: PERMA-V category code or name -> ranking multiplier (0 excludes it).
+            Weights only change the order; each score is the unweighted similarity (0-1).
+        top_k: Maximum recommendations per goal.
+    Returns:
+        RecommendationBatchResponse with one RecommendationResponse per goal, in order.
+    """
+    snapshot = catalog.snapshot()
+    codes = list(snapshot.categories)
+    weights = None
+    if category_weights:
+        weights = {}
+        for category, weight in category_weights.items():
+            if weight < 0:
+                raise ValueError(f"Category weight for '{category}' must not be negative")
+            weights[codes.index(snapshot.resolve_category(category))] = weight
+    top_k = max(1, min(top_k, 100))
+    responses = []
+    for goal, hits in zip(goals, snapshot.recommender.recommend_batch(goals, top_k, weights)):
+        results = [snapshot.to_model(doc_id, ActivityRecommendation, score=round(score, 4)) for doc_id, score in hits]
+        responses.append(RecommendationResponse(goal=goal, results=results, count=len(results)))
+    return RecommendationBatchResponse(goals=responses)
+
 
+def recommend_activities_helper(
+    goal_text: str,
+    category_weights: Optional[Dict[str, float]] = None,
+    top_k: int = 5
+) -> RecommendationResponse:
+    """Recommend activities for one free-text goal (see recommend_activities_batch_helper)."""
+    return recommend_activities_batch_helper([goal_text], category_weights, top_k).goals[0]
@@ -0,0 +1,366 @@
+"""
+Microbenchmarks for the catalog, search and free-slot hot paths.
+
+Runs the PERMAV helpers against synthetic catalogs (30 to 100k activities) and
+client.compute_free_slots against synthetic calendars (0 to 10k busy intervals).
+Results can be saved as a JSON baseline and later runs compared against it;
+cases slower than the baseline by more than the threshold are flagged and make
+the run exit non-zero.
+
+    python benchmarks.py --save benchmarks/baseline.json
+    python benchmarks.py --compare benchmarks/baseline.json --threshold 0.15
+    python benchmarks.py --filter search --max-activities 10000
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import PERMAV
+from client import compute_free_slots
+from PERMAV import (
+    DEFAULT_DATA_PATH,
+    PermavCatalog,
+    find_activities_fitting_helper,
+    get_activities_helper,
+    get_activities_json,
+    get_activity_details_helper,
+    get_permav_categories_helper,
+    get_permav_categories_json,
+    get_vitality_activities_helper,
+    get_vitality_activities_json,
+    recommend_activities_batch_helper,
+    recommend_activities_helper,
+    search_activities_helper,
+)
+
+CATALOG_SIZES = [30, 1_000, 10_000, 100_000]
+BUSY_SIZES = [0, 100, 1_000, 10_000]
+CALENDAR_COUNTS = [1, 5]
+# Free-slot benchmarks cover a month of working days
+FREE_SLOT_DAYS = 31
+RECOMMEND_GOALS = ["sleep better and feel less stressed", "spend more time with friends", "find more meaning at work"]
+SEARCH_QUERIES = ["gratitude", "walk", "medit", "social connection", "improves sleep quality"]
+# Target wall time per timing sample; the number of calls per sample is calibrated to it
+SAMPLE_SECONDS = 0.05
+DEFAULT_REPEATS = 5
+DEFAULT_THRESHOLD = 0.10
+# Fresh interpreter runs per startup measurement
+DEFAULT_STARTUP_RUNS = 5
+
+STARTUP_CASES = ("startup.import_server", "startup.first_tool_call", "startup.first_tool_response", "startup.process")
+# Runs in a fresh interpreter: import the server, then open an in-memory MCP session and
+# make the first catalog call, as an MCP client launching the server per session would
+STARTUP_SCRIPT = """
+import time
+started = time.perf_counter()
+import server
+imported = time.perf_counter()
+import asyncio, json
+from mcp.shared.memory import create_connected_server_and_client_session
+
+async def first_call():
+    async with create_connected_server_and_client_session(server.mcp._mcp_server) as session:
+        connected = time.perf_counter()
+        result = await session.call_tool("get_permav_categories", {})
+        assert not result.isError, result
+        return connected, time.perf_counter()
+
+connected, responded = asyncio.run(first_call())
+print(json.dumps({
+    "import_server": imported - started,
+    "first_tool_call": responded - connected,
+    "first_tool_response": responded - started,
+}))
+"""
+
+
+# ==== SYNTHETIC INPUTS ====
+
+def synthetic_catalog(size: int, seed: int = 0) -> Dict:
+    """
+    Build a PERMA-V catalog with `size` activities in the shape of permav_activities.json.
+    Activities are variations of the real ones, so durations, frequencies and vocabulary
+    stay representative.
+    """
+    with open(DEFAULT_DATA_PATH, 'r') as f:
+        source = json.load(f)['PERMA-V']
+    rng = random.Random(seed)
+    templates = [(key, name, activity) for key, cat in source.items() for name, activity in cat['activities'].items()]
+    vocabulary = sorted({word for _, _, a in templates for word in a['description'].split()})
+    categories = {key: dict(cat, activities={}) for key, cat in source.items()}
+    for i in range(size):
+        key, name, activity = templates[i % len(templates)]
+        extra = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(3, 12)))
+        categories[key]['activities'][f"{name} {i}" if i >= len(templates) else name] = dict(
+            activity,
+            description=f"{activity['description']} {extra}",
+            benefits=rng.sample(activity['benefits'], len(activity['benefits']))
+        )
+    return {'PERMA-V': categories}
+
+
+def synthetic_busy_lists(intervals: int, calendars: int, first_day: date, days: int, seed: int = 0) -> List[List[Dict]]:
+    """Split `intervals` sorted FreeBusy busy entries across `calendars` calendars, spread over `days` days."""
+    rng = random.Random(seed)
+    base = datetime.combine(first_day, datetime.min.time(), tzinfo=timezone.utc)
+    span = days * 24 * 60
+    busy_lists = [[] for _ in range(calendars)]
+    for _ in range(intervals):
+        start = base + timedelta(minutes=rng.randrange(span))
+        end = start + timedelta(minutes=rng.choice([15, 30, 45, 60, 90, 120]))
+        busy_lists[rng.randrange(calendars)].append((start, end))
+    fmt = '%Y-%m-%dT%H:%M:%SZ'
+    return [
+        [{"start": s.strftime(fmt), "end": e.strftime(fmt)} for s, e in sorted(busy)]
+        for busy in busy_lists
+    ]
+
+
+@contextmanager
+def synthetic_catalog_installed(size: int) -> Iterator[PermavCatalog]:
+    """Write a synthetic catalog to a temp file and make it PERMAV's active catalog."""
+    previous = PERMAV.catalog
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f"permav_{size}.json")
+        with open(path, 'w') as f:
+            json.dump(synthetic_catalog(size), f)
+        PERMAV.catalog = PermavCatalog(path)
+        try:
+            yield PERMAV.catalog
+        finally:
+            PERMAV.catalog = previous
+
+
+# ==== TIMING ====
+
+def measure(func: Callable[[], object], repeats: int = DEFAULT_REPEATS) -> Dict[str, float]:
+    """
+    Time func like timeit: calibrate a call count that fills SAMPLE_SECONDS, then take
+    `repeats` samples. Returns per-call statistics in microseconds.
+    """
+    func()
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= SAMPLE_SECONDS or number >= 1_000_000:
+            break
+        number *= 10 if elapsed < SAMPLE_SECONDS / 10 else 2
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - started) / number * 1e6)
+    return {
+        "median_us": round(statistics.median(samples), 3),
+        "min_us": round(min(samples), 3),
+        "max_us": round(max(samples), 3),
+        "calls_per_sample": number,
+        "repeats": repeats,
+    }
+
+
+def measure_startup(runs: int = DEFAULT_STARTUP_RUNS) -> Dict[str, Dict[str, float]]:
+    """
+    Cold-start timings from `runs` fresh interpreters: server import, the first tool call
+    on a new session, import-to-first-response, and the whole process wall time.
+    """
+    samples: Dict[str, List[float]] = {}
+    env = dict(os.environ, FASTMCP_LOG_LEVEL="WARNING")
+    for _ in range(runs):
+        started = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        wall = time.perf_counter() - started
+        timings = json.loads(completed.stdout.strip().splitlines()[-1])
+        timings["process"] = wall
+        for name, seconds in timings.items():
+            samples.setdefault(f"startup.{name}", []).append(seconds * 1e6)
+    return {
+        name: {
+            "median_us": round(statistics.median(values), 3),
+            "min_us": round(min(values), 3),
+            "max_us": round(max(values), 3),
+            "calls_per_sample": 1,
+            "repeats": runs,
+        }
+        for name, values in samples.items()
+    }
+
+
+# ==== CASES ====
+
+def catalog_cases(size: int) -> List[Tuple[str, Callable[[], object]]]:
+    """Benchmarks that run against the installed synthetic catalog of the given size."""
+    snapshot = PERMAV.catalog.snapshot()
+    names = [entry.name for entry in snapshot.activities]
+    misspelled = names[len(names) // 2][:-3] + "xyz"
+    cases = [
+        ("catalog.reload", PERMAV.catalog.reload),
+        ("get_permav_categories_helper", get_permav_categories_helper),
+        ("get_vitality_activities_helper", get_vitality_activities_helper),
+        ("get_activities_helper[page]", lambda: get_activities_helper("P", offset=0, limit=50)),
+        ("get_activities_helper[fields]", lambda: get_activities_helper("Engagement", limit=200, fields=["name", "duration_min"])),
+        ("get_permav_categories_json", get_permav_categories_json),
+        ("get_permav_categories_json[not_modified]", lambda: get_permav_categories_json(snapshot.etag)),
+        ("get_vitality_activities_json", get_vitality_activities_json),
+        ("get_activities_json[page]", lambda: get_activities_json("P", offset=0, limit=50)),
+        ("get_activity_details_helper[exact]", lambda: get_activity_details_helper(names[-1])),
+        ("get_activity_details_helper[fuzzy]", lambda: get_activity_details_helper(misspelled)),
+        ("find_activities_fitting_helper", lambda: find_activities_fitting_helper(15)),
+    ]
+    for query in SEARCH_QUERIES:
+        cases.append((f"search_activities_helper[{query}]", lambda q=query: search_activities_helper(q)))
+    cases.append(("search_activities_helper[category]", lambda: search_activities_helper("daily practice", category="M")))
+    snapshot.recommender  # built once per catalog version; not part of the per-call timing
+    cases.extend([
+        ("recommend_activities_helper", lambda: recommend_activities_helper(RECOMMEND_GOALS[0])),
+        ("recommend_activities_helper[weights]", lambda: recommend_activities_helper(RECOMMEND_GOALS[1], {"R": 2, "V": 0})),
+        ("recommend_activities_batch_helper[x30]", lambda: recommend_activities_batch_helper(RECOMMEND_GOALS * 10)),
+    ])
+    return [(f"{name}@{size}", func) for name, func in cases]
+
+
+def free_slot_cases(intervals: int, calendars: int) -> List[Tuple[str, Callable[[], object]]]:
+    first_day = date(2026, 3, 1)  # spans the US DST switch
+    busy_lists = synthetic_busy_lists(intervals, calendars, first_day, FREE_SLOT_DAYS)
+    start = first_day.isoformat()
+    end = (first_day + timedelta(days=FREE_SLOT_DAYS - 1)).isoformat()
+    return [
+        (f"compute_free_slots@{intervals}x{calendars}", lambda: compute_free_slots(busy_lists, start, end)),
+        (f"compute_free_slots[min30]@{intervals}x{calendars}", lambda: compute_free_slots(busy_lists, start, end, min_slot_minutes=30)),
+    ]
+
+
+def run(
+    name_filter: Optional[str] = None,
+    max_activities: Optional[int] = None,
+    repeats: int = DEFAULT_REPEATS,
+    startup_runs: int = DEFAULT_STARTUP_RUNS
+) -> Dict[str, Dict[str, float]]:
+    results = {}
+
+    if startup_runs and (not name_filter or any(name_filter in name for name in STARTUP_CASES)):
+        for name, stats in measure_startup(startup_runs).items():
+            if name_filter and name_filter not in name:
+                continue
+            results[name] = stats
+            print(f"{name:<52}{stats['median_us']:>14.2f} us", flush=True)
+
+    def record(cases):
+        for name, func in cases:
+            if name_filter and name_filter not in name:
+                continue
+            results[name] = measure(func, repeats)
+            print(f"{name:<52}{results[name]['median_us']:>14.2f} us", flush=True)
+
+    for size in CATALOG_SIZES:
+        if max_activities is not None and size > max_activities:
+            continue
+        with synthetic_catalog_installed(size):
+            record(catalog_cases(size))
+    for intervals in BUSY_SIZES:
+        for calendars in CALENDAR_COUNTS:
+            if intervals == 0 and calendars > 1:
+                continue
+            record(free_slot_cases(intervals, calendars))
+    return results
+
+
+# ==== BASELINES ====
+
+def environment() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "created": datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+    }
+
+
+def save_baseline(path: str, results: Dict[str, Dict[str, float]]) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2, sort_keys=True)
+    print(f"Saved {len(results)} results to {path}")
+
+
+def compare(baseline: Dict, results: Dict[str, Dict[str, float]], threshold: float) -> List[str]:
+    """
+    Print current vs baseline medians and return the names of regressed cases.
+    A case regresses when its median is more than `threshold` (a fraction) slower.
+    """
+    regressions = []
+    previous = baseline.get("results", {})
+    print(f"\n{'case':<52}{'baseline us':>14}{'current us':>14}{'change':>10}")
+    for name, current in results.items():
+        if name not in previous:
+            print(f"{name:<52}{'-':>14}{current['median_us']:>14.2f}{'new':>10}")
+            continue
+        before, after = previous[name]["median_us"], current["median_us"]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        elif change < -threshold:
+            flag = "  improved"
+        print(f"{name:<52}{before:>14.2f}{after:>14.2f}{change:>+10.1%}{flag}")
+    missing = set(previous) - set(results)
+    if missing:
+        print(f"\n{len(missing)} baseline case(s) not run this time")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark catalog, search and free-slot hot paths")
+    parser.add_argument("--save", metavar="PATH", help="write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare results against a saved baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative slowdown flagged as a regression (default 0.10 = 10%%)")
+    parser.add_argument("--filter", dest="name_filter", help="only run cases whose name contains this text")
+    parser.add_argument("--max-activities", type=int, help="skip synthetic catalogs larger than this")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="timing samples per case")
+    parser.add_argument("--startup-runs", type=int, default=DEFAULT_STARTUP_RUNS,
+                        help="fresh interpreters for the cold-start measurement (0 skips it)")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+
+    results = run(args.name_filter, args.max_activities, args.repeats, args.startup_runs)
+    if args.save:
+        save_baseline(args.save, results)
+    if baseline is not None:
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\nNo regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,131 +1,440 @@
-import requests
+import asyncio
+import heapq
 import os
 import json
-from datetime import datetime, timedelta
+import logging
+import re
+import uuid
+from urllib.parse import urlencode, urlsplit
+from datetime import datetime, time as dt_time, timedelta, timezone
 from zoneinfo import ZoneInfo 
-from typing import List, Dict, Tuple, Optional, Union
-import pytz
+from typing import Iterable, Iterator, List, Dict, Tuple, Optional, Union
 from dotenv import load_dotenv
-from auth import main
+import history
+import metrics
+import shared_state
+import upstream
+from results import ProgressCallback, decode_cursor, encode_cursor, report_progress
+from schema import AvailabilityPageResponse
+from token_manager import token_manager
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# ==== CALENDAR SETTINGS ====
+CALENDAR_TIMEZONE = "America/Los_Angeles"
+CALENDAR_TZ = ZoneInfo(CALENDAR_TIMEZONE)
+WORK_START_HOUR = 8
+WORK_END_HOUR = 20
+# A calendar quarter, so a recurring series can be checked with one FreeBusy request
+MAX_RANGE_DAYS = 92
+# Paged availability fetches one page at a time, so the whole range may be longer
+MAX_PAGED_RANGE_DAYS = 366
+DEFAULT_PAGE_DAYS = 7
+UTC_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+# Overridable so the client can be pointed at a local stand-in server
+GOOGLE_API_BASE = os.environ.get("GOOGLE_API_BASE", "https://www.googleapis.com").rstrip("/")
+CALENDAR_API_BASE = f"{GOOGLE_API_BASE}/calendar/v3"
+FREEBUSY_URL = f"{CALENDAR_API_BASE}/freeBusy"
+BATCH_URL = f"{GOOGLE_API_BASE}/batch/calendar/v3"
+# The Calendar batch endpoint accepts at most 50 calls per request
+BATCH_MAX_ITEMS = 50
+# FreeBusy accepts at most 50 calendars per query
+FREEBUSY_MAX_ITEMS = 50
+
+# ==== FREEBUSY CACHE ====
+# Keyed by (calendar ids, timeMin, timeMax, timezone); writes through
+# create_calendar_event_helper invalidate the windows they touch.
+FREEBUSY_CACHE_TTL = float(os.environ.get("FREEBUSY_CACHE_TTL", "60"))
+FREEBUSY_CACHE_SIZE = int(os.environ.get("FREEBUSY_CACHE_SIZE", "256"))
+# Shared by all workers when shared_state uses a shared backend
+freebusy_cache = shared_state.backend.cache("freebusy", FREEBUSY_CACHE_SIZE, FREEBUSY_CACHE_TTL)
+metrics.registry.register_cache("freebusy", freebusy_cache)
+
 # BASE_URL = os.environ.get("BASE_URL", "http://localhost:3000")
 
 def parse_datetime(dt_str: str) -> datetime:
     """Parse datetime string from Google Calendar API format."""
     return datetime.fromisoformat(dt_str)
 
+def day_bounds(date: str, tz: ZoneInfo = CALENDAR_TZ) -> Tuple[datetime, datetime]:
+    """Return the tz-aware start of a "YYYY-MM-DD" day and the start of the following day."""
+    day = datetime.strptime(date, "%Y-%m-%d").date()
+    start = datetime.combine(day, dt_time.min, tzinfo=tz)
+    end = datetime.combine(day + timedelta(days=1), dt_time.min, tzinfo=tz)
+    return start, end
+
+def date_range_days(start_date: str, end_date: str) -> List[str]:
+    """List the "YYYY-MM-DD" days from start_date to end_date inclusive."""
+    first = datetime.strptime(start_date, "%Y-%m-%d").date()
+    last = datetime.strptime(end_date, "%Y-%m-%d").date()
+    if last < first:
+        raise ValueError(f"end_date {end_date} is before start_date {start_date}")
+    if (last - first).days + 1 > MAX_RANGE_DAYS:
+        raise ValueError(f"Date range {start_date}..{end_date} is longer than {MAX_RANGE_DAYS} days")
+    return [(first + timedelta(days=i)).isoformat() for i in range((last - first).days + 1)]
+
+def build_freebusy_requests(
+    start_date: str,
+    end_date: Optional[str] = None,
+    calendar_ids: Optional[List[str]] = None
+) -> List[Tuple[Tuple, Dict]]:
+    """
+    Build the FreeBusy request bodies for an inclusive date range.
+
+    Calendars are split into chunks of FREEBUSY_MAX_ITEMS, the API's per-request limit.
+    Returns:
+        One (cache key, request body) pair per chunk.
+    """
+    days = date_range_days(start_date, end_date or start_date)
+    time_min = day_bounds(days[0])[0].astimezone(timezone.utc).strftime(UTC_FORMAT)
+    time_max = day_bounds(days[-1])[1].astimezone(timezone.utc).strftime(UTC_FORMAT)
+    ids = list(dict.fromkeys(calendar_ids or ["primary"]))
+    chunks = []
+    for start in range(0, len(ids), FREEBUSY_MAX_ITEMS):
+        chunk = tuple(ids[start:start + FREEBUSY_MAX_ITEMS])
+        cache_key = (chunk, time_min, time_max, CALENDAR_TIMEZONE)
+        body = {
+            "timeMin": time_min,
+            "timeMax": time_max,
+            "timeZone": CALENDAR_TIMEZONE,
+            "items": [{"id": calendar_id} for calendar_id in chunk]
+        }
+        chunks.append((cache_key, body))
+    return chunks
+
+def combine_freebusy_responses(responses: List[Dict]) -> Dict:
+    """Merge the per-chunk FreeBusy responses into one {"calendars": {...}} dict."""
+    calendars = {}
+    for data in responses:
+        calendars.update(data.get("calendars", {}))
+    return {"calendars": calendars}
+
 def load_calendar_data(
-    date: str
+    start_date: str,
+    end_date: Optional[str] = None,
+    calendar_ids: Optional[List[str]] = None
 ) -> Dict:
     """
     Query Google Calendar FreeBusy API and return busy time data.
     Args:
-        date: Date string in "YYYY-MM-DD" format.   
+        start_date: First day, "YYYY-MM-DD" format.
+        end_date: Last day (inclusive), "YYYY-MM-DD" format. Defaults to start_date.
+        calendar_ids: Calendars to query (default: ["primary"]).
     Returns:
-        Dict response from the FreeBusy API.
-    """
-    # Set default time_min and time_max if not provided
-    date_obj = datetime.strptime(date, "%Y-%m-%d")
-    pacific = pytz.timezone('America/Los_Angeles')
-    target_date = pacific.localize(date_obj)
-    # Convert to UTC and get the start of the day
-    time_min = target_date.astimezone(pytz.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
-    # Get the end of the day in UTC (start of the next day - 1 second)
-    time_max = (target_date + timedelta(days=1, seconds=-1)).astimezone(pytz.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
- 
-    with open("/Users/aryash/BuddyClaude/google_tokens_1.json", "r") as f:
-        tokens = json.load(f)
-
-    access_token = tokens.get("access_token")
-    # if not access_token:
-    #     main()
-        
-    url = "https://www.googleapis.com/calendar/v3/freeBusy"
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json"
-    }
-    body = {
-        "timeMin": time_min,
-        "timeMax": time_max,
-        "timeZone": "America/Los_Angeles",
-        "items": [{"id": "primary"}]
-    }
-    response = requests.post(url, headers=headers, json=body)
-    response.raise_for_status()
-    return response.json()
+        Dict response from the FreeBusy API covering the whole range, one request per
+        FREEBUSY_MAX_ITEMS calendars.
+    """
+    responses = []
+    for cache_key, body in build_freebusy_requests(start_date, end_date, calendar_ids):
+        data = freebusy_cache.get(cache_key)
+        if data is None:
+            headers = {
+                "Authorization": f"Bearer {token_manager.get_access_token()}",
+                "Content-Type": "application/json"
+            }
+            response = upstream.post(FREEBUSY_URL, headers=headers, json=body)
+            response.raise_for_status()
+            data = response.json()
+            freebusy_cache.set(cache_key, data)
+        responses.append(data)
+    return combine_freebusy_responses(responses)
 
-def get_free_slots(
-    date: str = None
+async def load_calendar_data_async(
+    start_date: str,
+    end_date: Optional[str] = None,
+    calendar_ids: Optional[List[str]] = None,
+    progress: Optional[ProgressCallback] = None
 ) -> Dict:
     """
-    Given Google Calendar free/busy data, find available time slots.
-    Args:
-        date: Date string in "YYYY-MM-DD" format.   
+    Async variant of load_calendar_data; chunks are fetched concurrently and share its cache.
+    progress, if given, is called with (chunks done, chunk count) as each chunk arrives.
+    """
+    done = 0
+
+    async def fetch(cache_key: Tuple, body: Dict) -> Dict:
+        nonlocal done
+        data = await shared_state.offload(freebusy_cache.get, cache_key)
+        if data is None:
+            headers = {
+                "Authorization": f"Bearer {await token_manager.get_access_token_async()}",
+                "Content-Type": "application/json"
+            }
+            response = await upstream.apost(FREEBUSY_URL, headers=headers, json=body)
+            response.raise_for_status()
+            data = response.json()
+            await shared_state.offload(freebusy_cache.set, cache_key, data)
+        done += 1
+        await report_progress(progress, done, len(chunks))
+        return data
+
+    chunks = build_freebusy_requests(start_date, end_date, calendar_ids)
+    return combine_freebusy_responses(await asyncio.gather(*(fetch(*r) for r in chunks)))
+
+def invalidate_freebusy_cache(
+    start_time: Union[str, datetime],
+    end_time: Union[str, datetime],
+    calendar_id: str = "primary",
+    tz: str = CALENDAR_TIMEZONE
+) -> int:
+    """
+    Drop cached FreeBusy responses for calendar_id whose window overlaps [start_time, end_time).
     Returns:
-        Dictionary with dates as keys and lists of free time slots as values
+        Number of cache entries dropped.
     """
-    if date is None:
-        date = datetime.now().strftime("%Y-%m-%d")
-    calendar_data = load_calendar_data(date)["calendars"]["primary"]
-    if not calendar_data or "busy" not in calendar_data:
-        return {}
-
-    work_start = 8
-    work_end = 20
-    busy_periods = calendar_data["busy"]
-    free_slots = {}
-
-    # Convert to datetime tuples
-    intervals = [(parse_datetime(b["start"]), parse_datetime(b["end"])) for b in busy_periods]
-    intervals.sort()
-    # Group by date
-    by_date = {}
+    def to_utc(value: Union[str, datetime]) -> str:
+        dt = parse_datetime(value) if isinstance(value, str) else value
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=ZoneInfo(tz))
+        return dt.astimezone(timezone.utc).strftime(UTC_FORMAT)
+
+    start, end = to_utc(start_time), to_utc(end_time)
+    return freebusy_cache.invalidate(
+        lambda key: calendar_id in key[0] and key[1] < end and start < key[2]
+    )
+
+def get_freebusy_cache_stats() -> Dict:
+    """Hit/miss counters and occupancy of the FreeBusy cache."""
+    return freebusy_cache.stats()
+
+def merge_sorted_intervals(intervals: Iterable[Tuple[datetime, datetime]]) -> List[List[datetime]]:
+    """Merge overlapping or contiguous (start, end) intervals that arrive sorted by start."""
+    merged = []
     for s, e in intervals:
-        d_str = s.strftime("%Y-%m-%d")
-        by_date.setdefault(d_str, []).append((s, e))
-    for d_str, times in by_date.items():
-        # Merge overlapping/contiguous busy intervals
-        merged = []
-        for s, e in sorted(times):
-            if not merged or merged[-1][1] < s:
-                merged.append([s, e])
-            else:
-                merged[-1][1] = max(merged[-1][1], e)
-        # Work bounds (make tz-aware by using tzinfo from first interval)
-        d = datetime.strptime(d_str, "%Y-%m-%d")
-        tzinfo = times[0][0].tzinfo if times and times[0][0].tzinfo else None
-        day_start = d.replace(hour=work_start, minute=0, second=0, tzinfo=tzinfo)
-        day_end = d.replace(hour=work_end, minute=0, second=0, tzinfo=tzinfo)
+        if not merged or merged[-1][1] < s:
+            merged.append([s, e])
+        else:
+            merged[-1][1] = max(merged[-1][1], e)
+    return merged
+
+def merge_intervals(intervals: List[Tuple[datetime, datetime]]) -> List[List[datetime]]:
+    """Merge overlapping or contiguous (start, end) intervals; input need not be sorted."""
+    return merge_sorted_intervals(sorted(intervals))
+
+def union_busy(busy_lists: List[List[Dict]], tz: ZoneInfo = CALENDAR_TZ) -> List[List[datetime]]:
+    """
+    Union the busy periods of several calendars with a heap-based k-way merge.
+
+    FreeBusy returns each calendar's busy list sorted by start, so the lists are merged
+    with heapq.merge in O(total intervals * log N) and unioned in the same pass.
+    Args:
+        busy_lists: One list of FreeBusy "busy" entries per calendar.
+        tz: Timezone the intervals are converted to.
+    Returns:
+        Sorted, non-overlapping [start, end] intervals where anyone is busy.
+    """
+    streams = []
+    for busy in busy_lists:
+        intervals = [
+            (parse_datetime(b["start"]).astimezone(tz), parse_datetime(b["end"]).astimezone(tz))
+            for b in busy
+        ]
+        if any(intervals[k] > intervals[k + 1] for k in range(len(intervals) - 1)):
+            intervals.sort()
+        streams.append(intervals)
+    return merge_sorted_intervals(heapq.merge(*streams))
+
+def compute_free_slots(
+    busy_lists: List[List[Dict]],
+    start_date: str,
+    end_date: str,
+    tz: ZoneInfo = CALENDAR_TZ,
+    work_start: int = WORK_START_HOUR,
+    work_end: int = WORK_END_HOUR,
+    min_slot_minutes: int = 0
+) -> Dict[str, List[Dict]]:
+    """
+    Compute shared free working-hour slots for every day of a range in one sort-and-sweep pass.
+    See iter_free_slots.
+    Returns:
+        Dictionary with dates as keys and lists of free time slots as values; days
+        with no free time are omitted.
+    """
+    return dict(iter_free_slots(busy_lists, start_date, end_date, tz, work_start, work_end, min_slot_minutes))
+
+def iter_free_slots(
+    busy_lists: List[List[Dict]],
+    start_date: str,
+    end_date: str,
+    tz: ZoneInfo = CALENDAR_TZ,
+    work_start: int = WORK_START_HOUR,
+    work_end: int = WORK_END_HOUR,
+    min_slot_minutes: int = 0
+) -> Iterator[Tuple[str, List[Dict]]]:
+    """
+    Yield shared free working-hour slots day by day in one sort-and-sweep pass.
+
+    The calendars' busy intervals are converted to the calendar timezone and unioned
+    once. A single cursor then walks them day by day, so a block spanning midnight
+    (or several days) is clipped against each day it touches.
+    Args:
+        busy_lists: One list of FreeBusy "busy" entries ({"start": ..., "end": ...}) per calendar.
+        start_date: First day, "YYYY-MM-DD".
+        end_date: Last day (inclusive), "YYYY-MM-DD".
+        tz: Timezone the working hours are expressed in.
+        work_start: First working hour of the day.
+        work_end: Hour the working day ends.
+        min_slot_minutes: Drop free slots shorter than this.
+    Yields:
+        (date, free time slots) in date order; days with no free time are skipped.
+    """
+    merged = union_busy(busy_lists, tz)
+    min_slot = timedelta(minutes=max(min_slot_minutes, 0))
+    i = 0
+    for d_str in date_range_days(start_date, end_date):
+        midnight = day_bounds(d_str, tz)[0]
+        day_start = midnight.replace(hour=work_start)
+        day_end = midnight.replace(hour=work_end)
+        # Intervals that ended before today's working hours can never matter again
+        while i < len(merged) and merged[i][1] <= day_start:
+            i += 1
+        gaps = []
         cur = day_start
-        slots = []
-        for s, e in merged:
-            if e <= day_start or s >= day_end:
-                continue
-            s = max(s, day_start)
-            e = min(e, day_end)
+        j = i
+        while j < len(merged) and merged[j][0] < day_end:
+            s, e = max(merged[j][0], day_start), min(merged[j][1], day_end)
             if cur < s:
-                mins = (s - cur).total_seconds() / 60
-                slots.append({
-                    "start": cur.isoformat(),
-                    "end": s.isoformat(),
-                    "duration_minutes": int(mins)
-                })
+                gaps.append((cur, s))
             cur = max(cur, e)
+            j += 1
         if cur < day_end:
-            mins = (day_end - cur).total_seconds() / 60
-            slots.append({
-                "start": cur.isoformat(),
-                "end": day_end.isoformat(),
-                "duration_minutes": int(mins)
-            })
+            gaps.append((cur, day_end))
+        slots = [
+            {
+                "start": s.isoformat(),
+                "end": e.isoformat(),
+                "duration_minutes": int((e - s).total_seconds() / 60)
+            }
+            for s, e in gaps
+            if e - s >= min_slot and e > s
+        ]
         if slots:
-            free_slots.setdefault(d_str, []).extend(slots)
-    return free_slots
+            yield d_str, slots
 
-def create_calendar_event_helper(
+def busy_lists_from_response(data: Dict, calendar_ids: Optional[List[str]] = None) -> List[List[Dict]]:
+    """Per-calendar "busy" lists of a FreeBusy response; raises if any calendar could not be read."""
+    calendars = data["calendars"]
+    busy_lists = []
+    unreadable = []
+    for calendar_id in dict.fromkeys(calendar_ids or ["primary"]):
+        calendar_data = calendars.get(calendar_id)
+        if not calendar_data or calendar_data.get("errors"):
+            unreadable.append(calendar_id)
+            continue
+        busy_lists.append(calendar_data.get("busy", []))
+    if unreadable:
+        # An unreadable calendar must not be mistaken for a free one
+        raise RuntimeError(f"Could not read free/busy information for: {', '.join(unreadable)}")
+    return busy_lists
+
+def free_slots_from_response(
+    data: Dict,
+    start_date: str,
+    end_date: str,
+    calendar_ids: Optional[List[str]] = None,
+    min_slot_minutes: int = 0
+) -> Dict:
+    busy_lists = busy_lists_from_response(data, calendar_ids)
+    return compute_free_slots(busy_lists, start_date, end_date, min_slot_minutes=min_slot_minutes)
+
+def default_dates(start_date: Optional[str], end_date: Optional[str]) -> Tuple[str, str]:
+    if start_date is None:
+        start_date = datetime.now(CALENDAR_TZ).strftime("%Y-%m-%d")
+    return start_date, end_date or start_date
+
+def get_free_slots(
+    start_date: str = None,
+    end_date: str = None,
+    calendar_ids: Optional[List[str]] = None,
+    min_slot_minutes: int = 0
+) -> Dict:
+    """
+    Find time slots between start_date and end_date when every given calendar is free.
+    Args:
+        start_date: First day, "YYYY-MM-DD" format (default: today in the calendar timezone).
+        end_date: Last day (inclusive), "YYYY-MM-DD" format (default: start_date).
+        calendar_ids: Calendars that must all be free (default: ["primary"]).
+        min_slot_minutes: Only return slots at least this long.
+    Returns:
+        Dictionary with dates as keys and lists of free time slots as values
+    """
+    start_date, end_date = default_dates(start_date, end_date)
+    data = load_calendar_data(start_date, end_date, calendar_ids)
+    return free_slots_from_response(data, start_date, end_date, calendar_ids, min_slot_minutes)
+
+async def get_free_slots_async(
+    start_date: str = None,
+    end_date: str = None,
+    calendar_ids: Optional[List[str]] = None,
+    min_slot_minutes: int = 0,
+    progress: Optional[ProgressCallback] = None
+) -> Dict:
+    """Async variant of get_free_slots."""
+    start_date, end_date = default_dates(start_date, end_date)
+    data = await load_calendar_data_async(start_date, end_date, calendar_ids, progress)
+    return free_slots_from_response(data, start_date, end_date, calendar_ids, min_slot_minutes)
+
+async def get_free_slots_page_async(
+    start_date: str = None,
+    end_date: str = None,
+    calendar_ids: Optional[List[str]] = None,
+    min_slot_minutes: int = 0,
+    page_days: Optional[int] = None,
+    cursor: Optional[str] = None,
+    progress: Optional[ProgressCallback] = None
+) -> AvailabilityPageResponse:
+    """
+    Free slots for a long date range, one page of days at a time.
+
+    Each page makes its own FreeBusy request covering only its days, so the first page
+    comes back as soon as its days are fetched and no request holds more than a page.
+    Args:
+        start_date, end_date, calendar_ids, min_slot_minutes: As for get_free_slots; the
+            range may be up to MAX_PAGED_RANGE_DAYS long.
+        page_days: Days per page (default DEFAULT_PAGE_DAYS, at most MAX_RANGE_DAYS).
+        cursor: next_cursor of the previous page; replaces all other arguments.
+        progress: Called with (chunks done, chunk count) while the page is fetched.
+    Returns:
+        AvailabilityPageResponse with next_cursor set while days remain.
+    """
+    if cursor is not None:
+        state = decode_cursor(cursor, "availability")
+        try:
+            start_date, end_date = state["s"], state["e"]
+            calendar_ids, min_slot_minutes, page_days = state["c"], state["m"], state["p"]
+        except KeyError:
+            raise ValueError("Invalid cursor; pass next_cursor from a previous reply unchanged")
+    start_date, end_date = default_dates(start_date, end_date)
+    page_days = page_days or DEFAULT_PAGE_DAYS
+    if not 1 <= page_days <= MAX_RANGE_DAYS:
+        raise ValueError(f"page_days must be between 1 and {MAX_RANGE_DAYS}")
+    first = datetime.strptime(start_date, "%Y-%m-%d").date()
+    last = datetime.strptime(end_date, "%Y-%m-%d").date()
+    if last < first:
+        raise ValueError(f"end_date {end_date} is before start_date {start_date}")
+    # Checked for cursors too: the range they carry is client-supplied
+    if (last - first).days + 1 > MAX_PAGED_RANGE_DAYS:
+        raise ValueError(f"Date range {start_date}..{end_date} is longer than {MAX_PAGED_RANGE_DAYS} days")
+
+    page_end = min(last, first + timedelta(days=page_days - 1)).isoformat()
+    data = await load_calendar_data_async(start_date, page_end, calendar_ids, progress)
+    busy_lists = busy_lists_from_response(data, calendar_ids)
+    next_cursor = None
+    if page_end < end_date:
+        next_start = (datetime.strptime(page_end, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+        next_cursor = encode_cursor(
+            "availability", s=next_start, e=end_date, c=calendar_ids, m=min_slot_minutes, p=page_days
+        )
+    return AvailabilityPageResponse(
+        start_date=start_date,
+        end_date=page_end,
+        range_end_date=end_date,
+        slots=dict(iter_free_slots(busy_lists, start_date, page_end, min_slot_minutes=min_slot_minutes)),
+        next_cursor=next_cursor
+    )
+
+def build_event_request(
     summary: str,
     start_time: Union[str, datetime],
     end_time: Union[str, datetime],
@@ -136,29 +445,12 @@ def create_calendar_event_helper(
     calendar_id: str = "primary",
     timezone: str = "America/Los_Angeles",
     send_notifications: bool = True
-) -> Dict:
+) -> Tuple[str, Dict, Dict]:
     """
-    Create a calendar event using the Google Calendar API.
-    
-    Args:
-        summary: Title of the event
-        start_time: Start time (ISO datetime string or datetime object)
-        end_time: End time (ISO datetime string or datetime object)
-        description: Event description
-        location: Physical location of the event
-        attendees: List of dictionaries with attendee emails, e.g. [{"email": "person@example.com"}]
-        recurrence: List of RRULE strings for recurring events
-        calendar_id: Calendar identifier (default: "primary")
-        timezone: Timezone for the event
-        send_notifications: Whether to send notifications to attendees
-        
+    Build an events.insert request. Arguments are those of create_calendar_event_helper.
     Returns:
-        Dict with the created event details
+        (url, event body, query params)
     """
-    access_token = os.environ.get("ACCESS_TOKEN")
-    if not access_token:
-        raise RuntimeError("GOOGLE_CALENDAR_TOKEN environment variable not set.")
-    
     # Convert datetime objects to ISO format strings if needed
     if isinstance(start_time, datetime):
         start_time = start_time.isoformat()
@@ -188,23 +480,245 @@ def create_calendar_event_helper(
     if recurrence:
         event["recurrence"] = recurrence
     
-    # Make the API request
-    url = f"https://www.googleapis.com/calendar/v3/calendars/{calendar_id}/events"
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json"
-    }
-    
+    url = f"{CALENDAR_API_BASE}/calendars/{calendar_id}/events"
     params = {
         "sendNotifications": "true" if send_notifications else "false"
     }
+    return url, event, params
+
+def event_created(created: Dict, event: Dict, calendar_id: str) -> Dict:
+    """
+    Bookkeeping after an event was written: invalidate overlapping FreeBusy cache windows
+    and record the event in the local activity history.
+    Args:
+        created: Event resource returned by the API.
+        event: Event body that was sent.
+        calendar_id: Calendar the event was written to.
+    Returns:
+        The created event resource.
+    """
+    invalidate_freebusy_cache(
+        event["start"]["dateTime"],
+        # Later occurrences of a recurring event can fall in any cached window after the first
+        event["end"]["dateTime"] if not event.get("recurrence") else datetime.max.replace(tzinfo=timezone.utc),
+        calendar_id=calendar_id,
+        tz=event["start"]["timeZone"]
+    )
+    history.record_event(created, event, calendar_id)
+    logger.info("Event created: %s", created.get('htmlLink'))
+    return created
+
+def create_calendar_event_helper(
+    summary: str,
+    start_time: Union[str, datetime],
+    end_time: Union[str, datetime],
+    description: Optional[str] = None,
+    location: Optional[str] = None,
+    attendees: Optional[List[Dict[str, str]]] = None,
+    recurrence: Optional[List[str]] = None,
+    calendar_id: str = "primary",
+    timezone: str = "America/Los_Angeles",
+    send_notifications: bool = True
+) -> Dict:
+    """
+    Create a calendar event using the Google Calendar API.
     
-    response = requests.post(url, headers=headers, json=event, params=params)
+    Args:
+        summary: Title of the event
+        start_time: Start time (ISO datetime string or datetime object)
+        end_time: End time (ISO datetime string or datetime object)
+        description: Event description
+        location: Physical location of the event
+        attendees: List of dictionaries with attendee emails, e.g. [{"email": "person@example.com"}]
+        recurrence: List of RRULE strings for recurring events
+        calendar_id: Calendar identifier (default: "primary")
+        timezone: Timezone for the event
+        send_notifications: Whether to send notifications to attendees
+        
+    Returns:
+        Dict with the created event details
+    """
+    url, event, params = build_event_request(
+        summary, start_time, end_time, description, location, attendees,
+        recurrence, calendar_id, timezone, send_notifications
+    )
+    headers = {
+        "Authorization": f"Bearer {token_manager.get_access_token()}",
+        "Content-Type": "application/json"
+    }
+    response = upstream.post(url, idempotent=False, headers=headers, json=event, params=params)
     response.raise_for_status()
-    
-    print(f"Event created: {response.json().get('htmlLink')}")
-    return response.json()
+    return event_created(response.json(), event, calendar_id)
+
+async def create_calendar_event_async(
+    summary: str,
+    start_time: Union[str, datetime],
+    end_time: Union[str, datetime],
+    description: Optional[str] = None,
+    location: Optional[str] = None,
+    attendees: Optional[List[Dict[str, str]]] = None,
+    recurrence: Optional[List[str]] = None,
+    calendar_id: str = "primary",
+    timezone: str = "America/Los_Angeles",
+    send_notifications: bool = True
+) -> Dict:
+    """Async variant of create_calendar_event_helper."""
+    url, event, params = build_event_request(
+        summary, start_time, end_time, description, location, attendees,
+        recurrence, calendar_id, timezone, send_notifications
+    )
+    headers = {
+        "Authorization": f"Bearer {await token_manager.get_access_token_async()}",
+        "Content-Type": "application/json"
+    }
+    response = await upstream.apost(url, idempotent=False, headers=headers, json=event, params=params)
+    response.raise_for_status()
+    # Writes the history store and may take the shared FreeBusy cache's write lock
+    return await asyncio.to_thread(event_created, response.json(), event, calendar_id)
+
+
+def build_batch_body(calls: List[Tuple[str, Dict, Dict]], boundary: str) -> bytes:
+    """
+    Encode events.insert requests as a multipart/mixed batch body.
+    Args:
+        calls: (url, event body, query params) tuples from build_event_request.
+        boundary: Multipart boundary.
+    Returns:
+        The request body; part i carries Content-ID <item-i>.
+    """
+    parts = []
+    for i, (url, event, params) in enumerate(calls):
+        query = urlencode(params)
+        payload = json.dumps(event)
+        parts.append(
+            f"--{boundary}\r\n"
+            "Content-Type: application/http\r\n"
+            f"Content-ID: <item-{i}>\r\n\r\n"
+            f"POST {urlsplit(url).path}?{query} HTTP/1.1\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(payload.encode())}\r\n\r\n"
+            f"{payload}\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n")
+    return "".join(parts).encode()
+
+def parse_batch_response(content: bytes, content_type: str) -> Dict[int, Tuple[int, Dict]]:
+    """
+    Decode a multipart/mixed batch response.
+    Returns:
+        Item index -> (HTTP status, JSON body) for every part carrying a response-item Content-ID.
+    """
+    match = re.search(r'boundary="?([^";]+)"?', content_type)
+    if not match:
+        raise ValueError(f"Batch response is not multipart: {content_type}")
+    results = {}
+    for part in content.split(b"--" + match.group(1).encode()):
+        part = part.replace(b"\r\n", b"\n").strip()
+        if not part or part == b"--":
+            continue
+        part_headers, _, http_response = part.partition(b"\n\n")
+        item = re.search(rb"Content-ID:\s*<response-item-(\d+)>", part_headers, re.IGNORECASE)
+        if not item:
+            continue
+        status_line, _, rest = http_response.partition(b"\n")
+        _, _, body = rest.partition(b"\n\n")
+        results[int(item.group(1))] = (int(status_line.split()[1]), json.loads(body) if body.strip() else {})
+    return results
+
+def batch_item_result(index: int, status: int, body: Dict) -> Dict:
+    if 200 <= status < 300:
+        return {"index": index, "ok": True, "status": status, "event_id": body.get("id"), "html_link": body.get("htmlLink")}
+    error = body.get("error", {})
+    message = error.get("message") if isinstance(error, dict) else str(error)
+    return {"index": index, "ok": False, "status": status, "error": message or f"HTTP {status}"}
+
+async def send_event_batch(calls: List[Tuple[str, Dict, Dict]], access_token: str) -> Dict[int, Tuple[int, Dict]]:
+    """Send up to BATCH_MAX_ITEMS events.insert calls in one multipart/mixed request."""
+    boundary = f"batch_{uuid.uuid4().hex}"
+    headers = {
+        "Authorization": f"Bearer {access_token}",
+        "Content-Type": f"multipart/mixed; boundary={boundary}"
+    }
+    # Each call in a batch counts against the quota separately
+    response = await upstream.apost(
+        BATCH_URL,
+        idempotent=False,
+        cost=len(calls),
+        headers=headers,
+        content=build_batch_body(calls, boundary)
+    )
+    response.raise_for_status()
+    return parse_batch_response(response.content, response.headers.get("Content-Type", ""))
+
+async def create_calendar_events_async(
+    events: List[Dict],
+    use_batch: bool = True,
+    progress: Optional[ProgressCallback] = None
+) -> List[Dict]:
+    """
+    Create many calendar events with as few round trips as possible.
+
+    Events go through the Calendar batch endpoint in chunks of BATCH_MAX_ITEMS. A
+    chunk whose batch request never reached Google, and any call in it rejected
+    with 429, falls back to individual requests sent in parallel (bounded by
+    UPSTREAM_MAX_CONCURRENCY). Any other failure is reported for the affected
+    events rather than resent: Google may already have created them.
+    Args:
+        events: Keyword arguments for create_calendar_event_helper, one dict per event.
+        use_batch: Send batch requests; False goes straight to parallel requests.
+        progress: Called with (events settled, event count) after each batch.
+    Returns:
+        One result dict per event, in input order: index, ok, status and event_id/html_link or error.
+    """
+    calls = [build_event_request(**event) for event in events]
+    results: List[Optional[Dict]] = [None] * len(events)
+    fallback = []
+    if use_batch:
+        access_token = await token_manager.get_access_token_async()
+        for start in range(0, len(calls), BATCH_MAX_ITEMS):
+            chunk = calls[start:start + BATCH_MAX_ITEMS]
+            try:
+                responses = await send_event_batch(chunk, access_token)
+            except upstream.UNSENT_ERRORS:
+                fallback.extend(range(start, start + len(chunk)))
+                continue
+            except Exception as e:
+                status = getattr(getattr(e, "response", None), "status_code", 0)
+                for index in range(start, start + len(chunk)):
+                    results[index] = {"index": index, "ok": False, "status": status, "error": f"Batch request failed: {e}"}
+                await report_progress(progress, sum(r is not None for r in results), len(events))
+                continue
+            for offset in range(len(chunk)):
+                index = start + offset
+                if offset not in responses:
+                    results[index] = {"index": index, "ok": False, "status": 0, "error": "No response for this event in the batch reply"}
+                    continue
+                # Calls rejected by rate limiting were not processed; resend them with retries
+                if responses[offset][0] == 429:
+                    fallback.append(index)
+                    continue
+                status, body = responses[offset]
+                results[index] = batch_item_result(index, status, body)
+                if results[index]["ok"]:
+                    _, event, _ = calls[index]
+                    await asyncio.to_thread(event_created, body, event, events[index].get("calendar_id", "primary"))
+            await report_progress(progress, sum(r is not None for r in results), len(events))
+    else:
+        fallback = list(range(len(events)))
 
+    created = await asyncio.gather(
+        *(create_calendar_event_async(**events[i]) for i in fallback),
+        return_exceptions=True
+    )
+    for index, event in zip(fallback, created):
+        if isinstance(event, Exception):
+            status = getattr(getattr(event, "response", None), "status_code", 0)
+            results[index] = {"index": index, "ok": False, "status": status, "error": str(event)}
+        else:
+            results[index] = batch_item_result(index, 200, event)
+    if fallback:
+        await report_progress(progress, len(events), len(events))
+    return results
 
 # def get_access_token():
 #     with open("google_tokens.json", "r") as f:
@@ -219,7 +733,7 @@ def create_calendar_event_helper(
 if __name__ == "__main__":
     # get_access_token()
     # Get free slots
-    free_slots = get_free_slots("2025-04-28")
+    free_slots = get_free_slots("2025-04-28", "2025-05-04")
     
     # # Print the results
     # print(json.dumps(free_slots, indent=2))
@@ -0,0 +1,296 @@
+"""
+Compiled, memory-mappable PERMA-V catalog.
+
+Layout (all integers little-endian u32):
+
+    header      MAGIC, FORMAT_VERSION, string count, category count,
+                activity count, benefit reference count
+    strings     (string count + 1) byte offsets into the UTF-8 blob, then the blob;
+                every distinct string is stored once
+    categories  (code, name, description) string ids, first activity index and
+                activity count per category; a category's activities are contiguous
+    activities  (category index, name, description, frequency, duration_min,
+                first benefit reference, benefit count) per activity
+    benefits    string ids, referenced as contiguous runs by the activities
+    timings     parsed duration (i32 min and max minutes, -1 = none) and frequency
+                (f64 times per day and per week, NaN = none) per activity
+
+Readers only decode what they touch, and processes that map the same file
+share its pages.
+"""
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+from typing import Dict, List, Optional, Sequence
+
+from cache import TTLCache
+from schema import Activity, Category
+from timing import ActivityTiming, parse_timing
+
+MAGIC = b"PMVC"
+FORMAT_VERSION = 2
+COMPILED_SUFFIX = ".permavc"
+# Recently used activity views, kept with whatever fields they have decoded
+VIEW_CACHE_SIZE = 1024
+
+HEADER = struct.Struct("<4sIIIII")
+U32 = struct.Struct("<I")
+CATEGORY_RECORD = struct.Struct("<IIIII")
+ACTIVITY_RECORD = struct.Struct("<IIIIIII")
+TIMING_RECORD = struct.Struct("<iidd")
+
+
+def is_compiled_catalog(path: str) -> bool:
+    if path.endswith(COMPILED_SUFFIX):
+        return True
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+# ==== COMPILER ====
+
+def compile_catalog(json_path: str, out_path: Optional[str] = None) -> str:
+    """
+    Validate a PERMA-V JSON catalog against schema.Activity and write its compiled form.
+    Args:
+        json_path: Path to the source JSON catalog (top-level "PERMA-V" object).
+        out_path: Destination file (default: json_path with the .permavc suffix).
+    Returns:
+        Path of the compiled catalog.
+    """
+    if out_path is None:
+        out_path = os.path.splitext(json_path)[0] + COMPILED_SUFFIX
+    with open(json_path, "r") as f:
+        data = json.load(f).get("PERMA-V", {})
+
+    strings: List[str] = []
+    string_ids: Dict[str, int] = {}
+
+    def intern(value: str) -> int:
+        sid = string_ids.get(value)
+        if sid is None:
+            sid = string_ids[value] = len(strings)
+            strings.append(value)
+        return sid
+
+    categories = []
+    activities = []
+    benefit_refs: List[int] = []
+    timings = []
+    for cat_index, (key, value) in enumerate(data.items()):
+        category = Category(
+            category=key,
+            name=value.get("name", ""),
+            description=value.get("description", "")
+        )
+        first = len(activities)
+        for name, details in value.get("activities", {}).items():
+            activity = Activity(name=name, **details)
+            timing = parse_timing(activity.duration_min, activity.frequency)
+            timings.append((
+                -1 if timing.duration_min_minutes is None else timing.duration_min_minutes,
+                -1 if timing.duration_max_minutes is None else timing.duration_max_minutes,
+                math.nan if timing.times_per_day is None else timing.times_per_day,
+                math.nan if timing.times_per_week is None else timing.times_per_week
+            ))
+            start = len(benefit_refs)
+            benefit_refs.extend(intern(b) for b in activity.benefits)
+            activities.append((
+                cat_index,
+                intern(activity.name),
+                intern(activity.description),
+                intern(activity.frequency),
+                intern(activity.duration_min),
+                start,
+                len(activity.benefits)
+            ))
+        categories.append((
+            intern(category.category), intern(category.name), intern(category.description),
+            first, len(activities) - first
+        ))
+
+    blob = bytearray()
+    offsets = [0]
+    for value in strings:
+        blob += value.encode("utf-8")
+        offsets.append(len(blob))
+
+    out = bytearray(HEADER.pack(MAGIC, FORMAT_VERSION, len(strings), len(categories), len(activities), len(benefit_refs)))
+    out += struct.pack(f"<{len(offsets)}I", *offsets)
+    out += blob
+    for record in categories:
+        out += CATEGORY_RECORD.pack(*record)
+    for record in activities:
+        out += ACTIVITY_RECORD.pack(*record)
+    out += struct.pack(f"<{len(benefit_refs)}I", *benefit_refs)
+    for record in timings:
+        out += TIMING_RECORD.pack(*record)
+
+    # Write-then-rename so processes with the old file mapped keep a consistent view
+    tmp_path = f"{out_path}.tmp.{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(out)
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+# ==== READER ====
+
+class ActivityView:
+    """Lazy, read-only record view over one compiled activity."""
+    __slots__ = ("_catalog", "_record", "_name", "_description", "_benefits", "_frequency", "_duration_min")
+
+    def __init__(self, catalog: "CompiledCatalog", index: int):
+        self._catalog = catalog
+        self._record = ACTIVITY_RECORD.unpack_from(catalog._buf, catalog._activities_at + index * ACTIVITY_RECORD.size)
+        self._name = self._description = self._benefits = self._frequency = self._duration_min = None
+
+    @property
+    def category(self) -> str:
+        return self._catalog.category_codes[self._record[0]]
+
+    @property
+    def name(self) -> str:
+        if self._name is None:
+            self._name = self._catalog.string(self._record[1])
+        return self._name
+
+    @property
+    def description(self) -> str:
+        if self._description is None:
+            self._description = self._catalog.string(self._record[2])
+        return self._description
+
+    @property
+    def frequency(self) -> str:
+        if self._frequency is None:
+            self._frequency = self._catalog.string(self._record[3])
+        return self._frequency
+
+    @property
+    def duration_min(self) -> str:
+        if self._duration_min is None:
+            self._duration_min = self._catalog.string(self._record[4])
+        return self._duration_min
+
+    @property
+    def benefits(self) -> List[str]:
+        if self._benefits is None:
+            start, count = self._record[5], self._record[6]
+            self._benefits = [self._catalog.string(self._catalog.benefit_ref(start + i)) for i in range(count)]
+        return self._benefits
+
+
+class ActivityViews(Sequence):
+    """
+    Sequence of ActivityView records, created on access.
+
+    The VIEW_CACHE_SIZE most recently used views are kept, so repeated access to an
+    activity reuses its decoded fields while memory stays bounded for any catalog size.
+    """
+
+    def __init__(self, catalog: "CompiledCatalog"):
+        self._catalog = catalog
+        self._views = TTLCache(maxsize=VIEW_CACHE_SIZE, ttl=float("inf"))
+
+    def __len__(self) -> int:
+        return self._catalog.activity_count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("activity index out of range")
+        view = self._views.get(index)
+        if view is None:
+            view = ActivityView(self._catalog, index)
+            self._views.set(index, view)
+        return view
+
+
+class TimingViews(Sequence):
+    """Sequence of ActivityTiming tuples, decoded from the compiled file on access."""
+
+    def __init__(self, catalog: "CompiledCatalog"):
+        self._catalog = catalog
+
+    def __len__(self) -> int:
+        return self._catalog.activity_count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("activity index out of range")
+        low, high, per_day, per_week = TIMING_RECORD.unpack_from(
+            self._catalog._buf, self._catalog._timings_at + index * TIMING_RECORD.size
+        )
+        return ActivityTiming(
+            duration_min_minutes=None if low < 0 else low,
+            duration_max_minutes=None if high < 0 else high,
+            times_per_day=None if math.isnan(per_day) else per_day,
+            times_per_week=None if math.isnan(per_week) else per_week
+        )
+
+
+class CompiledCatalog:
+    """Read-only, mmap-backed view of a compiled catalog file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buf = memoryview(self._mmap)
+        magic, version, n_strings, n_categories, n_activities, n_benefits = HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a compiled PERMA-V catalog")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path} has catalog format {version}, expected {FORMAT_VERSION}")
+        self._offsets_at = HEADER.size
+        self._blob_at = self._offsets_at + (n_strings + 1) * U32.size
+        blob_size = U32.unpack_from(self._buf, self._offsets_at + n_strings * U32.size)[0]
+        self._categories_at = self._blob_at + blob_size
+        self._activities_at = self._categories_at + n_categories * CATEGORY_RECORD.size
+        self._benefits_at = self._activities_at + n_activities * ACTIVITY_RECORD.size
+        self._timings_at = self._benefits_at + n_benefits * U32.size
+        self.activity_count = n_activities
+        self.benefit_count = n_benefits
+
+        # Category metadata is tiny and needed on every call, so it is decoded up front
+        self.categories: Dict[str, Dict[str, str]] = {}
+        self.category_codes: List[str] = []
+        # Doc ids of each category's activities, as ranges rather than lists
+        self.category_ranges: Dict[str, range] = {}
+        for i in range(n_categories):
+            *sids, first, count = CATEGORY_RECORD.unpack_from(self._buf, self._categories_at + i * CATEGORY_RECORD.size)
+            code, name, description = (self.string(sid) for sid in sids)
+            self.category_codes.append(code)
+            self.categories[code] = {"name": name, "description": description}
+            self.category_ranges[code] = range(first, first + count)
+        self.activities = ActivityViews(self)
+        self.timings = TimingViews(self)
+
+    def string(self, sid: int) -> str:
+        at = self._offsets_at + sid * U32.size
+        start, end = struct.unpack_from("<II", self._buf, at)
+        return str(self._buf[self._blob_at + start:self._blob_at + end], "utf-8")
+
+    def benefit_ref(self, index: int) -> int:
+        return U32.unpack_from(self._buf, self._benefits_at + index * U32.size)[0]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print(f"Usage: python {sys.argv[0]} <catalog.json> [<out{COMPILED_SUFFIX}>]")
+        sys.exit(2)
+    print(f"Compiled catalog written to {compile_catalog(*sys.argv[1:])}")
@@ -0,0 +1,272 @@
+"""
+Local stand-in for the Google endpoints used by client.py and auth.py.
+
+Serves FreeBusy, events.insert, the Calendar batch endpoint and the OAuth token
+endpoint, with configurable latency, error rate and 429 rate limiting, so tools
+can be exercised and load tested without credentials or network access.
+
+    python fake_google.py --port 8765 --latency-ms 80 --rate-limit-rate 0.02
+    GOOGLE_API_BASE=http://127.0.0.1:8765 TOKEN_URL=http://127.0.0.1:8765/token python server.py
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+EVENTS_PATH_RE = re.compile(r"^/calendar/v3/calendars/([^/]+)/events$")
+UTC_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+
+class FakeGoogleConfig:
+    """Behaviour knobs; may be changed while the server runs."""
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: int = 1,
+        busy_per_day: int = 4,
+        token_expires_in: int = 3600,
+        seed: int = 0
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.busy_per_day = busy_per_day
+        self.token_expires_in = token_expires_in
+        self.random = random.Random(seed)
+
+
+class FakeGoogleState:
+    """Events created through the fake API, plus request counters per endpoint."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events: Dict[str, List[Dict]] = {}
+        self.requests: Dict[str, int] = {}
+
+    def count(self, endpoint: str) -> None:
+        with self.lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+
+
+def synthetic_busy(calendar_id: str, time_min: datetime, time_max: datetime, per_day: int) -> List[Tuple[datetime, datetime]]:
+    """Deterministic pseudo-random busy blocks for a calendar, between 15:00 and 04:00 UTC (daytime in the Americas)."""
+    busy = []
+    day = time_min.replace(hour=0, minute=0, second=0)
+    while day < time_max:
+        rng = random.Random(f"{calendar_id}:{day.date()}")
+        for _ in range(rng.randint(0, per_day)):
+            start = day + timedelta(hours=15, minutes=15 * rng.randint(0, 13 * 4))
+            end = start + timedelta(minutes=15 * rng.randint(1, 8))
+            if start < time_max and end > time_min:
+                busy.append((max(start, time_min), min(end, time_max)))
+        day += timedelta(days=1)
+    return sorted(busy)
+
+
+def parse_utc(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).astimezone(timezone.utc)
+
+
+class FakeGoogleHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "FakeGoogleServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    # ---- plumbing ----
+
+    def send_json(self, status: int, payload: Dict, headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def injected_failure(self) -> Optional[Tuple[int, Dict, Dict[str, str]]]:
+        """Apply configured latency, then maybe pick a 429 or 503 response."""
+        config = self.server.config
+        delay = config.latency_ms + config.random.gauss(0, config.jitter_ms) if config.jitter_ms else config.latency_ms
+        if delay > 0:
+            time.sleep(delay / 1000)
+        roll = config.random.random()
+        if roll < config.rate_limit_rate:
+            return 429, {"error": {"code": 429, "message": "Rate Limit Exceeded"}}, {"Retry-After": str(config.retry_after)}
+        if roll < config.rate_limit_rate + config.error_rate:
+            return 503, {"error": {"code": 503, "message": "Backend Error"}}, {}
+        return None
+
+    def do_POST(self):
+        raw = self.rfile.read(int(self.headers.get("Content-Length", 0) or 0))
+        url = urlsplit(self.path)
+        if url.path == "/token":
+            endpoint = "token"
+        elif url.path == "/calendar/v3/freeBusy":
+            endpoint = "freebusy"
+        elif url.path == "/batch/calendar/v3":
+            endpoint = "batch"
+        elif EVENTS_PATH_RE.match(url.path):
+            endpoint = "events"
+        else:
+            self.send_json(404, {"error": {"code": 404, "message": f"Unknown endpoint {url.path}"}})
+            return
+        self.server.state.count(endpoint)
+        failure = self.injected_failure()
+        if failure:
+            self.send_json(*failure)
+            return
+        if endpoint == "token":
+            self.send_json(200, self.server.issue_token())
+        elif endpoint == "freebusy":
+            self.send_json(200, self.server.freebusy(json.loads(raw)))
+        elif endpoint == "events":
+            self.send_json(*self.server.insert_event(EVENTS_PATH_RE.match(url.path).group(1), json.loads(raw)))
+        else:
+            self.send_batch(raw)
+
+    def send_batch(self, raw: bytes) -> None:
+        match = re.search(r'boundary="?([^";]+)"?', self.headers.get("Content-Type", ""))
+        if not match:
+            self.send_json(400, {"error": {"code": 400, "message": "Expected multipart/mixed"}})
+            return
+        out_boundary = f"batch_{uuid.uuid4().hex}"
+        parts = []
+        for part in raw.split(b"--" + match.group(1).encode()):
+            part = part.replace(b"\r\n", b"\n").strip()
+            content_id = re.search(rb"Content-ID:\s*<([^>]+)>", part, re.IGNORECASE)
+            if not content_id:
+                continue
+            _, _, http_request = part.partition(b"\n\n")
+            request_line, _, rest = http_request.partition(b"\n")
+            _, _, body = rest.partition(b"\n\n")
+            path = urlsplit(request_line.split()[1].decode()).path
+            events = EVENTS_PATH_RE.match(path)
+            if events:
+                status, payload = self.server.insert_event(events.group(1), json.loads(body))
+            else:
+                status, payload = 404, {"error": {"code": 404, "message": f"Unsupported batch call {path}"}}
+            parts.append(
+                f"--{out_boundary}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id.group(1).decode()}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status < 300 else 'Error'}\r\n"
+                "Content-Type: application/json\r\n\r\n"
+                f"{json.dumps(payload)}\r\n"
+            )
+        body = ("".join(parts) + f"--{out_boundary}--\r\n").encode()
+        self.send_response(200)
+        self.send_header("Content-Type", f"multipart/mixed; boundary={out_boundary}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeGoogleServer(ThreadingHTTPServer):
+    """Threaded fake Google server; start() serves it from a daemon thread."""
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, config: Optional[FakeGoogleConfig] = None):
+        super().__init__((host, port), FakeGoogleHandler)
+        self.config = config or FakeGoogleConfig()
+        self.state = FakeGoogleState()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def token_url(self) -> str:
+        return f"{self.base_url}/token"
+
+    def start(self) -> "FakeGoogleServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-google", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    # ---- endpoint behaviour ----
+
+    def issue_token(self) -> Dict:
+        return {
+            "access_token": f"fake-{uuid.uuid4().hex}",
+            "expires_in": self.config.token_expires_in,
+            "token_type": "Bearer"
+        }
+
+    def freebusy(self, body: Dict) -> Dict:
+        time_min, time_max = parse_utc(body["timeMin"]), parse_utc(body["timeMax"])
+        calendars = {}
+        for item in body.get("items", []):
+            calendar_id = item["id"]
+            busy = synthetic_busy(calendar_id, time_min, time_max, self.config.busy_per_day)
+            with self.state.lock:
+                created = list(self.state.events.get(calendar_id, []))
+            for event in created:
+                start, end = parse_utc(event["start"]["dateTime"]), parse_utc(event["end"]["dateTime"])
+                if start < time_max and end > time_min:
+                    busy.append((start, end))
+            calendars[calendar_id] = {
+                "busy": [{"start": s.strftime(UTC_FORMAT), "end": e.strftime(UTC_FORMAT)} for s, e in sorted(busy)]
+            }
+        return {"kind": "calendar#freeBusy", "timeMin": body["timeMin"], "timeMax": body["timeMax"], "calendars": calendars}
+
+    def insert_event(self, calendar_id: str, event: Dict) -> Tuple[int, Dict]:
+        if not event.get("summary") or "dateTime" not in event.get("start", {}) or "dateTime" not in event.get("end", {}):
+            return 400, {"error": {"code": 400, "message": "Missing summary, start or end"}}
+        event_id = uuid.uuid4().hex
+        created = dict(event, id=event_id, status="confirmed", htmlLink=f"{self.base_url}/event?eid={event_id}")
+        with self.state.lock:
+            self.state.events.setdefault(calendar_id, []).append(created)
+        return 200, created
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Google Calendar/OAuth server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="mean added latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="std deviation of the added latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--busy-per-day", type=int, default=4, help="maximum synthetic busy blocks per calendar per day")
+    args = parser.parse_args()
+    config = FakeGoogleConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        busy_per_day=args.busy_per_day
+    )
+    server = FakeGoogleServer(args.host, args.port, config)
+    print(f"Fake Google endpoints at {server.base_url} (token URL {server.token_url})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,437 @@
+import logging
+import os
+import sqlite3
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from dotenv import load_dotenv
+
+from PERMAV import catalog
+from schema import ActivityHistoryResponse, ActivityStreakResponse, CategoryHistory, HistoryEntry
+from sqlite_store import ThreadLocalConnections
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# ==== HISTORY STORE ====
+HISTORY_DB_PATH = os.environ.get(
+    "PERMAV_HISTORY_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'permav_history.sqlite3')
+)
+# Milliseconds a writer waits for another process's write lock before failing
+HISTORY_BUSY_TIMEOUT_MS = 5000
+# Status of an activity that was only proposed (plan_activities without commit)
+STATUS_PLANNED = "planned"
+# Status of an activity that exists as a calendar event
+STATUS_SCHEDULED = "scheduled"
+# Timezone that decides what "today" is for default ranges and streaks (same as client.CALENDAR_TIMEZONE)
+HISTORY_TIMEZONE = ZoneInfo("America/Los_Angeles")
+DEFAULT_HISTORY_DAYS = 7
+# Occurrences of a recurring event recorded ahead of its first one (client.MAX_RANGE_DAYS)
+RECURRENCE_HORIZON_DAYS = 92
+MAX_HISTORY_ITEMS = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS activity_history (
+    id INTEGER PRIMARY KEY,
+    event_id TEXT UNIQUE,
+    calendar_id TEXT,
+    activity TEXT NOT NULL,
+    category TEXT,
+    start_ts INTEGER NOT NULL,
+    end_ts INTEGER NOT NULL,
+    local_date TEXT NOT NULL,
+    status TEXT NOT NULL,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_history_date_category ON activity_history (local_date, category);
+CREATE INDEX IF NOT EXISTS idx_history_category_date ON activity_history (category, local_date);
+CREATE INDEX IF NOT EXISTS idx_history_start ON activity_history (start_ts);
+"""
+
+
+class HistoryRecord(NamedTuple):
+    """One created or planned activity as stored in the history database"""
+    activity: str
+    category: Optional[str]   # PERMA-V code, None if the event matched no catalog activity
+    start: datetime           # tz-aware
+    end: datetime             # tz-aware
+    local_date: str           # YYYY-MM-DD in the calendar's timezone
+    status: str
+    event_id: Optional[str] = None
+    calendar_id: Optional[str] = None
+
+
+class HistoryStore:
+    """
+    Local SQLite record of scheduled and planned activities.
+
+    The database runs in WAL mode, so history queries never wait for a writer and
+    writers never wait for readers. Each thread gets its own connection; every write
+    is a single autocommitted statement or one short transaction.
+    """
+
+    def __init__(self, path: str = HISTORY_DB_PATH):
+        self.path = path
+        self._connections = ThreadLocalConnections(path, SCHEMA, HISTORY_BUSY_TIMEOUT_MS)
+
+    def connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    # ---- writes ----
+
+    def record(self, records: Iterable[HistoryRecord]) -> int:
+        """
+        Insert records; a record whose event_id is already stored replaces it. A scheduled
+        record also removes the planned rows for the same activity at the same start.
+        Returns the count written.
+        """
+        rows = [
+            (
+                r.event_id, r.calendar_id, r.activity, r.category,
+                int(r.start.timestamp()), int(r.end.timestamp()), r.local_date, r.status, time.time()
+            )
+            for r in records
+        ]
+        if not rows:
+            return 0
+        conn = self.connection()
+        with conn:
+            conn.execute("BEGIN")
+            self._insert(conn, rows)
+        return len(rows)
+
+    def replace_planned(self, start_date: str, end_date: str, records: Iterable[HistoryRecord]) -> int:
+        """Swap every planned row dated start_date..end_date for records, in one transaction."""
+        rows = [
+            (
+                r.event_id, r.calendar_id, r.activity, r.category,
+                int(r.start.timestamp()), int(r.end.timestamp()), r.local_date, STATUS_PLANNED, time.time()
+            )
+            for r in records
+        ]
+        conn = self.connection()
+        with conn:
+            conn.execute("BEGIN")
+            conn.execute(
+                "DELETE FROM activity_history WHERE status = ? AND local_date BETWEEN ? AND ?",
+                (STATUS_PLANNED, start_date, end_date)
+            )
+            self._insert(conn, rows)
+        return len(rows)
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, rows: List[Tuple]) -> None:
+        # Booking a proposal supersedes it
+        conn.executemany(
+            "DELETE FROM activity_history WHERE status = ? AND activity = ? AND start_ts = ?",
+            [(STATUS_PLANNED, row[2], row[4]) for row in rows if row[7] == STATUS_SCHEDULED]
+        )
+        conn.executemany(
+            """
+            INSERT INTO activity_history
+                (event_id, calendar_id, activity, category, start_ts, end_ts, local_date, status, recorded_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(event_id) DO UPDATE SET
+                calendar_id = excluded.calendar_id,
+                activity = excluded.activity,
+                category = excluded.category,
+                start_ts = excluded.start_ts,
+                end_ts = excluded.end_ts,
+                local_date = excluded.local_date,
+                status = excluded.status
+            """,
+            rows
+        )
+
+    # ---- queries ----
+
+    def _filters(
+        self,
+        start_date: str,
+        end_date: str,
+        category: Optional[str],
+        include_planned: bool
+    ) -> Tuple[str, List]:
+        clauses = ["local_date BETWEEN ? AND ?"]
+        params: List = [start_date, end_date]
+        if category is not None:
+            clauses.append("category = ?")
+            params.append(category)
+        if not include_planned:
+            clauses.append("status = ?")
+            params.append(STATUS_SCHEDULED)
+        return " AND ".join(clauses), params
+
+    def entries(
+        self,
+        start_date: str,
+        end_date: str,
+        category: Optional[str] = None,
+        include_planned: bool = False,
+        limit: int = MAX_HISTORY_ITEMS
+    ) -> List[Dict]:
+        """Activities whose local date falls in [start_date, end_date], oldest first."""
+        where, params = self._filters(start_date, end_date, category, include_planned)
+        cursor = self.connection().execute(
+            f"""
+            SELECT activity, category, start_ts, end_ts, local_date, status, event_id, calendar_id
+            FROM activity_history WHERE {where} ORDER BY start_ts LIMIT ?
+            """,
+            params + [limit]
+        )
+        columns = [c[0] for c in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
+
+    def counts(
+        self,
+        start_date: str,
+        end_date: str,
+        category: Optional[str] = None,
+        include_planned: bool = False
+    ) -> Dict[Optional[str], Tuple[int, int]]:
+        """Category -> (activity count, total minutes) over a date range."""
+        where, params = self._filters(start_date, end_date, category, include_planned)
+        cursor = self.connection().execute(
+            f"""
+            SELECT category, COUNT(*), COALESCE(SUM(end_ts - start_ts), 0) / 60
+            FROM activity_history WHERE {where} GROUP BY category
+            """,
+            params
+        )
+        return {row[0]: (row[1], row[2]) for row in cursor}
+
+    def active_days(self, category: Optional[str] = None, until: Optional[str] = None) -> List[str]:
+        """Distinct local dates (newest first, up to `until`) with at least one scheduled activity."""
+        until = until or "9999-12-31"
+        if category is None:
+            cursor = self.connection().execute(
+                """
+                SELECT DISTINCT local_date FROM activity_history
+                WHERE status = ? AND local_date <= ? ORDER BY local_date DESC
+                """,
+                (STATUS_SCHEDULED, until)
+            )
+        else:
+            cursor = self.connection().execute(
+                """
+                SELECT DISTINCT local_date FROM activity_history
+                WHERE category = ? AND status = ? AND local_date <= ? ORDER BY local_date DESC
+                """,
+                (category, STATUS_SCHEDULED, until)
+            )
+        return [row[0] for row in cursor]
+
+
+def compute_streaks(days_desc: List[str], today: date) -> Tuple[int, int]:
+    """
+    Streak lengths from distinct active dates.
+    Args:
+        days_desc: YYYY-MM-DD dates, newest first, none after today.
+        today: Reference date; the current streak must include today or yesterday.
+    Returns:
+        (current streak, longest streak) in days.
+    """
+    current = longest = run = 0
+    previous: Optional[date] = None
+    in_first_run = bool(days_desc) and (today - date.fromisoformat(days_desc[0])).days <= 1
+    for value in days_desc:
+        day = date.fromisoformat(value)
+        if previous is not None and previous - day == timedelta(days=1):
+            run += 1
+        else:
+            if previous is not None:
+                in_first_run = False
+            run = 1
+        if in_first_run:
+            current = run
+        longest = max(longest, run)
+        previous = day
+    return current, longest
+
+
+history_store = HistoryStore()
+
+
+def local_date_of(start: datetime, tz: Optional[str]) -> str:
+    """Calendar date of a start time in the event's timezone (or its own UTC offset)."""
+    return (start.astimezone(ZoneInfo(tz)) if tz else start).date().isoformat()
+
+
+def catalog_category(activity: str) -> Optional[str]:
+    """PERMA-V code of the catalog activity an event summary names, if it matches one closely."""
+    snapshot = catalog.snapshot()
+    doc_id, match, _, _ = snapshot.name_lookup.lookup(activity)
+    if doc_id is None or match == "fuzzy":
+        return None
+    return snapshot.activities[doc_id].category
+
+
+def record_event(created: Dict, event: Dict, calendar_id: str) -> None:
+    """Record an event created through the Calendar API; failures are logged, never raised."""
+    try:
+        tz = event["start"].get("timeZone")
+        start = datetime.fromisoformat(event["start"]["dateTime"])
+        end = datetime.fromisoformat(event["end"]["dateTime"])
+        if tz and start.tzinfo is None:
+            # Naive dateTimes are wall-clock times in the event's timeZone
+            start, end = start.replace(tzinfo=ZoneInfo(tz)), end.replace(tzinfo=ZoneInfo(tz))
+        event_id = created.get("id")
+        occurrences = [(start, event_id)]
+        if event.get("recurrence"):
+            from recurrence import expand_recurrence
+
+            zone = ZoneInfo(tz) if tz else start.tzinfo
+            first = start.astimezone(zone)
+            try:
+                starts = expand_recurrence(event["recurrence"], first, first + timedelta(days=RECURRENCE_HORIZON_DAYS))
+            except ValueError as e:
+                # Google accepted a rule outside the subset expanded here; keep the first occurrence
+                logger.warning("Recording only the first occurrence of event %s: %s", event_id, e)
+                starts = [first]
+            # Google names recurring instances "<series id>_<UTC start>"
+            occurrences = [(s, f"{event_id}_{s.astimezone(timezone.utc):%Y%m%dT%H%M%SZ}") for s in starts]
+        activity = event.get("summary", "")
+        category = catalog_category(activity)
+        history_store.record(
+            HistoryRecord(
+                activity=activity,
+                category=category,
+                start=s,
+                end=s + (end - start),
+                local_date=local_date_of(s, tz),
+                status=STATUS_SCHEDULED,
+                event_id=occurrence_id,
+                calendar_id=calendar_id
+            )
+            for s, occurrence_id in occurrences
+        )
+    except Exception as e:
+        logger.warning("Could not record event in activity history: %s", e)
+
+
+def record_planned(start_date: str, end_date: str, planned: Iterable[Tuple[str, str, datetime, datetime]]) -> None:
+    """
+    Record activities proposed by plan_activities that were not booked.
+    Args:
+        start_date, end_date: Date range of the plan, YYYY-MM-DD. Planned rows recorded for
+            these days by an earlier preview are replaced, so previews are never counted twice.
+        planned: (activity name, category code, start, end) per proposal.
+    """
+    try:
+        history_store.replace_planned(
+            start_date,
+            end_date,
+            (
+                HistoryRecord(
+                    activity=name,
+                    category=key,
+                    start=start,
+                    end=end,
+                    local_date=start.date().isoformat(),
+                    status=STATUS_PLANNED,
+                    event_id=f"planned:{int(start.timestamp())}:{name}"
+                )
+                for name, key, start, end in planned
+            )
+        )
+    except Exception as e:
+        logger.warning("Could not record planned activities in history: %s", e)
+
+
+# ==== HISTORY QUERIES ====
+def parse_history_date(value: str, name: str) -> str:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date().isoformat()
+    except ValueError:
+        raise ValueError(f"Invalid {name} '{value}', expected YYYY-MM-DD")
+
+
+def iso_utc(timestamp: int) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+def get_activity_history_helper(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    category: Optional[str] = None,
+    include_planned: bool = False,
+    limit: int = MAX_HISTORY_ITEMS
+) -> ActivityHistoryResponse:
+    """
+    Activities recorded in the local history store; no Calendar API calls are made.
+    Args:
+        start_date: First day, YYYY-MM-DD (default: DEFAULT_HISTORY_DAYS days before end_date).
+        end_date: Last day, inclusive, YYYY-MM-DD (default: today).
+        category: PERMA-V category code or name to restrict to.
+        include_planned: Also count activities proposed by plan_activities but not booked.
+        limit: Maximum number of items listed; totals always cover the whole range.
+    Returns:
+        ActivityHistoryResponse with the activities, oldest first, and per-category totals.
+    """
+    snapshot = catalog.snapshot()
+    key = snapshot.resolve_category(category) if category else None
+    today = datetime.now(HISTORY_TIMEZONE).date()
+    end = parse_history_date(end_date, "end_date") if end_date else today.isoformat()
+    start = (
+        parse_history_date(start_date, "start_date") if start_date
+        else (date.fromisoformat(end) - timedelta(days=DEFAULT_HISTORY_DAYS - 1)).isoformat()
+    )
+    if end < start:
+        raise ValueError(f"end_date {end} is before start_date {start}")
+
+    def category_name(code: Optional[str]) -> Optional[str]:
+        return snapshot.categories[code]["name"] if code in snapshot.categories else code
+
+    rows = history_store.entries(start, end, key, include_planned, max(0, min(limit, MAX_HISTORY_ITEMS)))
+    items = [
+        HistoryEntry(
+            activity=row["activity"],
+            category=category_name(row["category"]),
+            date=row["local_date"],
+            start_time=iso_utc(row["start_ts"]),
+            end_time=iso_utc(row["end_ts"]),
+            duration_minutes=(row["end_ts"] - row["start_ts"]) // 60,
+            status=row["status"],
+            event_id=row["event_id"] if row["status"] == STATUS_SCHEDULED else None,
+            calendar_id=row["calendar_id"]
+        )
+        for row in rows
+    ]
+    totals = history_store.counts(start, end, key, include_planned)
+    by_category = [
+        CategoryHistory(category=category_name(code), count=count, minutes=minutes)
+        for code, (count, minutes) in sorted(totals.items(), key=lambda t: -t[1][0])
+    ]
+    return ActivityHistoryResponse(
+        start_date=start,
+        end_date=end,
+        items=items,
+        count=sum(count for count, _ in totals.values()),
+        by_category=by_category
+    )
+
+
+def get_activity_streak_helper(category: Optional[str] = None) -> ActivityStreakResponse:
+    """
+    Consecutive days with at least one scheduled activity, from the local history store.
+    Args:
+        category: PERMA-V category code or name (default: any category).
+    Returns:
+        ActivityStreakResponse with the current and longest streaks.
+    """
+    snapshot = catalog.snapshot()
+    key = snapshot.resolve_category(category) if category else None
+    today = datetime.now(HISTORY_TIMEZONE).date()
+    days = history_store.active_days(key, until=today.isoformat())
+    current, longest = compute_streaks(days, today)
+    return ActivityStreakResponse(
+        category=snapshot.categories[key]["name"] if key else None,
+        current_streak_days=current,
+        longest_streak_days=longest,
+        last_active_date=days[0] if days else None,
+        active_days=len(days)
+    )
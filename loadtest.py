@@ -0,0 +1,274 @@
+"""
+Concurrent load test for the MCP tools.
+
+Drives N MCP client sessions against server.mcp over the in-memory transport,
+each calling tools from a weighted mix, and reports p50/p95/p99 latency and
+throughput per tool. Google traffic goes to a local fake_google server unless
+--api-base points elsewhere.
+
+    python loadtest.py --sessions 50 --duration 30 --latency-ms 80
+    python loadtest.py --mix search_activities=5,get_availability_time=1 --json results.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional
+
+from fake_google import FakeGoogleConfig, FakeGoogleServer
+
+SEARCH_QUERIES = ["gratitude", "walk", "meditation", "friends", "sleep", "journal", "goal", "breath", "music", "volunteer"]
+CATEGORY_CODES = ["P", "E", "R", "M", "A", "V"]
+DEFAULT_MIX = {
+    "get_permav_categories": 2,
+    "get_activities": 3,
+    "search_activities": 4,
+    "get_activity_details": 2,
+    "find_activities_fitting": 2,
+    "get_availability_time": 2,
+    "create_calendar_event": 1,
+}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def build_workloads(activity_names: List[str], calendar_ids: List[str]) -> Dict[str, Callable[[random.Random], Dict]]:
+    """Tool name -> function producing randomized arguments for one call."""
+    first_day = date.today() + timedelta(days=1)
+
+    def day(rng: random.Random, spread: int = 14) -> date:
+        return first_day + timedelta(days=rng.randrange(spread))
+
+    def availability(rng: random.Random) -> Dict:
+        start = day(rng)
+        return {
+            "start_date": start.isoformat(),
+            "end_date": (start + timedelta(days=rng.choice([0, 0, 2, 6]))).isoformat(),
+            "calendar_ids": rng.sample(calendar_ids, rng.randint(1, len(calendar_ids))),
+            "min_slot_minutes": rng.choice([0, 15, 30])
+        }
+
+    def calendar_event(rng: random.Random) -> Dict:
+        start = f"{day(rng).isoformat()}T{rng.randint(8, 18):02d}:{rng.choice(['00', '30'])}:00-07:00"
+        end = start[:11] + f"{int(start[11:13]) + 1:02d}" + start[13:]
+        return {"calendar_event": {
+            "summary": rng.choice(activity_names),
+            "start_time": start,
+            "end_time": end,
+            "description": "Load test event"
+        }}
+
+    return {
+        "get_permav_categories": lambda rng: {},
+        "get_vitality_activities": lambda rng: {},
+        "get_activities": lambda rng: {"category": rng.choice(CATEGORY_CODES), "limit": rng.choice([10, 50])},
+        "search_activities": lambda rng: {"query": rng.choice(SEARCH_QUERIES)},
+        "get_activity_details": lambda rng: {"activity_name": rng.choice(activity_names)},
+        "find_activities_fitting": lambda rng: {"max_minutes": rng.choice([5, 10, 15, 30, 60])},
+        "get_availability_time": availability,
+        "create_calendar_event": calendar_event,
+        "plan_activities": lambda rng: {"date_range": f"{day(rng)}/{day(rng) + timedelta(days=13)}"},
+    }
+
+
+def parse_mix(spec: Optional[str]) -> Dict[str, float]:
+    if not spec:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+class ToolStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+
+    def summary(self, elapsed: float) -> Dict:
+        ordered = sorted(self.latencies)
+        return {
+            "calls": len(ordered),
+            "errors": self.errors,
+            "throughput_per_s": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+            "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+            "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+            "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+        }
+
+
+async def run_session(
+    mcp_server,
+    workloads: Dict[str, Callable[[random.Random], Dict]],
+    mix: Dict[str, float],
+    stats: Dict[str, ToolStats],
+    deadline: float,
+    max_calls: Optional[int],
+    seed: int
+) -> None:
+    from mcp.shared.memory import create_connected_server_and_client_session
+
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    async with create_connected_server_and_client_session(mcp_server) as session:
+        calls = 0
+        while time.perf_counter() < deadline and (max_calls is None or calls < max_calls):
+            name = rng.choices(names, weights)[0]
+            arguments = workloads[name](rng)
+            started = time.perf_counter()
+            try:
+                result = await session.call_tool(name, arguments)
+                failed = result.isError
+            except Exception:
+                failed = True
+            stats[name].latencies.append(time.perf_counter() - started)
+            stats[name].errors += failed
+            calls += 1
+
+
+async def run_load(
+    sessions: int,
+    duration: float,
+    calls_per_session: Optional[int],
+    mix: Dict[str, float],
+    calendar_ids: List[str],
+    seed: int
+) -> Dict:
+    # Imported here so the endpoint environment set up by main() is seen at import time
+    import server
+    from PERMAV import catalog
+
+    snapshot = catalog.snapshot()
+    workloads = build_workloads([entry.name for entry in snapshot.activities], calendar_ids)
+    unknown = set(mix) - set(workloads)
+    if unknown:
+        raise ValueError(f"Unknown tools in mix: {', '.join(sorted(unknown))}. Available: {', '.join(workloads)}")
+    stats = {name: ToolStats() for name in mix}
+    deadline = time.perf_counter() + (duration if calls_per_session is None else float("inf"))
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        run_session(server.mcp._mcp_server, workloads, mix, stats, deadline, calls_per_session, seed + i)
+        for i in range(sessions)
+    ))
+    elapsed = time.perf_counter() - started
+
+    total = ToolStats()
+    for tool_stats in stats.values():
+        total.latencies.extend(tool_stats.latencies)
+        total.errors += tool_stats.errors
+    return {
+        "sessions": sessions,
+        "elapsed_s": round(elapsed, 3),
+        "tools": {name: s.summary(elapsed) for name, s in stats.items() if s.latencies},
+        "total": total.summary(elapsed),
+    }
+
+
+def print_report(report: Dict) -> None:
+    print(f"{report['sessions']} sessions, {report['elapsed_s']}s")
+    header = f"{'tool':<26}{'calls':>8}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    print(header)
+    print("-" * len(header))
+    rows = list(report["tools"].items()) + [("TOTAL", report["total"])]
+    for name, s in rows:
+        print(
+            f"{name:<26}{s['calls']:>8}{s['errors']:>8}{s['throughput_per_s']:>10}"
+            f"{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}{s['max_ms']:>10}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent MCP load test")
+    parser.add_argument("--sessions", type=int, default=20, help="concurrent MCP sessions")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run (ignored with --calls)")
+    parser.add_argument("--calls", type=int, default=None, help="calls per session instead of a fixed duration")
+    parser.add_argument("--mix", default=None, help="weighted tool mix, e.g. search_activities=5,get_availability_time=1")
+    parser.add_argument("--calendars", default="primary", help="comma-separated calendar ids for availability calls")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", default=None, help="also write the report to this file")
+    parser.add_argument("--api-base", default=None, help="use this Google API base URL instead of a local fake server")
+    parser.add_argument("--token-url", default=None, help="OAuth token URL to use with --api-base")
+    parser.add_argument("--upstream-rate", type=float, default=None, help="client-side Calendar API rate limit in requests/s (0 = off)")
+    fake = parser.add_argument_group("fake server")
+    fake.add_argument("--latency-ms", type=float, default=50.0)
+    fake.add_argument("--jitter-ms", type=float, default=10.0)
+    fake.add_argument("--error-rate", type=float, default=0.0)
+    fake.add_argument("--rate-limit-rate", type=float, default=0.0)
+    fake.add_argument("--token-ttl", type=int, default=3600, help="lifetime of issued tokens; small values exercise refreshes")
+    args = parser.parse_args()
+
+    # Per-request INFO logs from the MCP server and httpx would dominate the run time
+    os.environ.setdefault("FASTMCP_LOG_LEVEL", "WARNING")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    if args.upstream_rate is not None:
+        os.environ["UPSTREAM_RATE_PER_SECOND"] = str(args.upstream_rate)
+
+    fake_server = None
+    token_dir = None
+    if args.api_base is None:
+        fake_server = FakeGoogleServer(config=FakeGoogleConfig(
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            error_rate=args.error_rate,
+            rate_limit_rate=args.rate_limit_rate,
+            token_expires_in=args.token_ttl,
+            seed=args.seed
+        )).start()
+        os.environ["GOOGLE_API_BASE"] = fake_server.base_url
+        os.environ["TOKEN_URL"] = fake_server.token_url
+        # Start from an already expired token so the first call goes through the refresh path
+        token_dir = tempfile.TemporaryDirectory()
+        token_file = os.path.join(token_dir.name, "tokens.json")
+        with open(token_file, "w") as f:
+            json.dump({"access_token": "fake-initial", "refresh_token": "fake-refresh", "token_expiry_time": time.time() - 1}, f)
+        os.environ["GOOGLE_TOKEN_FILE"] = token_file
+        # Events created against the fake server must not land in the real activity history
+        os.environ["PERMAV_HISTORY_DB"] = os.path.join(token_dir.name, "history.sqlite3")
+        # Nor may its fake tokens and FreeBusy data reach real workers through shared state
+        os.environ["SHARED_STATE_PATH"] = os.path.join(token_dir.name, "state.sqlite3")
+    else:
+        os.environ["GOOGLE_API_BASE"] = args.api_base
+        if args.token_url:
+            os.environ["TOKEN_URL"] = args.token_url
+
+    try:
+        report = asyncio.run(run_load(
+            args.sessions,
+            args.duration,
+            args.calls,
+            parse_mix(args.mix),
+            [c.strip() for c in args.calendars.split(",") if c.strip()],
+            args.seed
+        ))
+        if fake_server is not None:
+            report["upstream_requests"] = dict(fake_server.state.requests)
+    finally:
+        if fake_server is not None:
+            fake_server.stop()
+        if token_dir is not None:
+            token_dir.cleanup()
+
+    print_report(report)
+    if "upstream_requests" in report:
+        print(f"upstream requests: {report['upstream_requests']}")
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
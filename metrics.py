@@ -0,0 +1,354 @@
+import asyncio
+import functools
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import pydantic_core
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# ==== METRICS SETTINGS ====
+METRICS_PREFIX = "buddyclaude"
+# Serve Prometheus text at http://METRICS_HOST:METRICS_PORT/metrics when set
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+# Log tool calls slower than this many milliseconds with a per-phase breakdown (0 = off)
+SLOW_CALL_MS = float(os.environ.get("SLOW_CALL_MS", "0"))
+# Latency histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus layout."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (the largest bound for the overflow bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    """
+    Process-wide counters and histograms keyed by metric name and label set.
+
+    Caches registered with register_cache() are read at render time through their
+    stats() method, so they report hit ratios without any per-lookup overhead here.
+    """
+
+    def __init__(self, prefix: str = METRICS_PREFIX):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._meta: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._caches: Dict[str, Any] = {}
+
+    def describe(self, name: str, kind: str, help_text: str) -> None:
+        self._meta[name] = (kind, help_text)
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    def register_cache(self, name: str, cache: Any) -> None:
+        """Expose a cache's stats() (hits, misses, hit_ratio, size, evictions, ...) as gauges."""
+        self._caches[name] = cache
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    # ---- export ----
+
+    def render_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+
+        def header(name: str, kind: str) -> None:
+            help_text = self._meta.get(name, (kind, ""))[1]
+            lines.append(f"# HELP {self.prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {self.prefix}_{name} {kind}")
+
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                header(name, "counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{self.prefix}_{name}{format_labels(labels)} {format_value(value)}")
+            for name, series in sorted(self._histograms.items()):
+                header(name, "histogram")
+                for labels, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else format_value(bound)
+                        lines.append(f"{self.prefix}_{name}_bucket{format_labels(labels + (('le', le),))} {cumulative}")
+                    lines.append(f"{self.prefix}_{name}_sum{format_labels(labels)} {format_value(histogram.sum)}")
+                    lines.append(f"{self.prefix}_{name}_count{format_labels(labels)} {histogram.count}")
+
+        cache_stats = {name: cache.stats() for name, cache in sorted(self._caches.items())}
+        stat_names = sorted({k for stats in cache_stats.values() for k, v in stats.items() if isinstance(v, (int, float))})
+        for stat in stat_names:
+            name = f"cache_{stat}"
+            lines.append(f"# HELP {self.prefix}_{name} Cache {stat.replace('_', ' ')}")
+            lines.append(f"# TYPE {self.prefix}_{name} gauge")
+            for cache_name, stats in cache_stats.items():
+                if stat in stats:
+                    lines.append(f"{self.prefix}_{name}{format_labels((('cache', cache_name),))} {format_value(stats[stat])}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-friendly summary: per-tool and per-endpoint counts, errors, bytes and latency estimates."""
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: dict(series) for name, series in self._histograms.items()}
+
+        def summarize(prefix: str, label: str) -> Dict[str, Dict]:
+            out: Dict[str, Dict] = {}
+            for labels, histogram in histograms.get(f"{prefix}_duration_seconds", {}).items():
+                out[dict(labels)[label]] = {
+                    "calls": histogram.count,
+                    "mean_ms": round(histogram.sum / histogram.count * 1000, 3) if histogram.count else 0.0,
+                    "p50_ms_le": histogram.quantile(0.5) * 1000,
+                    "p95_ms_le": histogram.quantile(0.95) * 1000,
+                    "p99_ms_le": histogram.quantile(0.99) * 1000,
+                    "errors": 0,
+                    "bytes_in": 0,
+                    "bytes_out": 0,
+                }
+            for labels, value in counters.get(f"{prefix}_calls_total", {}).items():
+                labels = dict(labels)
+                if is_error_status(labels["status"]) and labels[label] in out:
+                    out[labels[label]]["errors"] += int(value)
+            for direction in ("in", "out"):
+                for labels, value in counters.get(f"{prefix}_bytes_{direction}_total", {}).items():
+                    name = dict(labels)[label]
+                    if name in out:
+                        out[name][f"bytes_{direction}"] = int(value)
+            return out
+
+        phases: Dict[str, Dict[str, float]] = {}
+        for labels, value in counters.get("tool_phase_seconds_total", {}).items():
+            labels = dict(labels)
+            phases.setdefault(labels["tool"], {})[labels["phase"]] = round(value, 6)
+        tools = summarize("tool", "tool")
+        for tool, tool_phases in phases.items():
+            if tool in tools:
+                tools[tool]["phase_seconds"] = tool_phases
+        return {
+            "tools": tools,
+            "upstream": summarize("upstream", "endpoint"),
+            "caches": {name: cache.stats() for name, cache in self._caches.items()},
+        }
+
+
+def is_error_status(status: str) -> bool:
+    """Tool calls record "ok"/"error"; upstream calls record the HTTP status or "error"."""
+    return status == "error" or (status.isdigit() and int(status) >= 400)
+
+
+def escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{escape_label(v)}"' for k, v in labels) + "}"
+
+
+def format_value(value: float) -> str:
+    value = float(value)
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+registry = MetricsRegistry()
+registry.describe("tool_calls_total", "counter", "MCP tool calls by outcome")
+registry.describe("tool_duration_seconds", "histogram", "MCP tool call latency, including serialization")
+registry.describe("tool_phase_seconds_total", "counter", "Time spent in each phase of MCP tool calls")
+registry.describe("tool_bytes_in_total", "counter", "Serialized size of MCP tool arguments")
+registry.describe("tool_bytes_out_total", "counter", "Serialized size of MCP tool results")
+registry.describe("upstream_calls_total", "counter", "Outbound Google API and OAuth requests by HTTP status")
+registry.describe("upstream_duration_seconds", "histogram", "Outbound Google API and OAuth request latency")
+registry.describe("upstream_bytes_out_total", "counter", "Request body bytes sent upstream")
+registry.describe("upstream_bytes_in_total", "counter", "Response bytes received from upstream")
+
+
+# ==== CALL TRACING ====
+
+# Seconds per phase for the tool call running in the current context
+_phases: ContextVar[Optional[Dict[str, float]]] = ContextVar("metrics_phases", default=None)
+
+
+@contextmanager
+def phase(name: str):
+    """Attribute the wall time of the enclosed block to a phase of the current tool call."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases = _phases.get()
+        if phases is not None:
+            phases[name] = phases.get(name, 0.0) + time.perf_counter() - started
+
+
+def upstream_endpoint(url: str) -> str:
+    """Low-cardinality endpoint label for an upstream URL (calendar ids are dropped)."""
+    path = urlsplit(url).path
+    if path.endswith("/freeBusy"):
+        return "freebusy"
+    if path.endswith("/events"):
+        return "events"
+    if "/batch/" in path:
+        return "batch"
+    if path.endswith("/token"):
+        return "token"
+    return "other"
+
+
+def record_upstream(url: str, seconds: float, response=None) -> None:
+    """
+    Record one outbound request.
+    Args:
+        url: Request URL.
+        seconds: Wall time of the request.
+        response: The httpx response, or None if the request raised.
+    """
+    endpoint = upstream_endpoint(url)
+    status = str(response.status_code) if response is not None else "error"
+    registry.inc("upstream_calls_total", endpoint=endpoint, status=status)
+    registry.observe("upstream_duration_seconds", seconds, endpoint=endpoint)
+    if response is not None:
+        registry.inc("upstream_bytes_out_total", len(response.request.content), endpoint=endpoint)
+        registry.inc("upstream_bytes_in_total", response.num_bytes_downloaded, endpoint=endpoint)
+    phases = _phases.get()
+    if phases is not None and endpoint != "token":
+        # Token requests count towards the "auth" phase instead. Concurrent requests of
+        # one tool call add up, so this can exceed the call's wall time.
+        phases["network"] = phases.get("network", 0.0) + seconds
+
+
+def instrument_tool(func: Callable) -> Callable:
+    """
+    Wrap an async MCP tool with latency, error, size and per-phase accounting.
+
+    The result is serialized here with pydantic's native JSON encoder (compact, and faster
+    than FastMCP's json.dumps fallback), so serialization time and response size are
+    measured without encoding the result twice. Tools returning pre-serialized str pass through.
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        phases: Dict[str, float] = {}
+        token = _phases.set(phases)
+        started = time.perf_counter()
+        status = "ok"
+        result = None
+        try:
+            result = await func(*args, **kwargs)
+            if result is not None and not isinstance(result, str):
+                with phase("serialization"):
+                    result = pydantic_core.to_json(result).decode()
+            return result
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            _phases.reset(token)
+            elapsed = time.perf_counter() - started
+            registry.inc("tool_calls_total", tool=name, status=status)
+            registry.observe("tool_duration_seconds", elapsed, tool=name)
+            # "ctx" is the MCP request context FastMCP injects, not a tool argument
+            arguments = {k: v for k, v in kwargs.items() if k != "ctx"}
+            registry.inc("tool_bytes_in_total", len(pydantic_core.to_json(arguments, fallback=str)), tool=name)
+            if status == "ok" and isinstance(result, str):
+                registry.inc("tool_bytes_out_total", len(result.encode()), tool=name)
+            phases["other"] = max(0.0, elapsed - sum(phases.values()))
+            for phase_name, seconds in phases.items():
+                registry.inc("tool_phase_seconds_total", seconds, tool=name, phase=phase_name)
+            if SLOW_CALL_MS and elapsed * 1000 >= SLOW_CALL_MS:
+                breakdown = ", ".join(f"{k}={v * 1000:.1f}ms" for k, v in sorted(phases.items()))
+                logger.warning("Slow tool call %s (%s): %.1f ms [%s]", name, status, elapsed * 1000, breakdown)
+
+    return wrapper
+
+
+# ==== PROMETHEUS ENDPOINT ====
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if urlsplit(self.path).path != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_metrics_server: Optional[ThreadingHTTPServer] = None
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = METRICS_HOST) -> Optional[ThreadingHTTPServer]:
+    """Serve /metrics from a daemon thread; no-op if port is 0 or the server already runs."""
+    global _metrics_server
+    if not port or _metrics_server is not None:
+        return _metrics_server
+    _metrics_server = ThreadingHTTPServer((host, port), MetricsHandler)
+    _metrics_server.daemon_threads = True
+    threading.Thread(target=_metrics_server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info("Prometheus metrics at http://%s:%d/metrics", host, port)
+    return _metrics_server
@@ -0,0 +1,317 @@
+import asyncio
+import math
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import history
+from PERMAV import catalog
+from client import (
+    CALENDAR_TZ,
+    MAX_RANGE_DAYS,
+    WORK_END_HOUR,
+    WORK_START_HOUR,
+    busy_lists_from_response,
+    create_calendar_event_async,
+    create_calendar_events_async,
+    day_bounds,
+    get_free_slots_async,
+    load_calendar_data_async,
+    union_busy
+)
+from recurrence import expand_recurrence, find_conflicts
+from results import ProgressCallback, report_progress
+from schema import (
+    ActivityPlanResponse,
+    BusyInterval,
+    PlannedActivity,
+    RecurrenceConflict,
+    RecurringScheduleResponse
+)
+
+# ==== PLANNING PARAMETERS ====
+MAX_PLAN_DAYS = MAX_RANGE_DAYS
+# Gap left between two activities planned back to back in the same free slot
+BUFFER_MINUTES = 5
+# Longer activities (e.g. "Daily Sleep Hygiene", 480 minutes) are not calendar material
+MAX_ACTIVITY_MINUTES = 120
+# Shorter activities (e.g. "Savor the Good", seconds per instance) are booked as a block this long
+MIN_ACTIVITY_MINUTES = 5
+
+
+def parse_date_range(date_range: str) -> Tuple[str, str]:
+    """
+    Parse "YYYY-MM-DD" or an ISO 8601 interval "YYYY-MM-DD/YYYY-MM-DD" (inclusive).
+    Returns:
+        (start date, end date) strings.
+    """
+    parts = [p.strip() for p in date_range.replace("..", "/").split("/")]
+    if len(parts) == 1:
+        parts.append(parts[0])
+    if len(parts) != 2:
+        raise ValueError(f"Invalid date range '{date_range}', expected YYYY-MM-DD or YYYY-MM-DD/YYYY-MM-DD")
+    start, end = (datetime.strptime(p, "%Y-%m-%d").date() for p in parts)
+    if end < start:
+        raise ValueError(f"Invalid date range '{date_range}': end is before start")
+    if (end - start).days + 1 > MAX_PLAN_DAYS:
+        raise ValueError(f"Date range '{date_range}' is longer than {MAX_PLAN_DAYS} days")
+    return start.isoformat(), end.isoformat()
+
+
+def plan_candidates(
+    categories: Optional[List[str]],
+    days: int
+) -> Dict[str, List[Tuple[int, int, int]]]:
+    """
+    Collect schedulable activities per category.
+    Returns:
+        Category code -> [(doc_id, minutes, allowed occurrences)], most frequent first.
+        Only activities with a numeric duration of at most MAX_ACTIVITY_MINUTES are schedulable.
+        Each is booked for the top of its duration range ("5-10" books 10 minutes), so the
+        activity has room to run in full, capped at MAX_ACTIVITY_MINUTES and raised to at
+        least MIN_ACTIVITY_MINUTES.
+    """
+    snapshot = catalog.snapshot()
+    keys = [snapshot.resolve_category(c) for c in categories] if categories else list(snapshot.categories)
+    candidates = {}
+    for key in dict.fromkeys(keys):
+        entries = []
+        for doc_id in snapshot.category_ids[key]:
+            timing = snapshot.timings[doc_id]
+            if timing.duration_min_minutes is None:
+                continue
+            if timing.duration_min_minutes > MAX_ACTIVITY_MINUTES:
+                continue
+            minutes = min(timing.duration_max_minutes or timing.duration_min_minutes, MAX_ACTIVITY_MINUTES)
+            minutes = max(minutes, MIN_ACTIVITY_MINUTES)
+            # Respect the activity's cadence: a weekly activity is planned about once a week
+            per_week = timing.times_per_week or 1.0
+            allowed = max(1, math.ceil(min(per_week, 7.0) * days / 7))
+            entries.append((doc_id, minutes, allowed, per_week))
+        entries.sort(key=lambda e: (-e[3], e[1]))
+        candidates[key] = [e[:3] for e in entries]
+    return candidates
+
+
+def pack_day(
+    slots: List[List[datetime]],
+    candidates: Dict[str, List[Tuple[int, int, int]]],
+    used: Dict[int, int],
+    cursors: Dict[str, int],
+    max_per_day: int
+) -> List[Tuple[int, str, datetime, datetime]]:
+    """
+    Greedily pack one day's free slots.
+
+    Categories are visited round-robin so a day mixes PERMA-V areas. Each pick goes
+    into the best-fitting slot, i.e. the one with the least room left over.
+    Args:
+        slots: Free [start, end] intervals for the day; consumed in place.
+        candidates: Output of plan_candidates.
+        used: doc_id -> occurrences planned so far; updated in place.
+        cursors: Category -> rotation position, so consecutive days vary; updated in place.
+        max_per_day: Maximum activities to plan on this day.
+    Returns:
+        List of (doc_id, category, start, end).
+    """
+    planned = []
+    placed_today = set()
+    progress = True
+    while len(planned) < max_per_day and progress:
+        progress = False
+        for key, entries in candidates.items():
+            if len(planned) >= max_per_day:
+                break
+            for step in range(len(entries)):
+                idx = (cursors.get(key, 0) + step) % len(entries)
+                doc_id, minutes, allowed = entries[idx]
+                if doc_id in placed_today or used.get(doc_id, 0) >= allowed:
+                    continue
+                length = timedelta(minutes=minutes)
+                fitting = [s for s in slots if s[1] - s[0] >= length]
+                if not fitting:
+                    continue
+                slot = min(fitting, key=lambda s: s[1] - s[0])
+                start = slot[0]
+                planned.append((doc_id, key, start, start + length))
+                slot[0] = start + length + timedelta(minutes=BUFFER_MINUTES)
+                placed_today.add(doc_id)
+                used[doc_id] = used.get(doc_id, 0) + 1
+                cursors[key] = idx + 1
+                progress = True
+                break
+    planned.sort(key=lambda p: p[2])
+    return planned
+
+
+async def plan_activities_helper(
+    date_range: str,
+    categories: Optional[List[str]] = None,
+    max_per_day: int = 2,
+    commit: bool = False,
+    progress: Optional[ProgressCallback] = None
+) -> ActivityPlanResponse:
+    """
+    Propose (and optionally book) PERMA-V activities in the free calendar time of a date range.
+    Args:
+        date_range: "YYYY-MM-DD" or "YYYY-MM-DD/YYYY-MM-DD" (inclusive).
+        categories: PERMA-V category codes or names to draw from (default: all).
+        max_per_day: Maximum activities per day.
+        commit: Create calendar events for the planned activities.
+        progress: Called with (steps done, step count): availability fetched, plan packed,
+            events created.
+    Returns:
+        ActivityPlanResponse with one item per planned activity.
+    """
+    start_date, end_date = parse_date_range(date_range)
+    first = datetime.strptime(start_date, "%Y-%m-%d")
+    days = (datetime.strptime(end_date, "%Y-%m-%d") - first).days + 1
+    candidates = plan_candidates(categories, days)
+    snapshot = catalog.snapshot()
+
+    steps = 3 if commit else 2
+    free_slots = await get_free_slots_async(start_date, end_date)
+    await report_progress(progress, 1, steps)
+    used: Dict[int, int] = {}
+    cursors: Dict[str, int] = {}
+    items = []
+    planned = []
+    for offset in range(days):
+        day = (first + timedelta(days=offset)).strftime("%Y-%m-%d")
+        slots = []
+        for slot in free_slots.get(day, []):
+            start, end = datetime.fromisoformat(slot["start"]), datetime.fromisoformat(slot["end"])
+            # Never plan into time that has already passed
+            start = max(start, datetime.now(start.tzinfo))
+            if start < end:
+                slots.append([start, end])
+        for doc_id, key, start, end in pack_day(slots, candidates, used, cursors, max(0, max_per_day)):
+            entry = snapshot.activities[doc_id]
+            planned.append((entry.name, key, start, end))
+            items.append(PlannedActivity(
+                date=day,
+                activity=entry.name,
+                category=snapshot.categories[key]["name"],
+                start_time=start.isoformat(),
+                end_time=end.isoformat(),
+                duration_minutes=int((end - start).total_seconds() // 60),
+                description=entry.description
+            ))
+
+    await report_progress(progress, 2, steps)
+
+    if commit:
+        results = await create_calendar_events_async([
+            {
+                "summary": item.activity,
+                "start_time": item.start_time,
+                "end_time": item.end_time,
+                "description": f"{item.category}: {item.description}"
+            }
+            for item in items
+        ])
+        for item, result in zip(items, results):
+            if result["ok"]:
+                item.event_id = result["event_id"]
+                item.html_link = result["html_link"]
+            else:
+                item.error = result["error"]
+    else:
+        # Booked events are recorded by client.event_created; proposals are kept as "planned"
+        await asyncio.to_thread(history.record_planned, start_date, end_date, planned)
+    await report_progress(progress, steps, steps)
+
+    return ActivityPlanResponse(
+        start_date=start_date,
+        end_date=end_date,
+        items=items,
+        count=len(items),
+        committed=commit
+    )
+
+
+async def schedule_recurring_activity_helper(
+    summary: str,
+    start_time: str,
+    end_time: str,
+    recurrence: List[str],
+    description: Optional[str] = None,
+    calendar_ids: Optional[List[str]] = None,
+    horizon_days: Optional[int] = None,
+    commit: bool = False,
+    progress: Optional[ProgressCallback] = None
+) -> RecurringScheduleResponse:
+    """
+    Check a recurring event against busy time and optionally create it.
+
+    The recurrence is expanded locally and every occurrence in the horizon is checked
+    against one FreeBusy fetch for the whole range (one request per 50 calendars),
+    instead of one availability query per occurrence.
+    Args:
+        summary: Event title, usually an activity name.
+        start_time: Start of the first occurrence, ISO 8601.
+        end_time: End of the first occurrence, ISO 8601.
+        recurrence: RRULE/EXDATE/RDATE lines, e.g. ["RRULE:FREQ=DAILY;COUNT=30"].
+        description: Event description.
+        calendar_ids: Calendars whose busy time counts as a conflict (default: ["primary"]).
+        horizon_days: Days from the first occurrence to check, at most MAX_PLAN_DAYS (the default).
+        commit: Create the recurring event in the primary calendar.
+        progress: Called with (steps done, step count): busy time checked, series created.
+    Returns:
+        RecurringScheduleResponse with each conflicting occurrence and the nearest
+        free placement on the same day.
+    """
+    if horizon_days is None:
+        horizon_days = MAX_PLAN_DAYS
+    if not 1 <= horizon_days <= MAX_PLAN_DAYS:
+        raise ValueError(f"horizon_days must be between 1 and {MAX_PLAN_DAYS}")
+    start, end = (datetime.fromisoformat(t) for t in (start_time, end_time))
+    # Occurrences keep their wall-clock time in the calendar timezone across DST changes
+    start, end = (t.replace(tzinfo=CALENDAR_TZ) if t.tzinfo is None else t.astimezone(CALENDAR_TZ) for t in (start, end))
+    if end <= start:
+        raise ValueError("end_time must be after start_time")
+    first_day = start.date()
+    window_end = day_bounds((first_day + timedelta(days=horizon_days - 1)).isoformat())[1]
+    length = end - start
+    occurrences = [(s, s + length) for s in expand_recurrence(recurrence, start, window_end)]
+
+    conflicts = []
+    if occurrences:
+        last_day = min(occurrences[-1][1].date(), first_day + timedelta(days=MAX_RANGE_DAYS - 1))
+        data = await load_calendar_data_async(first_day.isoformat(), last_day.isoformat(), calendar_ids)
+        busy = union_busy(busy_lists_from_response(data, calendar_ids))
+        for conflict in find_conflicts(occurrences, busy, WORK_START_HOUR, WORK_END_HOUR):
+            suggested = conflict.suggested_start
+            conflicts.append(RecurrenceConflict(
+                start_time=conflict.start.isoformat(),
+                end_time=conflict.end.isoformat(),
+                busy=[BusyInterval(start=s.isoformat(), end=e.isoformat()) for s, e in conflict.busy],
+                suggested_start_time=suggested.isoformat() if suggested else None,
+                suggested_end_time=(suggested + length).isoformat() if suggested else None,
+                shift_minutes=int((suggested - conflict.start).total_seconds() // 60) if suggested else None
+            ))
+
+    response = RecurringScheduleResponse(
+        summary=summary,
+        recurrence=recurrence,
+        window_start=first_day.isoformat(),
+        window_end=(window_end.date() - timedelta(days=1)).isoformat(),
+        occurrences=len(occurrences),
+        first_occurrence=occurrences[0][0].isoformat() if occurrences else None,
+        last_occurrence=occurrences[-1][0].isoformat() if occurrences else None,
+        conflicts=conflicts,
+        conflict_count=len(conflicts),
+        committed=commit
+    )
+    await report_progress(progress, 1, 2 if commit else 1)
+    if commit:
+        created = await create_calendar_event_async(
+            summary=summary,
+            start_time=start,
+            end_time=end,
+            description=description,
+            recurrence=recurrence
+        )
+        response.event_id = created.get("id")
+        response.html_link = created.get("htmlLink")
+        await report_progress(progress, 2, 2)
+    return response
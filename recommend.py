@@ -0,0 +1,154 @@
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from search import FIELD_WEIGHTS, tokenize
+
+# ==== RECOMMENDER PARAMETERS ====
+# Suffixes stripped so that "stressed"/"stress" or "walks"/"walking" share a feature
+STEM_SUFFIXES = ("ing", "ed", "es", "s")
+MIN_STEM_LEN = 3
+# Upper bound on goals x activities scored in one multiply; larger batches are chunked
+BATCH_MAX_CELLS = 4_000_000
+
+
+@lru_cache(maxsize=65536)
+def stem(token: str) -> str:
+    for suffix in STEM_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM_LEN:
+            return token[:-len(suffix)]
+    return token
+
+
+def terms(text: str) -> List[str]:
+    return [stem(t) for t in tokenize(text)]
+
+
+class Recommender:
+    """
+    TF-IDF matrix over catalog activities, scored against free-text goals by cosine similarity.
+
+    The activity x term matrix is stored column-wise (CSC: indptr, doc_ids, weights) in
+    NumPy arrays, with rows L2-normalised. A goal only has a handful of terms, so the
+    matrix-vector product is one gather of those columns plus one np.bincount; top-k
+    selection is an np.argpartition over the score vector.
+    """
+
+    def __init__(self, documents: Iterable[Dict[str, Sequence[str]]], doc_categories: Sequence[int], n_categories: int):
+        """
+        Args:
+            documents: One mapping per activity from field name (see search.FIELD_WEIGHTS)
+                to its text pieces. Document ids are list positions.
+            doc_categories: Category index of each document.
+            n_categories: Number of categories (the size of a category weight vector).
+        """
+        self.term_ids: Dict[str, int] = {}
+        term_ids = self.term_ids
+        rows: List[int] = []
+        cols: List[int] = []
+        tfs: List[float] = []
+        for doc_id, doc in enumerate(documents):
+            counts: Dict[int, float] = {}
+            for field, weight in FIELD_WEIGHTS.items():
+                for piece in doc.get(field, ()):
+                    for token in tokenize(piece):
+                        term = term_ids.setdefault(stem(token), len(term_ids))
+                        counts[term] = counts.get(term, 0.0) + weight
+            rows.extend([doc_id] * len(counts))
+            cols.extend(counts)
+            tfs.extend(counts.values())
+
+        self.doc_categories = np.asarray(doc_categories, dtype=np.intp)
+        self.size = len(self.doc_categories)
+        self.n_categories = n_categories
+        rows_arr = np.asarray(rows, dtype=np.intp)
+        cols_arr = np.asarray(cols, dtype=np.intp)
+        df = np.bincount(cols_arr, minlength=len(self.term_ids))
+        # Smoothed idf and sublinear tf, as in scikit-learn's TfidfVectorizer
+        self.idf = np.log((1 + self.size) / (1 + df)) + 1.0
+        values = (1.0 + np.log(np.asarray(tfs, dtype=np.float64))) * self.idf[cols_arr]
+        norms = np.sqrt(np.bincount(rows_arr, weights=values * values, minlength=self.size))
+        values /= np.where(norms > 0, norms, 1.0)[rows_arr]
+
+        order = np.argsort(cols_arr, kind="stable")
+        self.indptr = np.concatenate(([0], np.cumsum(df)))
+        self.doc_ids = rows_arr[order]
+        self.weights = values[order]
+
+    def query_vector(self, goal: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Sparse, L2-normalised TF-IDF vector of a goal as (term ids, weights); unknown terms are dropped."""
+        counts = Counter(t for t in terms(goal) if t in self.term_ids)
+        if not counts:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        ids = np.fromiter((self.term_ids[t] for t in counts), dtype=np.intp, count=len(counts))
+        values = (1.0 + np.log(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))) * self.idf[ids]
+        return ids, values / np.linalg.norm(values)
+
+    def _gather(self, goal: str, offset: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        """Matrix entries touched by a goal: (row ids shifted by offset, products with the query)."""
+        ids, q = self.query_vector(goal)
+        if not len(ids):
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        # Columns are contiguous slices, which concatenate much faster than fancy indexing
+        spans = [(self.indptr[i], self.indptr[i + 1]) for i in ids]
+        rows = np.concatenate([self.doc_ids[start:end] for start, end in spans])
+        values = np.concatenate([self.weights[start:end] * weight for (start, end), weight in zip(spans, q)])
+        return (rows + offset if offset else rows), values
+
+    def category_vector(self, category_weights: Optional[Dict[int, float]]) -> Optional[np.ndarray]:
+        """Per-activity multiplier from category index -> weight (unlisted categories keep 1.0)."""
+        if not category_weights:
+            return None
+        per_category = np.ones(self.n_categories)
+        for index, weight in category_weights.items():
+            per_category[index] = weight
+        return per_category[self.doc_categories]
+
+    def recommend(
+        self,
+        goal: str,
+        top_k: int = 5,
+        category_weights: Optional[Dict[int, float]] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Score every activity against one goal.
+        Args:
+            goal: Free-text goal, e.g. "sleep better and feel less stressed".
+            top_k: Number of results.
+            category_weights: Category index -> ranking multiplier; 0 excludes a category.
+        Returns:
+            List of (doc_id, cosine similarity) pairs, best first by weighted similarity.
+            Only activities whose weighted similarity is above 0 are listed.
+        """
+        return self.recommend_batch([goal], top_k, category_weights)[0]
+
+    def recommend_batch(
+        self,
+        goals: Sequence[str],
+        top_k: int = 5,
+        category_weights: Optional[Dict[int, float]] = None
+    ) -> List[List[Tuple[int, float]]]:
+        """Like recommend() for many goals; each chunk of goals is scored with one bincount."""
+        if not self.size or top_k <= 0:
+            return [[] for _ in goals]
+        multiplier = self.category_vector(category_weights)
+        k = min(top_k, self.size)
+        chunk = max(1, BATCH_MAX_CELLS // self.size)
+        results = []
+        for first in range(0, len(goals), chunk):
+            batch = goals[first:first + chunk]
+            gathered = [self._gather(goal, i * self.size) for i, goal in enumerate(batch)]
+            scores = np.bincount(
+                np.concatenate([rows for rows, _ in gathered]),
+                weights=np.concatenate([values for _, values in gathered]),
+                minlength=len(batch) * self.size
+            ).reshape(len(batch), self.size)
+            # Weights decide the order; the reported score stays the raw similarity in [0, 1]
+            ranking = scores * multiplier if multiplier is not None else scores
+            top = np.argpartition(-ranking, k - 1, axis=1)[:, :k] if k < self.size else np.tile(np.arange(self.size), (len(batch), 1))
+            for row, similarity, candidates in zip(ranking, scores, top):
+                ranked = candidates[np.lexsort((candidates, -row[candidates]))]
+                results.append([(int(i), float(similarity[i])) for i in ranked if row[i] > 0])
+        return results
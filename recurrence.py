@@ -0,0 +1,327 @@
+import calendar
+import re
+from bisect import bisect_right
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+from zoneinfo import ZoneInfo
+
+# ==== RRULE EXPANSION ====
+# The subset of RFC 5545 that Google Calendar clients commonly send. Anything outside it
+# raises ValueError rather than being expanded wrongly.
+WEEKDAYS = {"MO": 0, "TU": 1, "WE": 2, "TH": 3, "FR": 4, "SA": 5, "SU": 6}
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+SUPPORTED_PARTS = {"FREQ", "INTERVAL", "COUNT", "UNTIL", "BYDAY", "BYMONTHDAY", "WKST"}
+BYDAY_RE = re.compile(r"^([+-]?\d{1,2})?(MO|TU|WE|TH|FR|SA|SU)$")
+# Hard stop for rules whose filters never match within the window (e.g. BYMONTHDAY=31 every 12 months from April)
+MAX_PERIODS = 10000
+
+
+class RecurrenceRule(NamedTuple):
+    """Parsed RRULE"""
+    freq: str
+    interval: int
+    count: Optional[int]
+    until: Optional[datetime]                # tz-aware
+    by_day: Tuple[Tuple[int, int], ...]      # (ordinal or 0, weekday)
+    by_month_day: Tuple[int, ...]
+    week_start: int = 0                      # WKST weekday, Monday by default
+
+
+def parse_ical_datetime(value: str, tz: ZoneInfo) -> datetime:
+    """Parse an iCalendar DATE ("20261231") or DATE-TIME ("20261231T090000", optionally with Z)."""
+    try:
+        if "T" not in value:
+            return datetime.strptime(value, "%Y%m%d").replace(hour=23, minute=59, second=59, tzinfo=tz)
+        if value.endswith("Z"):
+            return datetime.strptime(value, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+        return datetime.strptime(value, "%Y%m%dT%H%M%S").replace(tzinfo=tz)
+    except ValueError:
+        raise ValueError(f"Invalid iCalendar date '{value}'")
+
+
+def parse_rrule(rule: str, tz: ZoneInfo) -> RecurrenceRule:
+    """
+    Parse "RRULE:FREQ=WEEKLY;BYDAY=MO,WE;COUNT=10" (the "RRULE:" prefix is optional).
+    Args:
+        rule: RRULE line.
+        tz: Timezone of floating UNTIL values.
+    """
+    body = rule.split(":", 1)[1] if rule.upper().startswith("RRULE:") else rule
+    parts: Dict[str, str] = {}
+    for item in body.strip().split(";"):
+        if not item:
+            continue
+        name, _, value = item.partition("=")
+        parts[name.strip().upper()] = value.strip().upper()
+    unsupported = set(parts) - SUPPORTED_PARTS
+    if unsupported:
+        raise ValueError(f"Unsupported RRULE part(s) {', '.join(sorted(unsupported))} in '{rule}'")
+    freq = parts.get("FREQ")
+    if freq not in FREQUENCIES:
+        raise ValueError(f"Unsupported RRULE FREQ '{freq}' in '{rule}'; expected one of {', '.join(FREQUENCIES)}")
+
+    by_day = []
+    for item in filter(None, parts.get("BYDAY", "").split(",")):
+        match = BYDAY_RE.match(item)
+        if not match:
+            raise ValueError(f"Invalid BYDAY value '{item}' in '{rule}'")
+        ordinal = int(match.group(1) or 0)
+        if ordinal and freq != "MONTHLY":
+            raise ValueError(f"Ordinal BYDAY '{item}' is only supported with FREQ=MONTHLY")
+        by_day.append((ordinal, WEEKDAYS[match.group(2)]))
+    try:
+        by_month_day = tuple(int(v) for v in filter(None, parts.get("BYMONTHDAY", "").split(",")))
+        interval = int(parts.get("INTERVAL", "1"))
+        count = int(parts["COUNT"]) if "COUNT" in parts else None
+    except ValueError:
+        raise ValueError(f"Invalid number in '{rule}'")
+    if interval < 1:
+        raise ValueError(f"INTERVAL must be at least 1 in '{rule}'")
+    if by_month_day and freq != "MONTHLY":
+        raise ValueError("BYMONTHDAY is only supported with FREQ=MONTHLY")
+    week_start = parts.get("WKST", "MO")
+    if week_start not in WEEKDAYS:
+        raise ValueError(f"Invalid WKST value '{week_start}' in '{rule}'")
+    return RecurrenceRule(
+        freq=freq,
+        interval=interval,
+        count=count,
+        until=parse_ical_datetime(parts["UNTIL"], tz) if "UNTIL" in parts else None,
+        by_day=tuple(by_day),
+        by_month_day=by_month_day,
+        week_start=WEEKDAYS[week_start]
+    )
+
+
+def month_days(rule: RecurrenceRule, year: int, month: int, default_day: int) -> List[int]:
+    """
+    Days of one month selected by a MONTHLY rule, ascending.
+
+    With both BYMONTHDAY and BYDAY, a day must match both (RFC 5545), so
+    BYDAY=FR;BYMONTHDAY=13 selects Friday the 13ths.
+    """
+    length = calendar.monthrange(year, month)[1]
+    if not rule.by_month_day and not rule.by_day:
+        # RFC 5545: months without the start's day of month are skipped, not clamped
+        return [default_day] if default_day <= length else []
+    by_month_day = set()
+    for value in rule.by_month_day:
+        day = value if value > 0 else length + value + 1
+        if 1 <= day <= length:
+            by_month_day.add(day)
+    by_day = set()
+    for ordinal, weekday in rule.by_day:
+        first = (weekday - date(year, month, 1).weekday()) % 7 + 1
+        matches = list(range(first, length + 1, 7))
+        if ordinal == 0:
+            by_day.update(matches)
+        elif -len(matches) <= ordinal <= len(matches):
+            by_day.add(matches[ordinal - 1] if ordinal > 0 else matches[ordinal])
+    if rule.by_month_day and rule.by_day:
+        return sorted(by_month_day & by_day)
+    return sorted(by_month_day or by_day)
+
+
+def iter_rule_dates(rule: RecurrenceRule, first: date) -> Iterator[date]:
+    """Dates generated by a rule, ascending and starting at `first`; unbounded unless the periods run out."""
+    # Weekdays in the order they fall within a week that begins on WKST
+    weekdays = sorted({weekday for _, weekday in rule.by_day}, key=lambda d: (d - rule.week_start) % 7)
+    for period in range(MAX_PERIODS):
+        if rule.freq == "DAILY":
+            day = first + timedelta(days=period * rule.interval)
+            if not weekdays or day.weekday() in weekdays:
+                yield day
+        elif rule.freq == "WEEKLY":
+            # WKST decides which weeks an INTERVAL > 1 rule skips
+            week_start = first - timedelta(days=(first.weekday() - rule.week_start) % 7)
+            week_start += timedelta(weeks=period * rule.interval)
+            for weekday in weekdays or [first.weekday()]:
+                day = week_start + timedelta(days=(weekday - rule.week_start) % 7)
+                if day >= first:
+                    yield day
+        elif rule.freq == "MONTHLY":
+            index = first.month - 1 + period * rule.interval
+            year, month = first.year + index // 12, index % 12 + 1
+            if year > date.max.year:
+                return
+            for day_of_month in month_days(rule, year, month, first.day):
+                day = date(year, month, day_of_month)
+                if day >= first:
+                    yield day
+        else:
+            year = first.year + period * rule.interval
+            if year > date.max.year:
+                return
+            if first.day <= calendar.monthrange(year, first.month)[1]:
+                yield date(year, first.month, first.day)
+
+
+def expand_rrule(rule: RecurrenceRule, dtstart: datetime, window_end: datetime) -> Iterator[datetime]:
+    """
+    Occurrence start times of one rule, in order, up to (excluding) window_end.
+
+    Occurrences keep dtstart's wall-clock time in its timezone, so a 09:00 series stays
+    at 09:00 across daylight saving changes, as Google Calendar does.
+    """
+    produced = 0
+    for day in iter_rule_dates(rule, dtstart.date()):
+        start = datetime.combine(day, dtstart.timetz())
+        if rule.until is not None and start > rule.until:
+            return
+        if rule.count is not None and produced >= rule.count:
+            return
+        if start >= window_end:
+            return
+        produced += 1
+        yield start
+
+
+def parse_date_list(line: str, tz: ZoneInfo) -> List[Union[date, datetime]]:
+    """
+    Values of an EXDATE/RDATE line such as "EXDATE;TZID=Europe/Paris:20261020T090000,20261021T090000".
+    Date-only values ("EXDATE;VALUE=DATE:20261020") are returned as dates.
+    """
+    head, _, values = line.partition(":")
+    for param in head.split(";")[1:]:
+        name, _, value = param.partition("=")
+        if name.upper() == "TZID":
+            tz = ZoneInfo(value)
+    parsed = []
+    for value in filter(None, (v.strip() for v in values.split(","))):
+        moment = parse_ical_datetime(value, tz)
+        parsed.append(moment if "T" in value else moment.date())
+    return parsed
+
+
+def expand_recurrence(
+    recurrence: Sequence[str],
+    dtstart: datetime,
+    window_end: datetime,
+    max_occurrences: Optional[int] = None
+) -> List[datetime]:
+    """
+    Expand a Google Calendar "recurrence" list (RRULE, EXDATE and RDATE lines).
+    Args:
+        recurrence: Lines as sent in an event's "recurrence" field.
+        dtstart: tz-aware start of the first occurrence.
+        window_end: Occurrences starting at or after this are not generated.
+        max_occurrences: Stop after this many occurrences.
+    Returns:
+        Sorted, de-duplicated occurrence start times.
+    """
+    if dtstart.tzinfo is None:
+        raise ValueError("dtstart must be timezone-aware")
+    tz = dtstart.tzinfo if isinstance(dtstart.tzinfo, ZoneInfo) else ZoneInfo("UTC")
+    starts = set()
+    excluded = set()
+    excluded_days = set()
+    rules = 0
+    for line in recurrence:
+        kind = line.split(":", 1)[0].split(";", 1)[0].strip().upper()
+        if kind == "RRULE":
+            rules += 1
+            starts.update(expand_rrule(parse_rrule(line, tz), dtstart, window_end))
+        elif kind == "EXDATE":
+            for value in parse_date_list(line, tz):
+                # A date-only EXDATE drops whatever occurrence falls on that (local) day
+                (excluded if isinstance(value, datetime) else excluded_days).add(value)
+        elif kind == "RDATE":
+            for value in parse_date_list(line, tz):
+                if not isinstance(value, datetime):
+                    value = datetime.combine(value, dtstart.timetz())
+                if value < window_end:
+                    starts.add(value)
+        else:
+            raise ValueError(f"Unsupported recurrence line '{line}'; expected RRULE, EXDATE or RDATE")
+    if not rules:
+        starts.add(dtstart)
+    occurrences = sorted(
+        local for local in (s.astimezone(dtstart.tzinfo) for s in starts)
+        if local not in excluded and local.date() not in excluded_days
+    )
+    return occurrences[:max_occurrences] if max_occurrences is not None else occurrences
+
+
+# ==== CONFLICT DETECTION ====
+class Conflict(NamedTuple):
+    """An occurrence overlapping busy time, with the nearest free placement on the same day"""
+    start: datetime
+    end: datetime
+    busy: List[Tuple[datetime, datetime]]           # Busy intervals it overlaps
+    suggested_start: Optional[datetime]             # None when the day has no gap long enough
+
+
+def overlapping(
+    busy: Sequence[Tuple[datetime, datetime]],
+    busy_ends: Sequence[datetime],
+    start: datetime,
+    end: datetime
+) -> List[Tuple[datetime, datetime]]:
+    """Intervals of a sorted, merged busy list that overlap [start, end); busy_ends is their end times."""
+    i = bisect_right(busy_ends, start)
+    hits = []
+    while i < len(busy) and busy[i][0] < end:
+        hits.append(busy[i])
+        i += 1
+    return hits
+
+
+def nearest_free_start(
+    busy: Sequence[Tuple[datetime, datetime]],
+    busy_ends: Sequence[datetime],
+    start: datetime,
+    length: timedelta,
+    day_start: datetime,
+    day_end: datetime
+) -> Optional[datetime]:
+    """Start closest to `start` at which `length` fits in a gap of the merged busy list within [day_start, day_end)."""
+    best = None
+    cursor = day_start
+    i = bisect_right(busy_ends, day_start)
+    while cursor < day_end:
+        gap_end = min(busy[i][0], day_end) if i < len(busy) else day_end
+        if gap_end - cursor >= length:
+            candidate = min(max(start, cursor), gap_end - length)
+            if best is None or abs(candidate - start) < abs(best - start):
+                best = candidate
+        if i >= len(busy):
+            break
+        cursor = max(cursor, busy[i][1])
+        i += 1
+    return best
+
+
+def find_conflicts(
+    occurrences: Sequence[Tuple[datetime, datetime]],
+    busy: Sequence[Tuple[datetime, datetime]],
+    work_start: int,
+    work_end: int
+) -> List[Conflict]:
+    """
+    Check occurrences against busy time with binary searches over the sorted busy intervals.
+
+    Each occurrence costs O(log B + overlaps), so a quarter of daily occurrences against
+    thousands of busy blocks is checked in well under a millisecond per occurrence.
+    Args:
+        occurrences: (start, end) pairs.
+        busy: Sorted, merged busy [start, end] intervals (client.union_busy output).
+        work_start: First hour a suggested shift may start at (in the occurrence's timezone).
+        work_end: Hour by which a suggested shift must end.
+    Returns:
+        One Conflict per overlapping occurrence, in occurrence order.
+    """
+    busy_ends = [e for _, e in busy]
+    conflicts = []
+    for start, end in occurrences:
+        hits = overlapping(busy, busy_ends, start, end)
+        if not hits:
+            continue
+        day_start = start.replace(hour=work_start, minute=0, second=0, microsecond=0)
+        day_end = start.replace(hour=work_end, minute=0, second=0, microsecond=0)
+        conflicts.append(Conflict(
+            start=start,
+            end=end,
+            busy=[(s, e) for s, e in hits],
+            suggested_start=nearest_free_start(busy, busy_ends, start, end - start, day_start, day_end)
+        ))
+    return conflicts
@@ -0,0 +1,54 @@
+import base64
+import binascii
+import json
+from itertools import islice
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+# ==== OPAQUE CURSORS ====
+# Bumped whenever the state stored in cursors changes shape; older cursors are then rejected
+CURSOR_VERSION = 1
+
+T = TypeVar("T")
+# ctx.report_progress-compatible callback: (progress, total)
+ProgressCallback = Callable[[float, Optional[float]], Awaitable[None]]
+
+
+def encode_cursor(kind: str, **state: Any) -> str:
+    """
+    Pack the state needed to resume a listing into an opaque, URL-safe token.
+    Args:
+        kind: Listing the cursor belongs to, checked on decode.
+        state: JSON-serializable resume state.
+    """
+    payload = json.dumps({"k": kind, "v": CURSOR_VERSION, **state}, separators=(",", ":"), sort_keys=True)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, kind: str) -> Dict[str, Any]:
+    """Unpack a cursor from encode_cursor; raises ValueError if it is malformed or from another listing."""
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor; pass next_cursor from a previous reply unchanged")
+    if not isinstance(state, dict) or state.get("k") != kind:
+        raise ValueError(f"Cursor does not belong to a {kind} listing")
+    if state.get("v") != CURSOR_VERSION:
+        raise ValueError("Cursor has expired; start again without a cursor")
+    return state
+
+
+# ==== PAGING ====
+def take_page(items: Iterable[T], limit: int) -> Tuple[List[T], bool]:
+    """
+    Pull at most limit items from a (lazy) iterable.
+    Returns:
+        (items, whether more remain). One item past the page is read to tell.
+    """
+    page = list(islice(items, limit + 1))
+    return page[:limit], len(page) > limit
+
+
+async def report_progress(progress: Optional[ProgressCallback], done: float, total: Optional[float] = None) -> None:
+    """Send a progress update if the caller asked for them."""
+    if progress is not None:
+        await progress(done, total)
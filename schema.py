@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional
 from pydantic import Field
 
 # # Pydantic models
@@ -10,6 +10,11 @@ class Activity(BaseModel):
     benefits: List[str]
     frequency: str
     duration_min: str
+    # Parsed from duration_min / frequency when the catalog loads; None when not numeric
+    duration_min_minutes: Optional[int] = None
+    duration_max_minutes: Optional[int] = None  # None also for open-ended durations ("30+")
+    times_per_day: Optional[float] = None
+    times_per_week: Optional[float] = None
 
 class CategoryActivity(Activity):
     """Activity with category information"""
@@ -25,17 +30,71 @@ class ActivityDetail(Activity):
     """Detailed view of an activity including the category it belongs to"""
     category: str
 
+class ActivityLookupResponse(BaseModel):
+    """Response model for activity lookup by name"""
+    query: str
+    activity: Optional[ActivityDetail] = None  # None when nothing is close enough
+    match: str   # "exact", "normalized", "fuzzy" (did you mean) or "none"
+    score: float  # 1.0 for exact/normalized matches, trigram similarity otherwise
+    suggestions: List[str] = []  # Other close activity names, best first
+
 class ActivitiesResponse(BaseModel):
     """Response model for activities list endpoints"""
     activities: List[Activity]
+    etag: Optional[str] = None  # Catalog version tag; pass back as if_none_match
+
+class ActivityPageResponse(BaseModel):
+    """Response model for one page of a category's activities"""
+    category: str  # Single letter code (P, E, R, M, A, V)
+    activities: List[Dict[str, Any]]  # Activity records, projected to the requested fields
+    total: int
+    offset: int
+    next_offset: Optional[int] = None  # Pass as offset to fetch the next page; None on the last page
+    next_cursor: Optional[str] = None  # Opaque; pass as cursor to fetch the next page
+    catalog_version: int
+    etag: Optional[str] = None  # Catalog version tag; pass back as if_none_match
 
 class CategoriesResponse(BaseModel):
     """Response model for categories list endpoint"""
     categories: List[Category]
+    etag: Optional[str] = None  # Catalog version tag; pass back as if_none_match
+
+class NotModifiedResponse(BaseModel):
+    """Reply to a catalog call whose if_none_match still matches the current catalog"""
+    not_modified: bool = True
+    etag: str
+
+class ActivitySearchResult(CategoryActivity):
+    """Search hit with its relevance score"""
+    score: float
 
 class ActivitySearchResponse(BaseModel):
     """Response model for activity search endpoint"""
-    results: List[CategoryActivity]
+    results: List[ActivitySearchResult]
+    count: int
+
+class ActivityRecommendation(CategoryActivity):
+    """Recommended activity with its similarity to the goal (0-1)"""
+    score: float
+
+class RecommendationResponse(BaseModel):
+    """Response model for goal-based recommendations"""
+    goal: str
+    results: List[ActivityRecommendation]
+    count: int
+
+class RecommendationBatchResponse(BaseModel):
+    """Response model for recommendations for several goals"""
+    goals: List[RecommendationResponse]
+
+class FittingActivity(CategoryActivity):
+    """Activity that can be done within a time budget"""
+    fits_fully: bool  # True when even the longest duration fits, not just the shortest
+
+class ActivityFitResponse(BaseModel):
+    """Response model for time-fit activity queries"""
+    max_minutes: int
+    results: List[FittingActivity]
     count: int
 
 class ErrorResponse(BaseModel):
@@ -47,4 +106,114 @@ class CalendarEvent(BaseModel):
     summary: str = Field(..., description="Summary of the event")
     start_time: str = Field(..., description="Start time of the event in ISO 8601 format")
     end_time: str = Field(..., description="End time of the event in ISO 8601 format")
-    description: str = Field(..., description="Description of the event")
\ No newline at end of file
+    description: str = Field(..., description="Description of the event")
+    recurrence: Optional[List[str]] = Field(None, description='RRULE/EXDATE/RDATE lines for a recurring event, e.g. ["RRULE:FREQ=DAILY;COUNT=30"]')
+
+class PlannedActivity(BaseModel):
+    """Activity placed into a free calendar slot"""
+    date: str  # YYYY-MM-DD
+    activity: str
+    category: str
+    start_time: str = Field(..., description="Start time in ISO 8601 format")
+    end_time: str = Field(..., description="End time in ISO 8601 format")
+    duration_minutes: int
+    description: str
+    # Filled in when the plan is committed to the calendar
+    event_id: Optional[str] = None
+    html_link: Optional[str] = None
+    error: Optional[str] = None
+
+class ActivityPlanResponse(BaseModel):
+    """Response model for activity planning"""
+    start_date: str
+    end_date: str
+    items: List[PlannedActivity]
+    count: int
+    committed: bool
+
+class CalendarEventResult(BaseModel):
+    """Outcome of creating one event in a batch"""
+    index: int  # Position of the event in the request
+    ok: bool
+    status: int  # HTTP status of the individual insert (0 when no response was received)
+    event_id: Optional[str] = None
+    html_link: Optional[str] = None
+    error: Optional[str] = None
+
+class CalendarEventsResponse(BaseModel):
+    """Response model for batch event creation"""
+    results: List[CalendarEventResult]
+    created: int
+    failed: int
+
+class HistoryEntry(BaseModel):
+    """One activity from the local history store"""
+    activity: str
+    category: Optional[str] = None  # Category name; None if the event matched no catalog activity
+    date: str
+    start_time: str = Field(..., description="Start time in ISO 8601 format (UTC)")
+    end_time: str = Field(..., description="End time in ISO 8601 format (UTC)")
+    duration_minutes: int
+    status: str  # "scheduled" (calendar event exists) or "planned" (proposed, not booked)
+    event_id: Optional[str] = None
+    calendar_id: Optional[str] = None
+
+class CategoryHistory(BaseModel):
+    """Activity totals for one category"""
+    category: Optional[str] = None
+    count: int
+    minutes: int
+
+class ActivityHistoryResponse(BaseModel):
+    """Response model for history queries"""
+    start_date: str
+    end_date: str
+    items: List[HistoryEntry]
+    count: int
+    by_category: List[CategoryHistory]
+
+class ActivityStreakResponse(BaseModel):
+    """Response model for streak queries"""
+    category: Optional[str] = None  # None means any category
+    current_streak_days: int
+    longest_streak_days: int
+    last_active_date: Optional[str] = None
+    active_days: int
+
+class BusyInterval(BaseModel):
+    """A busy period from FreeBusy"""
+    start: str
+    end: str
+
+class RecurrenceConflict(BaseModel):
+    """An occurrence of a recurring event that overlaps busy time"""
+    start_time: str = Field(..., description="Start time in ISO 8601 format")
+    end_time: str = Field(..., description="End time in ISO 8601 format")
+    busy: List[BusyInterval]
+    # Nearest placement of the same length within working hours on the same day
+    suggested_start_time: Optional[str] = None
+    suggested_end_time: Optional[str] = None
+    shift_minutes: Optional[int] = None  # Negative means earlier
+
+class RecurringScheduleResponse(BaseModel):
+    """Response model for recurring activity scheduling"""
+    summary: str
+    recurrence: List[str]
+    window_start: str
+    window_end: str
+    occurrences: int
+    first_occurrence: Optional[str] = None
+    last_occurrence: Optional[str] = None
+    conflicts: List[RecurrenceConflict]
+    conflict_count: int
+    committed: bool
+    event_id: Optional[str] = None
+    html_link: Optional[str] = None
+
+class AvailabilityPageResponse(BaseModel):
+    """Response model for one page of free time slots"""
+    start_date: str  # First day of this page
+    end_date: str  # Last day of this page
+    range_end_date: str  # Last day of the whole requested range
+    slots: Dict[str, List[Dict[str, Any]]]  # Date -> free slots; days without free time are omitted
+    next_cursor: Optional[str] = None  # Opaque; pass as cursor to fetch the next page
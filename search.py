@@ -0,0 +1,186 @@
+import math
+import re
+from bisect import bisect_left
+from collections import Counter
+from heapq import nlargest
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# ==== RANKING PARAMETERS ====
+# Per-field weights: a hit in the name counts more than one in a benefit or the description
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "benefits": 2.0,
+    "description": 1.0,
+}
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Score multiplier for a term reached through prefix expansion rather than an exact match
+PREFIX_PENALTY = 0.7
+# Query terms shorter than this are matched exactly, never expanded as prefixes
+MIN_PREFIX_LEN = 2
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase text and split it into alphanumeric tokens."""
+    return TOKEN_RE.findall(text.lower())
+
+
+class SearchIndex:
+    """
+    Token-level inverted index over catalog activities with BM25F-style ranking.
+
+    Every posting stores the precomputed score contribution of one term in one
+    document, so a query only touches the postings of the terms it matches.
+    """
+
+    def __init__(self, documents: Iterable[Dict[str, Sequence[str]]]):
+        """
+        Args:
+            documents: One mapping per activity from field name (see FIELD_WEIGHTS)
+                to the text pieces in that field. Document ids are list positions.
+        """
+        field_tokens: List[Dict[str, List[str]]] = []
+        field_lengths = {field: 0 for field in FIELD_WEIGHTS}
+        for doc in documents:
+            tokens = {}
+            for field in FIELD_WEIGHTS:
+                tokens[field] = [t for piece in doc.get(field, ()) for t in tokenize(piece)]
+                field_lengths[field] += len(tokens[field])
+            field_tokens.append(tokens)
+
+        self.size = len(field_tokens)
+        avg_len = {f: (n / self.size if self.size else 0.0) or 1.0 for f, n in field_lengths.items()}
+
+        # term -> {doc_id: weighted, length-normalised tf summed over fields}
+        term_docs: Dict[str, Dict[int, float]] = {}
+        for doc_id, tokens in enumerate(field_tokens):
+            for field, weight in FIELD_WEIGHTS.items():
+                length_norm = 1 - BM25_B + BM25_B * len(tokens[field]) / avg_len[field]
+                for term, tf in Counter(tokens[field]).items():
+                    docs = term_docs.setdefault(term, {})
+                    docs[doc_id] = docs.get(doc_id, 0.0) + weight * tf / length_norm
+
+        self.postings: Dict[str, List[Tuple[int, float]]] = {}
+        for term, docs in term_docs.items():
+            idf = math.log(1 + (self.size - len(docs) + 0.5) / (len(docs) + 0.5))
+            self.postings[term] = [
+                (doc_id, idf * tf * (BM25_K1 + 1) / (tf + BM25_K1))
+                for doc_id, tf in docs.items()
+            ]
+        self.vocabulary = sorted(self.postings)
+
+    def expand(self, term: str) -> List[Tuple[str, float]]:
+        """Return the indexed terms matching a query term, with their match weight."""
+        matches = []
+        if term in self.postings:
+            matches.append((term, 1.0))
+        if len(term) >= MIN_PREFIX_LEN:
+            i = bisect_left(self.vocabulary, term)
+            while i < len(self.vocabulary) and self.vocabulary[i].startswith(term):
+                if self.vocabulary[i] != term:
+                    matches.append((self.vocabulary[i], PREFIX_PENALTY))
+                i += 1
+        return matches
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        allowed: Optional[Sequence[bool]] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Rank documents for a free-text query.
+        Args:
+            query: Free-text query; every token may also match as a prefix.
+            limit: Maximum number of results.
+            allowed: Optional per-document mask used to restrict results (e.g. to a category).
+        Returns:
+            List of (doc_id, score) pairs, best first.
+        """
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            # A document scores once per query term, through its best-matching expansion
+            best: Dict[int, float] = {}
+            for indexed_term, match_weight in self.expand(term):
+                for doc_id, contribution in self.postings[indexed_term]:
+                    if allowed is not None and not allowed[doc_id]:
+                        continue
+                    value = contribution * match_weight
+                    if value > best.get(doc_id, 0.0):
+                        best[doc_id] = value
+            for doc_id, value in best.items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + value
+        return nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+
+
+# ==== NAME LOOKUP ====
+# Minimum trigram Dice similarity for a fuzzy match to be returned as the activity
+FUZZY_MIN_SCORE = 0.45
+# Candidates below this similarity are not offered as suggestions
+SUGGESTION_MIN_SCORE = 0.25
+
+
+def normalize_name(name: str) -> str:
+    """Casefold a name and reduce punctuation and whitespace runs to single spaces."""
+    return " ".join(re.findall(r"\w+", name.casefold()))
+
+
+def trigrams(text: str) -> List[str]:
+    padded = f"  {text} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+class NameLookup:
+    """
+    Activity-name index: O(1) exact and normalized lookups, trigram fuzzy fallback.
+    """
+
+    def __init__(self, names: Sequence[str]):
+        self.exact: Dict[str, int] = {}
+        self.normalized: Dict[str, int] = {}
+        self.grams: Dict[str, List[int]] = {}
+        self.gram_counts: List[int] = []
+        for doc_id, name in enumerate(names):
+            self.exact.setdefault(name, doc_id)
+            key = normalize_name(name)
+            self.normalized.setdefault(key, doc_id)
+            grams = set(trigrams(key))
+            self.gram_counts.append(len(grams))
+            for gram in grams:
+                self.grams.setdefault(gram, []).append(doc_id)
+
+    def fuzzy(self, name: str, limit: int = 5) -> List[Tuple[int, float]]:
+        """Return up to limit (doc_id, similarity) pairs ranked by trigram Dice similarity."""
+        grams = set(trigrams(normalize_name(name)))
+        if not grams:
+            return []
+        shared: Dict[int, int] = {}
+        for gram in grams:
+            for doc_id in self.grams.get(gram, ()):
+                shared[doc_id] = shared.get(doc_id, 0) + 1
+        scored = (
+            (doc_id, 2 * count / (len(grams) + self.gram_counts[doc_id]))
+            for doc_id, count in shared.items()
+        )
+        return nlargest(limit, scored, key=lambda item: (item[1], -item[0]))
+
+    def lookup(self, name: str) -> Tuple[Optional[int], str, float, List[int]]:
+        """
+        Resolve a possibly misspelled activity name.
+        Returns:
+            (doc_id or None, match type, score, ranked suggestion doc_ids). The match type
+            is "exact", "normalized", "fuzzy" or "none".
+        """
+        if name in self.exact:
+            return self.exact[name], "exact", 1.0, []
+        doc_id = self.normalized.get(normalize_name(name))
+        if doc_id is not None:
+            return doc_id, "normalized", 1.0, []
+        candidates = self.fuzzy(name)
+        suggestions = [doc_id for doc_id, score in candidates if score >= SUGGESTION_MIN_SCORE]
+        if candidates and candidates[0][1] >= FUZZY_MIN_SCORE:
+            return candidates[0][0], "fuzzy", candidates[0][1], suggestions[1:]
+        best = candidates[0][1] if candidates else 0.0
+        return None, "none", best, suggestions
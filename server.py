@@ -1,43 +1,286 @@
 #
-from mcp.server.fastmcp import FastMCP
+import asyncio
+from mcp.server.fastmcp import Context, FastMCP
 from schema import (
-    ActivitiesResponse, 
-    CategoriesResponse, 
-    CalendarEvent
+    ActivityFitResponse,
+    ActivityHistoryResponse,
+    ActivityLookupResponse,
+    ActivityPlanResponse,
+    ActivitySearchResponse,
+    ActivityStreakResponse,
+    AvailabilityPageResponse,
+    RecommendationBatchResponse,
+    RecommendationResponse,
+    RecurringScheduleResponse,
+    CalendarEvent,
+    CalendarEventResult,
+    CalendarEventsResponse
 )
-from typing import Dict
-from PERMAV import get_permav_categories_helper, get_vitality_activities_helper
-from client import get_free_slots, create_calendar_event_helper
+from typing import Dict, List, Optional, Union
+from PERMAV import (
+    catalog,
+    find_activities_fitting_helper,
+    get_activities_json,
+    get_activity_details_helper,
+    get_permav_categories_json,
+    get_vitality_activities_json,
+    recommend_activities_batch_helper,
+    recommend_activities_helper,
+    search_activities_helper
+)
+# client (Google Calendar, OAuth tokens, HTTP pool) and planner are imported by the
+# tools that use them, so catalog-only sessions start without loading them
+from metrics import instrument_tool, phase, registry, start_metrics_server
 
 # Create MCP server
 mcp = FastMCP("BuddyClaude")
+# Prometheus text on METRICS_PORT, if configured
+start_metrics_server()
+
+@mcp.tool()
+@instrument_tool
+async def get_permav_categories(if_none_match: Optional[str] = None) -> str:
+    """Get all PERMA-V categories with descriptions. Pass the etag of an earlier reply as if_none_match to get {"not_modified": true} if the catalog has not changed."""
+    with phase("catalog"):
+        await catalog.refresh_async()
+        return get_permav_categories_json(if_none_match)
+
+@mcp.tool()
+@instrument_tool
+async def get_vitality_activities(
+    if_none_match: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None
+) -> str:
+    """Get activities that promote physical health, energy, and overall wellbeing. Pass limit to get one page at a time and the reply's next_cursor as cursor for the next page. Pass the etag of an earlier reply as if_none_match to get {"not_modified": true} if the catalog has not changed."""
+    with phase("catalog"):
+        await catalog.refresh_async()
+        return get_vitality_activities_json(if_none_match, limit=limit, cursor=cursor)
 
 @mcp.tool()
-def get_permav_categories() -> CategoriesResponse:
-    """Get all PERMA-V categories with descriptions"""
-    return get_permav_categories_helper()
+@instrument_tool
+async def get_activities(
+    category: str,
+    offset: int = 0,
+    limit: int = 50,
+    fields: Optional[List[str]] = None,
+    if_none_match: Optional[str] = None,
+    cursor: Optional[str] = None
+) -> str:
+    """Get activities for a PERMA-V category (code or name: P, E, R, M, A, V). Page by passing the reply's next_cursor as cursor (or with offset/next_offset); pass fields (e.g. ["name", "duration_min"]) to return only those fields. Pass the etag of an earlier reply as if_none_match to get {"not_modified": true} if the catalog has not changed."""
+    with phase("catalog"):
+        await catalog.refresh_async()
+        return get_activities_json(
+            category, offset=offset, limit=limit, fields=fields, if_none_match=if_none_match, cursor=cursor
+        )
 
 @mcp.tool()
-def get_vitality_activities() -> ActivitiesResponse:
-    """Get activities that promote physical health, energy, and overall wellbeing."""
-    return get_vitality_activities_helper()
+@instrument_tool
+async def get_activity_details(activity_name: str) -> ActivityLookupResponse:
+    """Get detailed information about a specific activity by name. Misspelled names return the closest match (match="fuzzy") plus other suggestions."""
+    with phase("catalog"):
+        await catalog.refresh_async()
+        return get_activity_details_helper(activity_name)
 
 @mcp.tool()
-def get_availability_time(date: str = None) -> Dict:
-    """Get free timeslots availability from your calendar"""
-    return get_free_slots(date)
+@instrument_tool
+async def search_activities(
+    query: str,
+    category: Optional[str] = None,
+    limit: int = 10
+) -> ActivitySearchResponse:
+    """Search for activities by keyword, ranked by relevance. Optionally restrict to one PERMA-V category (code or name)."""
+    with phase("catalog"):
+        await catalog.refresh_async()
+        return search_activities_helper(query, category=category, limit=limit)
 
 @mcp.tool()
-def create_calendar_event(
+@instrument_tool
+async def find_activities_fitting(max_minutes: int, category: Optional[str] = None) -> ActivityFitResponse:
+    """Find activities that fit in the given number of minutes, shortest first. Optionally restrict to one PERMA-V category (code or name)."""
+    with phase("catalog"):
+        await catalog.refresh_async()
+        return find_activities_fitting_helper(max_minutes, category=category)
+
+@mcp.tool()
+@instrument_tool
+async def recommend_activities(
+    goal_text: str,
+    category_weights: Optional[Dict[str, float]] = None,
+    top_k: int = 5
+) -> RecommendationResponse:
+    """Recommend activities for a goal in plain words (e.g. "sleep better and feel less stressed"), best match first. category_weights maps PERMA-V categories (code or name) to ranking multipliers, e.g. {"V": 2, "A": 0} to favour Vitality and exclude Accomplishment. Each score is the goal's unweighted similarity to the activity (0-1)."""
+    with phase("catalog"):
+        await catalog.refresh_async()
+        return recommend_activities_helper(goal_text, category_weights=category_weights, top_k=top_k)
+
+@mcp.tool()
+@instrument_tool
+async def recommend_activities_batch(
+    goals: List[str],
+    category_weights: Optional[Dict[str, float]] = None,
+    top_k: int = 5
+) -> RecommendationBatchResponse:
+    """Recommend activities for several goals in one call; same scoring and options as recommend_activities, one result list per goal."""
+    with phase("catalog"):
+        await catalog.refresh_async()
+        return recommend_activities_batch_helper(goals, category_weights=category_weights, top_k=top_k)
+
+@mcp.tool()
+@instrument_tool
+async def get_availability_time(
+    start_date: str = None,
+    end_date: str = None,
+    calendar_ids: Optional[List[str]] = None,
+    min_slot_minutes: int = 0,
+    page_days: Optional[int] = None,
+    cursor: Optional[str] = None,
+    ctx: Context = None
+) -> Union[Dict, AvailabilityPageResponse]:
+    """Get free timeslots availability for one day or an inclusive date range (YYYY-MM-DD, default: today). Pass several calendar_ids (e.g. attendee emails) to get only the time when all of them are free, and min_slot_minutes to drop short gaps. For long ranges (up to a year) pass page_days to get that many days per reply, then the reply's next_cursor as cursor for the next page."""
+    from client import get_free_slots_async, get_free_slots_page_async
+
+    progress = ctx.report_progress if ctx else None
+    if page_days is not None or cursor is not None:
+        return await get_free_slots_page_async(
+            start_date, end_date, calendar_ids, min_slot_minutes, page_days=page_days, cursor=cursor, progress=progress
+        )
+    return await get_free_slots_async(start_date, end_date, calendar_ids, min_slot_minutes, progress=progress)
+
+@mcp.tool()
+@instrument_tool
+async def create_calendar_event(
     calendar_event: CalendarEvent
 ) -> Dict:
-    """Create a calendar event using the Google Calendar API."""
-    return create_calendar_event_helper(
+    """Create a calendar event using the Google Calendar API. Set recurrence (e.g. ["RRULE:FREQ=WEEKLY;BYDAY=MO,WE,FR"]) for a recurring event; schedule_recurring_activity checks a series for conflicts first."""
+    from client import create_calendar_event_async
+
+    return await create_calendar_event_async(
         summary=calendar_event.summary,
         start_time=calendar_event.start_time,
         end_time=calendar_event.end_time,
-        description=calendar_event.description
+        description=calendar_event.description,
+        recurrence=calendar_event.recurrence
+    )
+
+@mcp.tool()
+@instrument_tool
+async def create_calendar_events(events: List[CalendarEvent], ctx: Context = None) -> CalendarEventsResponse:
+    """Create several calendar events in one call (sent as Google Calendar batch requests). Returns per-event success or failure."""
+    from client import create_calendar_events_async
+
+    results = await create_calendar_events_async([
+        {
+            "summary": event.summary,
+            "start_time": event.start_time,
+            "end_time": event.end_time,
+            "description": event.description,
+            "recurrence": event.recurrence
+        }
+        for event in events
+    ], progress=ctx.report_progress if ctx else None)
+    created = sum(1 for r in results if r["ok"])
+    return CalendarEventsResponse(
+        results=[CalendarEventResult(**r) for r in results],
+        created=created,
+        failed=len(results) - created
     )
+
+@mcp.tool()
+@instrument_tool
+async def plan_activities(
+    date_range: str,
+    categories: Optional[List[str]] = None,
+    max_per_day: int = 2,
+    commit: bool = False,
+    ctx: Context = None
+) -> ActivityPlanResponse:
+    """Plan PERMA-V activities into free calendar time for a date range ("YYYY-MM-DD" or "YYYY-MM-DD/YYYY-MM-DD"). Draws from the given categories (default: all), at most max_per_day per day. Set commit=true to create the calendar events too."""
+    from planner import plan_activities_helper
+
+    with phase("catalog"):
+        await catalog.refresh_async()
+    return await plan_activities_helper(
+        date_range,
+        categories=categories,
+        max_per_day=max_per_day,
+        commit=commit,
+        progress=ctx.report_progress if ctx else None
+    )
+
+@mcp.tool()
+@instrument_tool
+async def schedule_recurring_activity(
+    summary: str,
+    start_time: str,
+    end_time: str,
+    recurrence: List[str],
+    description: Optional[str] = None,
+    calendar_ids: Optional[List[str]] = None,
+    horizon_days: Optional[int] = None,
+    commit: bool = False,
+    ctx: Context = None
+) -> RecurringScheduleResponse:
+    """Check a recurring activity (start/end of the first occurrence in ISO 8601, recurrence as RRULE lines such as ["RRULE:FREQ=DAILY;COUNT=60"]) against busy time in calendar_ids for the next horizon_days (default: the longest horizon allowed), using one FreeBusy request. Returns every conflicting occurrence with the nearest free time on the same day. Set commit=true to also create the recurring event."""
+    from planner import schedule_recurring_activity_helper
+
+    return await schedule_recurring_activity_helper(
+        summary,
+        start_time,
+        end_time,
+        recurrence,
+        description=description,
+        calendar_ids=calendar_ids,
+        horizon_days=horizon_days,
+        commit=commit,
+        progress=ctx.report_progress if ctx else None
+    )
+
+@mcp.tool()
+@instrument_tool
+async def get_activity_history(
+    start_date: str = None,
+    end_date: str = None,
+    category: Optional[str] = None,
+    include_planned: bool = False
+) -> ActivityHistoryResponse:
+    """Activities scheduled through BuddyClaude between two dates (YYYY-MM-DD, inclusive; default: the last 7 days), with per-category counts and minutes. Answered from the local history store without calling Google Calendar. Set include_planned=true to also count plan_activities proposals that were not booked."""
+    from history import get_activity_history_helper
+
+    with phase("history"):
+        await catalog.refresh_async()
+        # The history file is shared by every worker; a query can wait on another's write
+        return await asyncio.to_thread(
+            get_activity_history_helper, start_date, end_date, category=category, include_planned=include_planned
+        )
+
+@mcp.tool()
+@instrument_tool
+async def get_activity_streak(category: Optional[str] = None) -> ActivityStreakResponse:
+    """Current and longest run of consecutive days with at least one scheduled activity, optionally for one PERMA-V category (code or name). Answered from the local history store."""
+    from history import get_activity_streak_helper
+
+    with phase("history"):
+        await catalog.refresh_async()
+        return await asyncio.to_thread(get_activity_streak_helper, category)
+
+@mcp.resource("stats://freebusy-cache")
+def freebusy_cache_stats() -> Dict:
+    """Hit/miss counters of the FreeBusy response cache"""
+    from client import get_freebusy_cache_stats
+
+    return get_freebusy_cache_stats()
+
+@mcp.resource("stats://metrics", mime_type="text/plain")
+def prometheus_metrics() -> str:
+    """Tool and upstream call metrics in the Prometheus text format"""
+    return registry.render_prometheus()
+
+@mcp.resource("stats://metrics-summary")
+def metrics_summary() -> Dict:
+    """Per-tool and per-endpoint calls, errors, bytes, latency and phase totals"""
+    return registry.snapshot()
+
 # Remove or update the placeholder tools
 # @mcp.tool()
 # def tool2() -> str:
@@ -0,0 +1,338 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from dotenv import load_dotenv
+
+from cache import TTLCache
+from sqlite_store import ThreadLocalConnections
+
+load_dotenv()
+
+# ==== SHARED STATE SETTINGS ====
+# "memory" keeps tokens, caches and rate limits in the process (one worker). "sqlite"
+# shares them between all worker processes on the host through SHARED_STATE_PATH.
+SHARED_STATE_BACKEND = os.environ.get("SHARED_STATE_BACKEND", "memory").lower()
+SHARED_STATE_PATH = os.environ.get(
+    "SHARED_STATE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'buddyclaude_state.sqlite3')
+)
+# Milliseconds a worker waits for another worker's write lock before failing
+SHARED_STATE_BUSY_TIMEOUT_MS = 5000
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by the sync and async paths.
+
+    reserve() takes tokens immediately, letting the balance go negative, and returns how
+    long the caller must wait for its reservation to be covered. Callers therefore queue
+    in arrival order without polling, on threads and event loops alike.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, cost: float = 1.0) -> float:
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= cost
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+
+class StateBackend:
+    """
+    State shared by the workers serving one Google account.
+
+    Values are strings (callers store JSON). Leases give one worker at a time the right to
+    do something expensive, such as refreshing the OAuth token, while the others wait for
+    its result. cache() and token_bucket() build the FreeBusy cache and the upstream rate
+    limiter on top of the backend.
+    """
+
+    shared = False
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def set(self, namespace: str, key: str, value: str, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def acquire_lease(self, name: str, owner: str, ttl: float) -> bool:
+        """Take (or extend) the named lease for owner; False while another owner holds an unexpired one."""
+        raise NotImplementedError
+
+    def release_lease(self, name: str, owner: str) -> None:
+        raise NotImplementedError
+
+    def cache(self, namespace: str, maxsize: int, ttl: float):
+        """A cache with the TTLCache interface (get, set, invalidate, clear, stats)."""
+        raise NotImplementedError
+
+    def token_bucket(self, name: str, rate: float, burst: float):
+        """A rate limiter with the TokenBucket interface (reserve)."""
+        raise NotImplementedError
+
+
+class MemoryBackend(StateBackend):
+    """Process-local state: the single-worker default."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[tuple, tuple] = {}
+        self._leases: Dict[str, tuple] = {}
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        with self._lock:
+            value, expires_at = self._values.get((namespace, key), (None, None))
+            if expires_at is not None and expires_at <= time.time():
+                return None
+            return value
+
+    def set(self, namespace: str, key: str, value: str, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._values[(namespace, key)] = (value, time.time() + ttl if ttl is not None else None)
+
+    def acquire_lease(self, name: str, owner: str, ttl: float) -> bool:
+        with self._lock:
+            holder, expires_at = self._leases.get(name, (None, 0.0))
+            if holder not in (None, owner) and expires_at > time.time():
+                return False
+            self._leases[name] = (owner, time.time() + ttl)
+            return True
+
+    def release_lease(self, name: str, owner: str) -> None:
+        with self._lock:
+            if self._leases.get(name, (None,))[0] == owner:
+                del self._leases[name]
+
+    def cache(self, namespace: str, maxsize: int, ttl: float) -> TTLCache:
+        return TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def token_bucket(self, name: str, rate: float, burst: float) -> TokenBucket:
+        return TokenBucket(rate, burst)
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+
+class SQLiteBackend(StateBackend):
+    """
+    State shared between processes through one SQLite file in WAL mode.
+
+    Reads never block; every read-modify-write (leases, token buckets) runs in a
+    BEGIN IMMEDIATE transaction, so SQLite's write lock makes it atomic across workers.
+    Times are wall-clock (time.time()) because they are compared between processes.
+    """
+
+    shared = True
+
+    def __init__(self, path: str = SHARED_STATE_PATH):
+        self.path = path
+        self._connections = ThreadLocalConnections(path, SQLITE_SCHEMA, SHARED_STATE_BUSY_TIMEOUT_MS)
+
+    def connection(self):
+        return self._connections.get()
+
+    def transaction(self) -> Any:
+        """Context manager for a write transaction that holds the database write lock from the start."""
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        return conn
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        row = self.connection().execute(
+            "SELECT value FROM kv WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (namespace, key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, namespace: str, key: str, value: str, ttl: Optional[float] = None) -> None:
+        self.connection().execute(
+            "INSERT OR REPLACE INTO kv (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, value, time.time() + ttl if ttl is not None else None)
+        )
+
+    def acquire_lease(self, name: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        with self.transaction() as conn:
+            row = conn.execute("SELECT owner, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+            if row is not None and row[0] != owner and row[1] > now:
+                return False
+            conn.execute("INSERT OR REPLACE INTO leases (name, owner, expires_at) VALUES (?, ?, ?)", (name, owner, now + ttl))
+            return True
+
+    def release_lease(self, name: str, owner: str) -> None:
+        self.connection().execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+    def cache(self, namespace: str, maxsize: int, ttl: float) -> "SharedTTLCache":
+        return SharedTTLCache(self, namespace, maxsize, ttl)
+
+    def token_bucket(self, name: str, rate: float, burst: float) -> "SharedTokenBucket":
+        return SharedTokenBucket(self, name, rate, burst)
+
+
+class SharedTTLCache:
+    """
+    TTLCache-compatible cache stored in an SQLiteBackend.
+
+    Every worker reads the same entries, so an entry fetched by one worker is a hit for
+    all of them and an invalidation by one is seen by all. Keys are tuples of strings
+    (and nested tuples); values must be JSON-serializable. Hit and miss counters are
+    per process.
+    """
+
+    def __init__(self, backend: SQLiteBackend, namespace: str, maxsize: int = 256, ttl: float = 60.0):
+        self.backend = backend
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + value)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        text = self.backend.get(self.namespace, json.dumps(key))
+        if text is None:
+            self._count("misses")
+            return default
+        self._count("hits")
+        return json.loads(text)
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        now = time.time()
+        with self.backend.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (self.namespace, json.dumps(key), json.dumps(value), now + (self.ttl if ttl is None else ttl))
+            )
+            conn.execute("DELETE FROM kv WHERE namespace = ? AND expires_at <= ?", (self.namespace, now))
+            # Over capacity: drop the entries closest to expiry (the oldest, with a single TTL)
+            evicted = conn.execute(
+                """
+                DELETE FROM kv WHERE namespace = ? AND key IN (
+                    SELECT key FROM kv WHERE namespace = ? ORDER BY expires_at
+                    LIMIT MAX(0, (SELECT COUNT(*) FROM kv WHERE namespace = ?) - ?)
+                )
+                """,
+                (self.namespace, self.namespace, self.namespace, self.maxsize)
+            ).rowcount
+        if evicted > 0:
+            self._count("evictions", evicted)
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key matches predicate; returns the number dropped."""
+        with self.backend.transaction() as conn:
+            keys = [row[0] for row in conn.execute("SELECT key FROM kv WHERE namespace = ?", (self.namespace,))]
+            stale = [key for key in keys if predicate(as_tuple(json.loads(key)))]
+            conn.executemany("DELETE FROM kv WHERE namespace = ? AND key = ?", [(self.namespace, key) for key in stale])
+        self._count("invalidations", len(stale))
+        return len(stale)
+
+    def clear(self) -> None:
+        self.backend.connection().execute("DELETE FROM kv WHERE namespace = ?", (self.namespace,))
+
+    def stats(self) -> Dict[str, Any]:
+        size = self.backend.connection().execute(
+            "SELECT COUNT(*) FROM kv WHERE namespace = ? AND expires_at > ?", (self.namespace, time.time())
+        ).fetchone()[0]
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": size,
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "shared": True,
+            }
+
+
+class SharedTokenBucket:
+    """TokenBucket whose balance lives in an SQLiteBackend, so all workers draw on one quota."""
+
+    def __init__(self, backend: SQLiteBackend, name: str, rate: float, burst: float):
+        self.backend = backend
+        self.name = name
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+
+    def reserve(self, cost: float = 1.0) -> float:
+        if self.rate <= 0:
+            return 0.0
+        now = time.time()
+        with self.backend.transaction() as conn:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE name = ?", (self.name,)).fetchone()
+            tokens = self.burst if row is None else min(self.burst, row[0] + max(0.0, now - row[1]) * self.rate)
+            tokens -= cost
+            conn.execute("INSERT OR REPLACE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)", (self.name, tokens, now))
+        return -tokens / self.rate if tokens < 0 else 0.0
+
+
+def as_tuple(value: Any) -> Any:
+    """Turn JSON-decoded lists back into the tuples cache keys were built from."""
+    return tuple(as_tuple(v) for v in value) if isinstance(value, list) else value
+
+
+async def offload(func: Callable, *args: Any) -> Any:
+    """
+    Call a cache or rate-limiter operation from async code.
+
+    Process-local state answers immediately and runs inline. With a shared backend the
+    call may wait up to SHARED_STATE_BUSY_TIMEOUT_MS for another worker's write lock, so
+    it runs in a worker thread and the event loop keeps serving other sessions.
+    """
+    if backend.shared:
+        return await asyncio.to_thread(func, *args)
+    return func(*args)
+
+
+def create_backend(kind: str = SHARED_STATE_BACKEND, path: str = SHARED_STATE_PATH) -> StateBackend:
+    if kind == "memory":
+        return MemoryBackend()
+    if kind == "sqlite":
+        return SQLiteBackend(path)
+    raise ValueError(f"Unknown SHARED_STATE_BACKEND '{kind}'; expected 'memory' or 'sqlite'")
+
+
+backend = create_backend()
@@ -0,0 +1,34 @@
+import sqlite3
+import threading
+
+
+class ThreadLocalConnections:
+    """
+    One autocommit connection per thread to a WAL-mode SQLite file.
+
+    The schema script runs once, on the first connection. WAL lets readers proceed
+    while another thread or process writes; writers wait up to busy_timeout_ms for
+    each other's lock.
+    """
+
+    def __init__(self, path: str, schema: str, busy_timeout_ms: int):
+        self.path = path
+        self.schema = schema
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def get(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=self.busy_timeout_ms / 1000)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Durable across application crashes; only an OS crash can lose the last commits
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self._init_lock:
+                if not self._initialized:
+                    conn.executescript(self.schema)
+                    self._initialized = True
+            self._local.conn = conn
+        return conn
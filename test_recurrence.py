@@ -0,0 +1,107 @@
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from recurrence import expand_recurrence, find_conflicts, parse_rrule
+
+LA = ZoneInfo("America/Los_Angeles")
+
+
+def at(year: int, month: int, day: int, hour: int = 9, tz: ZoneInfo = LA) -> datetime:
+    return datetime(year, month, day, hour, tzinfo=tz)
+
+
+def dates(occurrences):
+    return [o.date() for o in occurrences]
+
+
+def test_weekly_byday_count():
+    occurrences = expand_recurrence(["RRULE:FREQ=WEEKLY;BYDAY=MO,WE;COUNT=4"], at(2026, 1, 5), at(2027, 1, 1))
+    assert dates(occurrences) == [date(2026, 1, 5), date(2026, 1, 7), date(2026, 1, 12), date(2026, 1, 14)]
+
+
+def test_wall_clock_time_kept_across_dst():
+    occurrences = expand_recurrence(["RRULE:FREQ=DAILY;COUNT=3"], at(2026, 3, 7), at(2027, 1, 1))
+    assert [o.hour for o in occurrences] == [9, 9, 9]
+    # Same-timezone datetime subtraction is wall-clock, so compare in UTC
+    utc = [o.astimezone(ZoneInfo("UTC")) for o in occurrences]
+    assert utc[1] - utc[0] == timedelta(hours=23)
+
+
+def test_until_date_is_inclusive():
+    occurrences = expand_recurrence(["RRULE:FREQ=DAILY;UNTIL=20260103"], at(2026, 1, 1), at(2027, 1, 1))
+    assert dates(occurrences) == [date(2026, 1, 1), date(2026, 1, 2), date(2026, 1, 3)]
+
+
+def test_monthly_bymonthday_and_byday_intersect():
+    # RFC 5545: Friday the 13ths, not every Friday plus every 13th
+    occurrences = expand_recurrence(
+        ["RRULE:FREQ=MONTHLY;BYDAY=FR;BYMONTHDAY=13;COUNT=4"], at(2026, 1, 1), at(2030, 1, 1)
+    )
+    assert dates(occurrences) == [date(2026, 2, 13), date(2026, 3, 13), date(2026, 11, 13), date(2027, 8, 13)]
+
+
+def test_monthly_ordinal_byday():
+    occurrences = expand_recurrence(["RRULE:FREQ=MONTHLY;BYDAY=-1FR;COUNT=3"], at(2026, 1, 1), at(2027, 1, 1))
+    assert dates(occurrences) == [date(2026, 1, 30), date(2026, 2, 27), date(2026, 3, 27)]
+
+
+def test_monthly_skips_months_without_start_day():
+    occurrences = expand_recurrence(["RRULE:FREQ=MONTHLY;COUNT=3"], at(2026, 1, 31), at(2027, 1, 1))
+    assert dates(occurrences) == [date(2026, 1, 31), date(2026, 3, 31), date(2026, 5, 31)]
+
+
+@pytest.mark.parametrize("wkst, expected", [
+    ("MO", [date(1997, 8, 5), date(1997, 8, 10), date(1997, 8, 19), date(1997, 8, 24)]),
+    ("SU", [date(1997, 8, 5), date(1997, 8, 17), date(1997, 8, 19), date(1997, 8, 31)]),
+])
+def test_wkst_decides_skipped_weeks(wkst, expected):
+    # The example from RFC 5545 section 3.3.10
+    rule = f"RRULE:FREQ=WEEKLY;INTERVAL=2;COUNT=4;BYDAY=TU,SU;WKST={wkst}"
+    assert dates(expand_recurrence([rule], at(1997, 8, 5), at(1998, 1, 1))) == expected
+
+
+def test_invalid_wkst_rejected():
+    with pytest.raises(ValueError):
+        parse_rrule("RRULE:FREQ=WEEKLY;WKST=XX", LA)
+
+
+def test_exdate_datetime_excludes_occurrence():
+    occurrences = expand_recurrence(
+        ["RRULE:FREQ=DAILY;COUNT=3", "EXDATE;TZID=America/Los_Angeles:20260102T090000"],
+        at(2026, 1, 1), at(2027, 1, 1)
+    )
+    assert dates(occurrences) == [date(2026, 1, 1), date(2026, 1, 3)]
+
+
+def test_exdate_date_only_excludes_that_day():
+    occurrences = expand_recurrence(
+        ["RRULE:FREQ=DAILY;COUNT=4", "EXDATE;VALUE=DATE:20260102,20260104"],
+        at(2026, 1, 1), at(2027, 1, 1)
+    )
+    assert dates(occurrences) == [date(2026, 1, 1), date(2026, 1, 3)]
+
+
+def test_rdate_adds_occurrences():
+    occurrences = expand_recurrence(
+        ["RRULE:FREQ=WEEKLY;COUNT=2", "RDATE;VALUE=DATE:20260103", "RDATE:20260110T170000Z"],
+        at(2026, 1, 1), at(2027, 1, 1)
+    )
+    assert occurrences == [at(2026, 1, 1), at(2026, 1, 3), at(2026, 1, 8), at(2026, 1, 10)]
+
+
+def test_unsupported_part_rejected():
+    with pytest.raises(ValueError):
+        expand_recurrence(["RRULE:FREQ=WEEKLY;BYSETPOS=1"], at(2026, 1, 1), at(2027, 1, 1))
+
+
+def test_find_conflicts_suggests_nearest_gap():
+    hour = timedelta(hours=1)
+    occurrences = [(at(2026, 1, 5, 10), at(2026, 1, 5, 11)), (at(2026, 1, 6, 10), at(2026, 1, 6, 11))]
+    busy = [(at(2026, 1, 5, 9), at(2026, 1, 5, 10) + hour / 2)]
+    conflicts = find_conflicts(occurrences, busy, 8, 18)
+    assert len(conflicts) == 1
+    assert conflicts[0].start == at(2026, 1, 5, 10)
+    assert conflicts[0].busy == busy
+    assert conflicts[0].suggested_start == at(2026, 1, 5, 10) + hour / 2
@@ -0,0 +1,75 @@
+import math
+import re
+from typing import NamedTuple, Optional, Tuple
+
+# ==== DURATION PARSING ====
+RANGE_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(?:-\s*(\d+(?:\.\d+)?)|(\+))?(?:\s*(hours?|hrs?|minutes?|mins?|seconds?|secs?)\b)?")
+UNIT_MINUTES = {"h": 60.0, "m": 1.0, "s": 1 / 60}
+
+# ==== FREQUENCY PARSING ====
+# The phrase occurring earliest in the frequency text wins ("Daily or weekly" is daily)
+FREQUENCY_PHRASES = (
+    ("multiple times daily", 3.0 * 7),
+    ("several times daily", 3.0 * 7),
+    ("semi-annual", 2 / 52),
+    ("biweekly", 0.5),
+    ("several times weekly", 3.0),
+    ("multiple times weekly", 3.0),
+    ("daily", 7.0),
+    ("weekly", 1.0),
+    ("monthly", 12 / 52),
+    ("quarterly", 4 / 52),
+    ("annual", 1 / 52),
+)
+COUNT_PER_RE = re.compile(r"(\d+)(?:\s*-\s*(\d+))?\s*times\s*(daily|weekly|monthly)")
+PERIOD_PER_WEEK = {"daily": 7.0, "weekly": 1.0, "monthly": 12 / 52}
+
+
+class ActivityTiming(NamedTuple):
+    """Numeric form of an activity's free-text duration and frequency"""
+    duration_min_minutes: Optional[int]   # Shortest duration; None when not numeric ("Varies")
+    duration_max_minutes: Optional[int]   # Longest duration; None when open-ended ("30+") or not numeric
+    times_per_day: Optional[float]        # Set for daily (or more frequent) activities
+    times_per_week: Optional[float]       # None when not periodic ("As needed", "Ongoing")
+
+
+def parse_duration(text: str) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Parse a duration such as "5-10", "20", "30+" or "1-3 hours" into whole minutes.
+    Returns:
+        (min minutes, max minutes); both None when the text has no leading number.
+    """
+    match = RANGE_RE.match(text.lower())
+    if not match:
+        return None, None
+    low, high, open_ended, unit = match.groups()
+    factor = UNIT_MINUTES[unit[0]] if unit else 1.0
+    low_minutes = max(1, math.ceil(float(low) * factor))
+    if open_ended:
+        return low_minutes, None
+    if high is None:
+        return low_minutes, low_minutes
+    return low_minutes, max(low_minutes, math.ceil(float(high) * factor))
+
+
+def parse_frequency(text: str) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Parse a frequency such as "Daily", "2-3 times weekly" or "Monthly".
+    Returns:
+        (times per day, times per week). Counts use the low end of ranges.
+    """
+    text = text.lower()
+    match = COUNT_PER_RE.search(text)
+    if match:
+        per_week = int(match.group(1)) * PERIOD_PER_WEEK[match.group(3)]
+    else:
+        found = [(text.find(phrase), -len(phrase), value) for phrase, value in FREQUENCY_PHRASES if phrase in text]
+        if not found:
+            return None, None
+        per_week = min(found)[2]
+    per_day = per_week / 7 if per_week >= 7 else None
+    return per_day, round(per_week, 3)
+
+
+def parse_timing(duration_min: str, frequency: str) -> ActivityTiming:
+    return ActivityTiming(*parse_duration(duration_min), *parse_frequency(frequency))
@@ -0,0 +1,316 @@
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+import metrics
+import shared_state
+import upstream
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# ==== OAUTH CLIENT ====
+CLIENT_ID = os.environ.get("CLIENT_ID")
+CLIENT_SECRET = os.environ.get("CLIENT_SECRET")
+TOKEN_URL = os.environ.get("TOKEN_URL")
+
+# ==== TOKEN SETTINGS ====
+TOKEN_FILE = os.environ.get(
+    "GOOGLE_TOKEN_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'google_tokens.json')
+)
+# Refresh this many seconds before the token expires, in the background
+TOKEN_REFRESH_MARGIN = float(os.environ.get("TOKEN_REFRESH_MARGIN", "300"))
+TOKEN_BACKGROUND_REFRESH = os.environ.get("TOKEN_BACKGROUND_REFRESH", "1").lower() not in ("0", "false", "no")
+# Seconds shaved off Google's expires_in so a token is never used right at expiry
+EXPIRY_SKEW = 60
+# Wait before retrying a failed background refresh
+REFRESH_RETRY_DELAY = 30.0
+REFRESH_TIMEOUT = 60.0
+# Shortest gap between background refreshes, however short-lived the tokens are
+MIN_BACKGROUND_REFRESH_INTERVAL = 10.0
+# How often a worker waiting for another worker's refresh checks the shared state
+SHARED_REFRESH_POLL_INTERVAL = 0.1
+# Shared state key of the token and of the lease held by the worker refreshing it
+SHARED_TOKEN_KEY = "google"
+REFRESH_LEASE = "oauth-refresh"
+
+
+class TokenManager:
+    """
+    Single owner of the Google OAuth token.
+
+    The token is cached in memory and read from disk only once. It is refreshed
+    proactively by a background thread shortly before it expires, and concurrent
+    callers that find it expired share a single in-flight refresh. Every change
+    is persisted with an atomic rename.
+
+    Tokens are also published to the shared_state backend. With a shared backend,
+    one worker at a time holds the refresh lease and calls Google; the others pick
+    up its token instead of refreshing themselves.
+    """
+
+    def __init__(
+        self,
+        token_file: str = TOKEN_FILE,
+        refresh_margin: float = TOKEN_REFRESH_MARGIN,
+        background_refresh: bool = TOKEN_BACKGROUND_REFRESH,
+        backend: Optional[shared_state.StateBackend] = None
+    ):
+        self.token_file = token_file
+        self.backend = backend or shared_state.backend
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.refresh_margin = refresh_margin
+        self.background_refresh = background_refresh
+        self.access_token: Optional[str] = None
+        self.refresh_token: Optional[str] = None
+        self.token_expiry_time: Optional[float] = None
+        # Usable seconds of the current token as issued (None if unknown, e.g. an older token file)
+        self.token_lifetime: Optional[float] = None
+        self._last_background_refresh = float("-inf")
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._inflight: Optional[Future] = None
+        self._wake = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    # ---- state ----
+
+    def is_valid(self, margin: float = 0.0) -> bool:
+        """True if a token is cached and not within margin seconds of expiry (no expiry = valid)."""
+        if self.access_token is None:
+            return False
+        return self.token_expiry_time is None or time.time() + margin < self.token_expiry_time
+
+    def effective_margin(self) -> float:
+        """refresh_margin, capped at half the token's lifetime so short-lived tokens are not refreshed on arrival."""
+        if self.token_lifetime is None:
+            return self.refresh_margin
+        return min(self.refresh_margin, self.token_lifetime / 2)
+
+    def set_tokens(self, tokens: Dict) -> None:
+        """Store a token endpoint response ({"access_token", "expires_in", ["refresh_token"]}) and persist it."""
+        with self._lock:
+            self.access_token = tokens['access_token']
+            if tokens.get('refresh_token'):
+                self.refresh_token = tokens['refresh_token']
+            self.token_lifetime = tokens.get('expires_in', 3600) - EXPIRY_SKEW
+            self.token_expiry_time = time.time() + self.token_lifetime
+            self._loaded = True
+            self.save()
+            self.publish()
+        self._wake.set()
+
+    def load(self) -> bool:
+        """Load tokens from disk. Returns True if an access token is now cached."""
+        with self._lock:
+            return self._load_locked()
+
+    def _load_locked(self) -> bool:
+        self._loaded = True
+        if not os.path.exists(self.token_file):
+            # A statically provisioned token (no refresh possible) is still usable
+            if os.environ.get("ACCESS_TOKEN") and self.access_token is None:
+                self.access_token = os.environ["ACCESS_TOKEN"]
+            return self.access_token is not None
+        try:
+            with open(self.token_file, 'r') as f:
+                token_data = json.load(f)
+            self.access_token = token_data.get('access_token')
+            self.refresh_token = token_data.get('refresh_token')
+            self.token_expiry_time = token_data.get('token_expiry_time')
+            self.token_lifetime = token_data.get('token_lifetime')
+        except Exception as e:
+            logger.error("Error loading tokens: %s", e)
+        # Another worker may have refreshed since the file was written
+        self._adopt_shared_locked()
+        return self.access_token is not None
+
+    def token_data(self) -> Dict:
+        return {
+            'access_token': self.access_token,
+            'refresh_token': self.refresh_token,
+            'token_expiry_time': self.token_expiry_time,
+            'token_lifetime': self.token_lifetime
+        }
+
+    def publish(self) -> None:
+        """Make the cached tokens available to other workers through the shared state backend."""
+        try:
+            self.backend.set("oauth", SHARED_TOKEN_KEY, json.dumps(self.token_data()))
+        except Exception as e:
+            logger.error("Error publishing tokens to shared state: %s", e)
+
+    def adopt_shared(self) -> bool:
+        """Take over a token another worker stored that expires later than ours. Returns True if one was adopted."""
+        with self._lock:
+            return self._adopt_shared_locked()
+
+    def _adopt_shared_locked(self) -> bool:
+        try:
+            text = self.backend.get("oauth", SHARED_TOKEN_KEY)
+        except Exception as e:
+            logger.error("Error reading tokens from shared state: %s", e)
+            return False
+        if text is None:
+            return False
+        shared = json.loads(text)
+        expiry = shared.get('token_expiry_time')
+        if not shared.get('access_token') or expiry is None:
+            return False
+        if self.access_token is not None and self.token_expiry_time is not None and expiry <= self.token_expiry_time:
+            return False
+        self.access_token = shared['access_token']
+        self.refresh_token = shared.get('refresh_token') or self.refresh_token
+        self.token_expiry_time = expiry
+        self.token_lifetime = shared.get('token_lifetime')
+        return True
+
+    def save(self) -> bool:
+        """Persist the cached tokens: write a temp file in the same directory, then rename over."""
+        if not all([self.access_token, self.token_expiry_time]):
+            return False
+        token_data = self.token_data()
+        directory = os.path.dirname(os.path.abspath(self.token_file))
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tokens-', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(token_data, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.token_file)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            return True
+        except Exception as e:
+            logger.error("Error saving tokens: %s", e)
+            return False
+
+    # ---- refresh ----
+
+    def refresh(self, only_if_expired: bool = False) -> str:
+        """
+        Refresh the access token, sharing one in-flight request among concurrent callers.
+        Args:
+            only_if_expired: Skip the refresh if another caller already renewed the token.
+        Returns:
+            The new access token.
+        """
+        with self._lock:
+            if only_if_expired and self.is_valid():
+                return self.access_token
+            future = self._inflight
+            leader = future is None
+            if leader:
+                future = self._inflight = Future()
+        if not leader:
+            return future.result(timeout=REFRESH_TIMEOUT)
+        try:
+            token = self._refresh_now()
+            future.set_result(token)
+            return token
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight = None
+
+    def _refresh_now(self) -> str:
+        """Refresh once across all workers: take the shared lease, or wait for the worker holding it."""
+        deadline = time.monotonic() + REFRESH_TIMEOUT
+        while True:
+            if self.adopt_shared() and self.is_valid(self.effective_margin()):
+                return self.access_token
+            if self.backend.acquire_lease(REFRESH_LEASE, self.owner, REFRESH_TIMEOUT):
+                try:
+                    # The previous lease holder may have finished between the check and the lease
+                    if self.adopt_shared() and self.is_valid(self.effective_margin()):
+                        return self.access_token
+                    return self._request_token()
+                finally:
+                    self.backend.release_lease(REFRESH_LEASE, self.owner)
+            if time.monotonic() > deadline:
+                raise TimeoutError("Timed out waiting for another worker to refresh the access token")
+            time.sleep(SHARED_REFRESH_POLL_INTERVAL)
+
+    def _request_token(self) -> str:
+        if not self.refresh_token:
+            raise Exception("No refresh token available.")
+        data = {
+            'client_id': CLIENT_ID,
+            'client_secret': CLIENT_SECRET,
+            'refresh_token': self.refresh_token,
+            'grant_type': 'refresh_token'
+        }
+        response = upstream.post(TOKEN_URL, data=data)
+        response.raise_for_status()
+        self.set_tokens(response.json())
+        logger.info("Access token refreshed successfully.")
+        return self.access_token
+
+    def get_access_token(self) -> str:
+        """Return a valid access token, refreshing it only if it is missing or expired."""
+        if self.is_valid():
+            return self.access_token
+        with metrics.phase("auth"):
+            if not self._loaded:
+                self.load()
+                self._start_background_refresh()
+                if self.is_valid():
+                    return self.access_token
+            logger.info("Access token expired or missing. Refreshing...")
+            return self.refresh(only_if_expired=True)
+
+    async def get_access_token_async(self) -> str:
+        """Async variant: the cached token is returned inline, a refresh runs in a worker thread."""
+        if self.is_valid():
+            return self.access_token
+        return await asyncio.to_thread(self.get_access_token)
+
+    # ---- background refresh ----
+
+    def _start_background_refresh(self) -> None:
+        if not self.background_refresh or self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._refresh_loop, name="token-refresh", daemon=True)
+                self._worker.start()
+
+    def _refresh_loop(self) -> None:
+        while True:
+            if self.token_expiry_time is None or not self.refresh_token:
+                # Nothing to refresh until tokens arrive (e.g. via set_tokens)
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            delay = max(
+                self.token_expiry_time - self.effective_margin() - time.time(),
+                self._last_background_refresh + MIN_BACKGROUND_REFRESH_INTERVAL - time.monotonic()
+            )
+            if delay > 0:
+                if self._wake.wait(timeout=delay):
+                    self._wake.clear()
+                continue
+            self._last_background_refresh = time.monotonic()
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning("Background token refresh failed: %s", e)
+                time.sleep(REFRESH_RETRY_DELAY)
+
+
+token_manager = TokenManager()
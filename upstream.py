@@ -0,0 +1,350 @@
+import asyncio
+import atexit
+import concurrent.futures
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+import httpx
+from dotenv import load_dotenv
+
+import metrics
+import shared_state
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# ==== HTTP SETTINGS ====
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "30"))
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", "120"))
+# Upper bound on concurrent in-flight async upstream requests per event loop
+UPSTREAM_MAX_CONCURRENCY = int(os.environ.get("UPSTREAM_MAX_CONCURRENCY", "16"))
+
+# ==== QUOTA AND RETRY SETTINGS ====
+# Client-side token bucket for Calendar API calls, sized to stay under Google's default
+# per-user quota (600 requests/minute); 0 disables it. OAuth token requests are not limited.
+UPSTREAM_RATE_PER_SECOND = float(os.environ.get("UPSTREAM_RATE_PER_SECOND", "10"))
+UPSTREAM_BURST = float(os.environ.get("UPSTREAM_BURST", "20"))
+UPSTREAM_MAX_RETRIES = int(os.environ.get("UPSTREAM_MAX_RETRIES", "4"))
+# Exponential backoff: attempt n waits a random time in [0, min(MAX, BASE * 2**n)] seconds
+UPSTREAM_BACKOFF_BASE = float(os.environ.get("UPSTREAM_BACKOFF_BASE", "0.5"))
+UPSTREAM_BACKOFF_MAX = float(os.environ.get("UPSTREAM_BACKOFF_MAX", "30"))
+# A Retry-After longer than this is returned to the caller instead of waited out
+UPSTREAM_MAX_RETRY_AFTER = float(os.environ.get("UPSTREAM_MAX_RETRY_AFTER", "60"))
+# Server errors that may be retried when repeating the request is safe
+RETRYABLE_STATUSES = {500, 502, 503, 504}
+# Errors raised before the request reached the server; safe to retry any request
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# h2 enables HTTP/2 in httpx; only probe for it here, httpx imports it when a client is built
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+HTTP2_ENABLED = HTTP2_AVAILABLE and os.environ.get("HTTP2", "1").lower() not in ("0", "false", "no")
+
+_client: Optional[httpx.Client] = None
+_client_lock = threading.Lock()
+# Async clients and their concurrency limits are bound to the event loop that created them
+_async_clients: Dict[asyncio.AbstractEventLoop, Tuple[httpx.AsyncClient, asyncio.Semaphore]] = {}
+
+
+def http_timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        connect=HTTP_CONNECT_TIMEOUT,
+        read=HTTP_READ_TIMEOUT,
+        write=HTTP_READ_TIMEOUT,
+        pool=HTTP_CONNECT_TIMEOUT
+    )
+
+
+def http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=HTTP_POOL_SIZE,
+        max_keepalive_connections=HTTP_POOL_SIZE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+    )
+
+
+def get_http_client() -> httpx.Client:
+    """
+    Return the process-wide HTTP client.
+
+    Connections to Google (API and OAuth token endpoints) are pooled and kept
+    alive, so repeated calls skip the TCP and TLS handshakes. HTTP/2 is used when
+    the h2 package is installed.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(
+                    http2=HTTP2_ENABLED,
+                    timeout=http_timeout(),
+                    limits=http_limits()
+                )
+    return _client
+
+
+def close_http_client() -> None:
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+atexit.register(close_http_client)
+
+
+def send(url: str, **kwargs) -> httpx.Response:
+    """One POST through the shared client, without retries."""
+    started = time.perf_counter()
+    response = None
+    try:
+        response = get_http_client().post(url, **kwargs)
+        return response
+    finally:
+        metrics.record_upstream(url, time.perf_counter() - started, response)
+
+
+def post(url: str, idempotent: bool = True, cost: float = 1.0, **kwargs) -> httpx.Response:
+    """
+    POST through the shared client; accepts httpx keyword arguments (json, data, params, headers).
+
+    Calendar calls wait for the rate limiter, identical idempotent requests already in
+    flight are shared, and rate limiting and transient failures are retried with backoff.
+    Args:
+        url: Request URL.
+        idempotent: Repeating the request is harmless (FreeBusy, token refresh). Requests
+            that are not (event inserts) are only retried when Google certainly did not
+            process them: 429/rate-limit responses and connection failures.
+        cost: Quota units the request uses (one per call in a batch request).
+    Returns:
+        The final response; the caller checks its status.
+    """
+    def call() -> httpx.Response:
+        attempt = 0
+        while True:
+            throttle(url, bucket.reserve(cost) if rate_limited(url) else 0.0, time.sleep)
+            try:
+                response = send(url, **kwargs)
+                error = None
+            except httpx.TransportError as e:
+                response, error = None, e
+            delay = retry_delay(url, response, error, idempotent, attempt)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return response
+            time.sleep(delay)
+            attempt += 1
+
+    key = request_key(url, kwargs) if idempotent else None
+    return single_flight.do(key, call) if key is not None else call()
+
+
+def get_async_http_client() -> Tuple[httpx.AsyncClient, asyncio.Semaphore]:
+    """Return the running event loop's async HTTP client and its concurrency semaphore."""
+    loop = asyncio.get_running_loop()
+    entry = _async_clients.get(loop)
+    if entry is None:
+        for stale in [l for l in _async_clients if l.is_closed()]:
+            del _async_clients[stale]
+        entry = _async_clients[loop] = (
+            httpx.AsyncClient(http2=HTTP2_ENABLED, timeout=http_timeout(), limits=http_limits()),
+            asyncio.Semaphore(UPSTREAM_MAX_CONCURRENCY)
+        )
+    return entry
+
+
+async def asend(url: str, **kwargs) -> httpx.Response:
+    """One async POST through the loop's shared client, bounded by UPSTREAM_MAX_CONCURRENCY, without retries."""
+    client, semaphore = get_async_http_client()
+    async with semaphore:
+        # Timed inside the semaphore so queueing for a slot is not counted as network time
+        started = time.perf_counter()
+        response = None
+        try:
+            response = await client.post(url, **kwargs)
+            return response
+        finally:
+            metrics.record_upstream(url, time.perf_counter() - started, response)
+
+
+async def apost(url: str, idempotent: bool = True, cost: float = 1.0, **kwargs) -> httpx.Response:
+    """Async variant of post(); rate-limit and backoff waits do not hold a concurrency slot."""
+    async def call() -> httpx.Response:
+        attempt = 0
+        while True:
+            wait = await shared_state.offload(bucket.reserve, cost) if rate_limited(url) else 0.0
+            if wait > 0:
+                throttle(url, wait, None)
+                await asyncio.sleep(wait)
+            try:
+                response = await asend(url, **kwargs)
+                error = None
+            except httpx.TransportError as e:
+                response, error = None, e
+            delay = retry_delay(url, response, error, idempotent, attempt)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return response
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    key = request_key(url, kwargs) if idempotent else None
+    return await single_flight.ado(key, call) if key is not None else await call()
+
+
+# ==== RATE LIMITING, RETRIES AND COALESCING ====
+class SingleFlight:
+    """
+    Share one execution among concurrent callers with the same key.
+
+    The first caller runs the function; callers arriving while it is in flight get its
+    result (or exception) instead of starting their own. Nothing is cached afterwards.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, concurrent.futures.Future] = {}
+        self._tasks: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], asyncio.Task] = {}
+
+    def do(self, key: Hashable, func: Callable[[], httpx.Response]) -> httpx.Response:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = concurrent.futures.Future()
+        if not leader:
+            metrics.registry.inc("upstream_coalesced_total", endpoint=metrics.upstream_endpoint(key[0]))
+            return future.result()
+        try:
+            result = func()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    async def ado(self, key: Hashable, func: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        task_key = (asyncio.get_running_loop(), key)
+        task = self._tasks.get(task_key)
+        if task is not None:
+            metrics.registry.inc("upstream_coalesced_total", endpoint=metrics.upstream_endpoint(key[0]))
+        else:
+            # A task, so that a cancelled first caller does not cancel the request for the others
+            task = self._tasks[task_key] = asyncio.ensure_future(func())
+            task.add_done_callback(lambda _: self._tasks.pop(task_key, None))
+        return await asyncio.shield(task)
+
+
+# One quota for all workers when shared_state uses a shared backend
+bucket = shared_state.backend.token_bucket("calendar", UPSTREAM_RATE_PER_SECOND, UPSTREAM_BURST)
+single_flight = SingleFlight()
+
+metrics.registry.describe("upstream_retries_total", "counter", "Upstream requests retried, by reason")
+metrics.registry.describe("upstream_coalesced_total", "counter", "Upstream requests served by an identical request already in flight")
+metrics.registry.describe("upstream_throttled_seconds_total", "counter", "Time upstream requests waited for the client-side rate limiter")
+
+
+def rate_limited(url: str) -> bool:
+    return metrics.upstream_endpoint(url) != "token"
+
+
+def throttle(url: str, wait: float, sleep: Optional[Callable[[float], None]]) -> None:
+    """Account for a rate limiter wait, sleeping it off when given a sleep function."""
+    if wait <= 0:
+        return
+    metrics.registry.inc("upstream_throttled_seconds_total", wait, endpoint=metrics.upstream_endpoint(url))
+    if sleep is not None:
+        sleep(wait)
+
+
+def request_key(url: str, kwargs: Dict) -> Optional[Tuple[str, str, str]]:
+    """
+    Identity of a request for coalescing: URL, body and params, plus a digest of the
+    Authorization header so callers holding different credentials never share a response.
+    Other headers are ignored.
+    """
+    headers = kwargs.get("headers") or {}
+    authorization = next((v for k, v in headers.items() if k.lower() == "authorization"), "")
+    try:
+        body = json.dumps({k: v for k, v in kwargs.items() if k != "headers"}, sort_keys=True, default=repr)
+    except (TypeError, ValueError):
+        return None
+    return url, body, hashlib.sha256(authorization.encode()).hexdigest()
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds or HTTP-date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_rate_limited(response: httpx.Response) -> bool:
+    """429, or Google's 403 rateLimitExceeded/userRateLimitExceeded."""
+    if response.status_code == 429:
+        return True
+    return response.status_code == 403 and b"ratelimitexceeded" in response.content.lower()
+
+
+def retry_delay(
+    url: str,
+    response: Optional[httpx.Response],
+    error: Optional[Exception],
+    idempotent: bool,
+    attempt: int
+) -> Optional[float]:
+    """
+    Seconds to wait before retrying a request, or None if its outcome should be returned as is.
+    Args:
+        url: Request URL.
+        response: The response, or None if the request raised.
+        error: The transport error raised, if any.
+        idempotent: Whether repeating the request is safe after it may have been processed.
+        attempt: Retries made so far.
+    """
+    if attempt >= UPSTREAM_MAX_RETRIES:
+        return None
+    retry_after = None
+    if error is not None:
+        if not idempotent and not isinstance(error, UNSENT_ERRORS):
+            return None
+        reason = type(error).__name__
+    elif is_rate_limited(response):
+        reason = str(response.status_code)
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after is not None and retry_after > UPSTREAM_MAX_RETRY_AFTER:
+            return None
+    elif idempotent and response.status_code in RETRYABLE_STATUSES:
+        reason = str(response.status_code)
+    else:
+        return None
+    # Full jitter spreads out clients that failed together; Retry-After is a floor
+    delay = random.uniform(0, min(UPSTREAM_BACKOFF_MAX, UPSTREAM_BACKOFF_BASE * 2 ** attempt))
+    if retry_after is not None:
+        delay += retry_after
+    metrics.registry.inc("upstream_retries_total", endpoint=metrics.upstream_endpoint(url), reason=reason)
+    logger.info("Retrying %s in %.2fs after %s (attempt %d)", metrics.upstream_endpoint(url), delay, reason, attempt + 1)
+    return delay